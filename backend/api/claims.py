@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+from postgrest.exceptions import APIError
+from supabase import Client
+
+from api.persistence import RPC_NOT_FOUND_CODE
+
+logger = logging.getLogger(__name__)
+
+CLAIM_RPC_NAME = "claim_triage_analysis"
+RELEASE_RPC_NAME = "release_triage_analysis"
+
+
+CLAIMS_TABLE = "triage_analysis_claims"
+
+
+class AnalysisClaims:
+    """Cross-worker claims on assessments, stored in the triage_analysis_claims table.
+
+    Before running the agent a worker claims the assessment through the
+    claim_triage_analysis RPC. A worker that loses the race waits for the
+    claim to be released and then serves the analysis the winner persisted.
+    Claims expire after ``ttl_seconds``. Claims never write to assessments,
+    so they leave its updated_at alone. If the RPCs are not installed every
+    claim succeeds, so a single worker keeps working unchanged.
+    """
+
+    def __init__(
+        self,
+        supabase: Client,
+        ttl_seconds: int = 120,
+        poll_interval: float = 0.5,
+        worker_id: Optional[str] = None
+    ):
+        self.supabase = supabase
+        self.ttl_seconds = ttl_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.enabled = ttl_seconds > 0
+        self.contended = 0
+
+    def try_claim(self, assessment_id: str) -> bool:
+        """Claim an assessment for this worker; False if another worker holds it."""
+        if not self.enabled:
+            return True
+        try:
+            response = self.supabase.rpc(CLAIM_RPC_NAME, {
+                "p_assessment_id": assessment_id,
+                "p_worker": self.worker_id,
+                "p_ttl_seconds": self.ttl_seconds
+            }).execute()
+        except APIError as e:
+            if e.code == RPC_NOT_FOUND_CODE:
+                logger.warning(f"RPC {CLAIM_RPC_NAME} is not installed, cross-worker claims are disabled")
+                self.enabled = False
+            else:
+                logger.error(f"Failed to claim assessment {assessment_id}: {str(e)}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to claim assessment {assessment_id}: {str(e)}")
+            return True
+
+        if response.data is False:
+            self.contended += 1
+            return False
+        return True
+
+    def release(self, assessment_id: str):
+        """Release this worker's claim on an assessment."""
+        if not self.enabled:
+            return
+        try:
+            self.supabase.rpc(RELEASE_RPC_NAME, {
+                "p_assessment_id": assessment_id,
+                "p_worker": self.worker_id
+            }).execute()
+        except Exception as e:
+            logger.error(f"Failed to release claim on assessment {assessment_id}: {str(e)}")
+
+    def _claim_expires_at(self, assessment_id: str) -> Optional[datetime]:
+        response = (
+            self.supabase.table(CLAIMS_TABLE)
+            .select("claimed_at")
+            .eq("assessment_id", assessment_id)
+            .execute()
+        )
+        if not response.data:
+            return None
+        claimed_at = datetime.fromisoformat(response.data[0]["claimed_at"].replace("Z", "+00:00"))
+        return claimed_at + timedelta(seconds=self.ttl_seconds)
+
+    async def wait_released(self, assessment_id: str) -> bool:
+        """
+        Wait until another worker's claim is released or expires.
+
+        Returns:
+            bool: True if the claim was released, False if it expired
+        """
+        deadline = time.monotonic() + self.ttl_seconds
+        while time.monotonic() < deadline:
+            try:
+                expires_at = await asyncio.to_thread(self._claim_expires_at, assessment_id)
+            except Exception as e:
+                logger.error(f"Failed to poll claim on assessment {assessment_id}: {str(e)}")
+                return False
+            if expires_at is None:
+                return True
+            if expires_at <= datetime.now(timezone.utc):
+                return False
+            await asyncio.sleep(self.poll_interval)
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Claim configuration and contention counter."""
+        return {
+            "enabled": self.enabled,
+            "worker_id": self.worker_id,
+            "ttl_seconds": self.ttl_seconds,
+            "contended": self.contended
+        }
@@ -0,0 +1,70 @@
+"""
+One-off compaction of duplicated possible_diagnoses rows.
+
+Before diagnosis ids were deterministic every analysis inserted fresh rows,
+so assessments accumulated duplicates. This calls the
+compact_possible_diagnoses RPC (frontend/lib/supabase/migrations/
+compact_possible_diagnoses.sql), which keeps the newest row per
+(assessment_id, diagnosis_name) and rewrites its id to the deterministic one.
+
+Usage (from backend/):
+    python -m api.compact_diagnoses [--dry-run]
+"""
+import argparse
+import logging
+import os
+from collections import Counter
+
+from dotenv import load_dotenv
+from supabase import Client, create_client
+
+logger = logging.getLogger(__name__)
+
+COMPACT_RPC_NAME = "compact_possible_diagnoses"
+PAGE_SIZE = 1000
+
+
+def count_duplicates(supabase: Client) -> int:
+    """Count the rows compaction would delete."""
+    seen: Counter = Counter()
+    offset = 0
+    while True:
+        response = (
+            supabase.table("possible_diagnoses")
+            .select("assessment_id,diagnosis_name")
+            .order("id")
+            .range(offset, offset + PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = response.data or []
+        seen.update((row["assessment_id"], row["diagnosis_name"]) for row in rows)
+        if len(rows) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+    return sum(count - 1 for count in seen.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove duplicated possible_diagnoses rows")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the duplicates")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_KEY")
+    if not supabase_url or not supabase_key:
+        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
+    supabase = create_client(supabase_url, supabase_key)
+
+    if args.dry_run:
+        logger.info(f"{count_duplicates(supabase)} duplicate diagnoses would be deleted")
+        return
+
+    result = supabase.rpc(COMPACT_RPC_NAME, {}).execute().data
+    logger.info(f"Deleted {result['deleted']} duplicate diagnoses, re-keyed {result['rekeyed']}")
+
+
+if __name__ == "__main__":
+    main()
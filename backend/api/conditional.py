@@ -0,0 +1,77 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from models.triage import TriageData
+
+
+def _as_datetime(value: Union[str, datetime]) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def compute_etag(updated_at: Union[str, datetime], diagnoses: Iterable[Tuple[Any, float]]) -> str:
+    """
+    ETag of an assessment from its updated_at and (diagnosis id, confidence) pairs.
+
+    Confidences are rounded to REAL precision so a value read back from the
+    database hashes the same as the value that was written.
+    """
+    digest = hashlib.sha256(_as_datetime(updated_at).isoformat().encode("utf-8"))
+    for diagnosis_id, confidence in sorted((str(i), float(c)) for i, c in diagnoses):
+        digest.update(f"|{diagnosis_id}:{confidence:.6g}".encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def triage_validators(triage_data: TriageData) -> Tuple[str, datetime]:
+    """ETag and Last-Modified of a TriageData."""
+    etag = compute_etag(
+        triage_data.updated_at,
+        ((d.id, d.confidence) for d in triage_data.possible_diagnoses)
+    )
+    return etag, _as_datetime(triage_data.updated_at)
+
+
+def row_validators(assessment_data: Dict[str, Any], diagnoses: List[Dict[str, Any]]) -> Tuple[str, datetime]:
+    """ETag and Last-Modified from the rows fetched by fetch_assessment_validators."""
+    etag = compute_etag(
+        assessment_data["updated_at"],
+        ((d["id"], d["confidence"]) for d in diagnoses)
+    )
+    return etag, _as_datetime(assessment_data["updated_at"])
+
+
+def http_date(value: datetime) -> str:
+    """Format a datetime as an HTTP-date for Last-Modified."""
+    return format_datetime(_as_datetime(value).replace(microsecond=0), usegmt=True)
+
+
+def is_not_modified(
+    etag: str,
+    last_modified: datetime,
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str]
+) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since for a GET (RFC 9110 section 13.2.2).
+
+    If-Modified-Since is only consulted when If-None-Match is absent.
+    """
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in candidates
+
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_datetime(last_modified).replace(microsecond=0) <= _as_datetime(since)
+
+    return False
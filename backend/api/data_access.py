@@ -0,0 +1,271 @@
+import asyncio
+import base64
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Columns needed to build a TriageData, instead of select("*")
+ASSESSMENT_COLUMNS = ",".join([
+    "id", "user_id", "symptom_description",
+    "image_file_name", "image_file_type", "image_url", "image_storage_path",
+    "patient_name", "patient_age", "patient_sex", "symptom_duration", "pain_level",
+    "affected_body_parts", "has_fever", "temperature_celsius", "known_allergies",
+    "current_medications", "recent_travel", "pre_existing_conditions",
+    "predicted_injury_label", "injury_description_summary", "severity_score",
+    "severity_reason", "recommendation_status", "triage_recommendation",
+    "analysis_input_hash", "created_at", "updated_at"
+])
+
+# possible_diagnoses columns, aliased to the PossibleDiagnosis field names
+DIAGNOSIS_COLUMNS = ",".join([
+    "id", "assessment_id", "name:diagnosis_name", "confidence:confidence_score",
+    "description", "created_at"
+])
+
+# Lightweight projection for listing assessments without their analysis text
+SUMMARY_COLUMNS = ",".join([
+    "id", "user_id", "predicted_injury_label", "severity_score",
+    "recommendation_status", "created_at"
+])
+
+AssessmentRows = Tuple[Dict[str, Any], List[Dict[str, Any]]]
+
+
+def fetch_assessment_embedded(
+    supabase: Client,
+    assessment_id: str,
+    columns: str = ASSESSMENT_COLUMNS,
+    diagnosis_columns: str = DIAGNOSIS_COLUMNS
+) -> Optional[AssessmentRows]:
+    """
+    Fetch an assessment and its diagnoses with one embedded PostgREST select.
+
+    Returns:
+        The assessment row and its diagnosis rows, or None if not found
+    """
+    response = (
+        supabase.table("assessments")
+        .select(f"{columns},possible_diagnoses({diagnosis_columns})")
+        .eq("id", assessment_id)
+        .execute()
+    )
+    if not response.data:
+        return None
+
+    assessment_data = dict(response.data[0])
+    diagnoses = assessment_data.pop("possible_diagnoses", None) or []
+    return assessment_data, diagnoses
+
+
+async def fetch_assessment_concurrent(
+    supabase: Client,
+    assessment_id: str,
+    columns: str = ASSESSMENT_COLUMNS,
+    diagnosis_columns: str = DIAGNOSIS_COLUMNS
+) -> Optional[AssessmentRows]:
+    """
+    Fetch an assessment and its diagnoses with two selects issued concurrently.
+
+    Returns:
+        The assessment row and its diagnosis rows, or None if not found
+    """
+    assessment_query = supabase.table("assessments").select(columns).eq("id", assessment_id)
+    diagnoses_query = supabase.table("possible_diagnoses").select(diagnosis_columns).eq("assessment_id", assessment_id)
+
+    assessment_response, diagnoses_response = await asyncio.gather(
+        asyncio.to_thread(assessment_query.execute),
+        asyncio.to_thread(diagnoses_query.execute)
+    )
+    if not assessment_response.data:
+        return None
+
+    return assessment_response.data[0], diagnoses_response.data or []
+
+
+async def fetch_assessment_with_diagnoses(
+    supabase: Client,
+    assessment_id: str,
+    columns: str = ASSESSMENT_COLUMNS,
+    diagnosis_columns: str = DIAGNOSIS_COLUMNS,
+    embedded: bool = True
+) -> Optional[AssessmentRows]:
+    """
+    Fetch an assessment and its diagnoses without blocking the event loop.
+
+    Args:
+        supabase: Supabase client
+        assessment_id: The UUID of the assessment
+        columns: Column projection for the assessments table
+        diagnosis_columns: Column projection for the possible_diagnoses table
+        embedded: Use one joined select (default) or two concurrent selects
+
+    Returns:
+        The assessment row and its diagnosis rows, or None if not found
+    """
+    if embedded:
+        return await asyncio.to_thread(
+            fetch_assessment_embedded, supabase, assessment_id, columns, diagnosis_columns
+        )
+    return await fetch_assessment_concurrent(supabase, assessment_id, columns, diagnosis_columns)
+
+
+def fetch_assessments_embedded(
+    supabase: Client,
+    assessment_ids: List[str],
+    columns: str = ASSESSMENT_COLUMNS,
+    diagnosis_columns: str = DIAGNOSIS_COLUMNS
+) -> Dict[str, AssessmentRows]:
+    """
+    Fetch many assessments and their diagnoses with one embedded in_ select.
+
+    Returns:
+        Assessment rows and diagnosis rows keyed by assessment id; missing ids are absent
+    """
+    if not assessment_ids:
+        return {}
+
+    response = (
+        supabase.table("assessments")
+        .select(f"{columns},possible_diagnoses({diagnosis_columns})")
+        .in_("id", assessment_ids)
+        .execute()
+    )
+
+    found: Dict[str, AssessmentRows] = {}
+    for row in response.data or []:
+        assessment_data = dict(row)
+        diagnoses = assessment_data.pop("possible_diagnoses", None) or []
+        found[str(assessment_data["id"])] = (assessment_data, diagnoses)
+    return found
+
+
+async def fetch_assessments_with_diagnoses(
+    supabase: Client,
+    assessment_ids: List[str],
+    columns: str = ASSESSMENT_COLUMNS,
+    diagnosis_columns: str = DIAGNOSIS_COLUMNS
+) -> Dict[str, AssessmentRows]:
+    """
+    Fetch many assessments and their diagnoses without blocking the event loop.
+
+    Returns:
+        Assessment rows and diagnosis rows keyed by assessment id; missing ids are absent
+    """
+    return await asyncio.to_thread(
+        fetch_assessments_embedded, supabase, assessment_ids, columns, diagnosis_columns
+    )
+
+
+def encode_cursor(created_at: str, assessment_id: str) -> str:
+    """Encode the (created_at, id) keyset position of a row as an opaque cursor."""
+    return base64.urlsafe_b64encode(f"{created_at}|{assessment_id}".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        created_at, assessment_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        UUID(assessment_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return created_at, assessment_id
+
+
+def fetch_assessment_page(
+    supabase: Client,
+    user_id: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 20,
+    columns: str = SUMMARY_COLUMNS
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page of assessments, newest first, with keyset pagination.
+
+    Rows are ordered by (created_at, id) descending and the page starts after
+    the cursor's position, so every page is one indexed range scan however deep
+    the caller has paged. One extra row is fetched to tell whether more follow.
+
+    Args:
+        supabase: Supabase client
+        user_id: Only list this user's assessments
+        after: Cursor returned as next_cursor by the previous page
+        limit: Maximum number of rows to return
+        columns: Column projection for the assessments table
+
+    Returns:
+        The page's rows and the cursor for the next page (None on the last page)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    query = supabase.table("assessments").select(columns)
+    if user_id:
+        query = query.eq("user_id", user_id)
+    if after:
+        created_at, assessment_id = decode_cursor(after)
+        query = query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt.{assessment_id})'
+        )
+
+    response = (
+        query.order("created_at", desc=True)
+        .order("id", desc=True)
+        .limit(limit + 1)
+        .execute()
+    )
+
+    rows = response.data or []
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(str(last["created_at"]), str(last["id"]))
+
+
+async def list_assessments(
+    supabase: Client,
+    user_id: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 20,
+    columns: str = SUMMARY_COLUMNS
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page of assessments without blocking the event loop.
+
+    Returns:
+        The page's rows and the cursor for the next page (None on the last page)
+    """
+    return await asyncio.to_thread(fetch_assessment_page, supabase, user_id, after, limit, columns)
+
+
+# Just enough to compute the ETag and Last-Modified of an assessment
+VALIDATOR_COLUMNS = "updated_at,possible_diagnoses(id,confidence:confidence_score)"
+
+
+def fetch_assessment_validators(supabase: Client, assessment_id: str) -> Optional[AssessmentRows]:
+    """
+    Fetch only updated_at and the diagnosis ids and confidences of an assessment.
+
+    Returns:
+        The assessment row and its diagnosis rows, or None if not found
+    """
+    response = supabase.table("assessments").select(VALIDATOR_COLUMNS).eq("id", assessment_id).execute()
+    if not response.data:
+        return None
+
+    assessment_data = dict(response.data[0])
+    diagnoses = assessment_data.pop("possible_diagnoses", None) or []
+    return assessment_data, diagnoses
@@ -0,0 +1,307 @@
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_TYPES = ("thread", "process")
+
+# Models that must be loaded before the pool reports ready
+READINESS_CHECKS = ("classifier", "embedder", "faiss_index")
+
+# Either a callable or a "package.module:attribute" path to one
+AgentFactory = Union[Callable[[], Any], str]
+
+# Agent instance owned by a process-pool worker, built once by the initializer
+_worker_agent = None
+
+
+def _resolve_factory(agent_factory: AgentFactory) -> Callable[[], Any]:
+    """Import a "module:attribute" factory path, or return a callable unchanged."""
+    if callable(agent_factory):
+        return agent_factory
+    module_name, _, attribute = agent_factory.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def _init_worker_agent(agent_factory: AgentFactory):
+    """Build the agent inside a process-pool worker."""
+    global _worker_agent
+    _worker_agent = _resolve_factory(agent_factory)()
+
+
+def _call_worker_agent(method: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+    """Call a method on the agent owned by the current process-pool worker."""
+    return getattr(_worker_agent, method)(*args, **kwargs)
+
+
+def _collect_worker_agent(method: str, args: tuple, kwargs: Dict[str, Any]) -> List[Any]:
+    """Exhaust a generator method on the process-pool worker's agent."""
+    return list(getattr(_worker_agent, method)(*args, **kwargs))
+
+
+class InferencePoolUnavailable(Exception):
+    """Raised when the pool cannot take an inference call right now."""
+    retry_after = 1
+
+
+class InferencePoolFull(InferencePoolUnavailable):
+    """Raised when the inference wait queue is at capacity."""
+    pass
+
+
+class InferencePoolNotReady(InferencePoolUnavailable):
+    """Raised while models are still loading or failed to load."""
+    retry_after = 10
+
+
+class InferencePool:
+    """Runs blocking DescriptorAgent calls on a bounded thread or process pool.
+
+    At most ``max_in_flight`` calls execute at once and at most ``max_queue``
+    callers wait for a slot; further callers are rejected with
+    InferencePoolFull so the API can answer 503 instead of piling up work.
+
+    Models are not loaded on construction: ``start()`` builds the agent(s)
+    and runs a warm-up inference in the background, and calls made before it
+    finishes raise InferencePoolNotReady.
+    """
+
+    def __init__(
+        self,
+        agent_factory: AgentFactory,
+        executor_type: str = "thread",
+        max_workers: int = 1,
+        max_in_flight: Optional[int] = None,
+        max_queue: int = 8
+    ):
+        if executor_type not in EXECUTOR_TYPES:
+            raise ValueError(f"Unknown executor type: {executor_type}")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight or max_workers
+        self.max_queue = max_queue
+
+        self._agent_factory = agent_factory
+        self._agent = None
+        self._executor: Executor
+        if executor_type == "process":
+            # Each worker process owns its own agent; spawn avoids forking TF state
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker_agent,
+                initargs=(agent_factory,)
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="inference"
+            )
+
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._waiting = 0
+        self._in_flight = 0
+        self.started_count = 0
+        self.completed_count = 0
+        self.rejected_count = 0
+        self.error_count = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+        self.ready = False
+        self.model_status: Dict[str, Any] = {}
+        self.load_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    async def start(self):
+        """
+        Build the agent(s) and run a warm-up inference off the event loop.
+
+        Sets ``ready`` once the classifier, embedder and FAISS index are loaded
+        and warm. Errors are recorded in ``load_error`` rather than raised.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        logger.info(f"Loading models on the {self.executor_type} inference pool")
+        try:
+            if self.executor_type == "process":
+                statuses = await asyncio.gather(*[
+                    asyncio.wrap_future(self._executor.submit(_call_worker_agent, "warm_up", (), {}))
+                    for _ in range(self.max_workers)
+                ])
+                status = {check: all(s.get(check) for s in statuses) for check in READINESS_CHECKS}
+            else:
+                factory = _resolve_factory(self._agent_factory)
+                self._agent = await loop.run_in_executor(self._executor, factory)
+                status = await loop.run_in_executor(self._executor, self._agent.warm_up)
+
+            self.model_status = status
+            self.ready = all(status.get(check) for check in READINESS_CHECKS)
+            if not self.ready:
+                self.load_error = f"Models not loaded: {status}"
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error(f"Failed to load models: {str(e)}")
+        finally:
+            self.load_seconds = time.perf_counter() - started
+
+        logger.info(f"Inference pool ready={self.ready} after {self.load_seconds:.1f}s")
+
+    def readiness(self) -> Dict[str, Any]:
+        """Readiness of the pool and its models."""
+        return {
+            "ready": self.ready,
+            "models": self.model_status,
+            "load_seconds": self.load_seconds,
+            "error": self.load_error
+        }
+
+    @property
+    def agent(self) -> Any:
+        """The in-process agent (None when running on a process pool)."""
+        return self._agent
+
+    def is_saturated(self) -> bool:
+        """Whether a new call would be rejected right now."""
+        return not self.ready or self._waiting >= self.max_queue
+
+    async def _acquire(self):
+        """Wait for an execution slot, or raise if the pool is not ready or the wait queue is full."""
+        if not self.ready:
+            raise InferencePoolNotReady(self.load_error or "Models are still loading")
+        if self._waiting >= self.max_queue:
+            self.rejected_count += 1
+            raise InferencePoolFull(
+                f"Inference queue is full ({self._waiting} waiting, {self._in_flight} running)"
+            )
+
+        self._waiting += 1
+        enqueued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        wait_seconds = time.perf_counter() - enqueued_at
+        self.started_count += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def _submit(self, call: Callable[[], Any]) -> asyncio.Future:
+        """Submit work for an acquired slot; the slot is freed when the work finishes."""
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        started_at = time.perf_counter()
+        future = self._executor.submit(call)
+        # Free the slot when the work really finishes, even if the caller went away
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release, started_at))
+        return asyncio.wrap_future(future)
+
+    async def run(self, method: str, *args, **kwargs) -> Any:
+        """
+        Run ``agent.<method>(*args, **kwargs)`` on the pool.
+
+        Raises:
+            InferencePoolNotReady: If the models are not loaded yet
+            InferencePoolFull: If the wait queue is already at capacity
+        """
+        await self._acquire()
+
+        if self.executor_type == "process":
+            call = partial(_call_worker_agent, method, args, kwargs)
+        else:
+            call = partial(getattr(self._agent, method), *args, **kwargs)
+
+        try:
+            return await self._submit(call)
+        except Exception:
+            self.error_count += 1
+            raise
+
+    async def stream(self, method: str, *args, **kwargs) -> AsyncIterator[Any]:
+        """
+        Run the generator ``agent.<method>(*args, **kwargs)`` on the pool and
+        yield each item as soon as the worker produces it.
+
+        On a process pool items cannot be forwarded across the process
+        boundary as they are produced, so they are yielded once the generator
+        has finished.
+
+        Raises:
+            InferencePoolNotReady: If the models are not loaded yet
+            InferencePoolFull: If the wait queue is already at capacity
+        """
+        await self._acquire()
+
+        if self.executor_type == "process":
+            try:
+                items = await self._submit(partial(_collect_worker_agent, method, args, kwargs))
+            except Exception:
+                self.error_count += 1
+                raise
+            for item in items:
+                yield item
+            return
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+
+        def produce():
+            try:
+                for item in getattr(self._agent, method)(*args, **kwargs):
+                    loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (finished, e))
+            else:
+                loop.call_soon_threadsafe(queue.put_nowait, (finished, None))
+
+        self._submit(produce)
+        while True:
+            item, error = await queue.get()
+            if item is finished:
+                if error is not None:
+                    self.error_count += 1
+                    raise error
+                return
+            yield item
+
+    def _release(self, started_at: float):
+        self._in_flight -= 1
+        self.completed_count += 1
+        self.total_run_seconds += time.perf_counter() - started_at
+        self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth, concurrency and wait-time metrics."""
+        started = max(self.started_count, 1)
+        completed = max(self.completed_count, 1)
+        return {
+            "executor": self.executor_type,
+            "max_workers": self.max_workers,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_depth": self._waiting,
+            "in_flight": self._in_flight,
+            "completed": self.completed_count,
+            "rejected": self.rejected_count,
+            "errors": self.error_count,
+            "avg_wait_seconds": self.total_wait_seconds / started,
+            "max_wait_seconds": self.max_wait_seconds,
+            "avg_run_seconds": self.total_run_seconds / completed
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the underlying executor."""
+        logger.info(f"Shutting down {self.executor_type} inference pool")
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,258 @@
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException
+
+from models.triage import TriageData, TriageJob, TriageJobState
+from network.http_pool import get_http_pool
+
+logger = logging.getLogger(__name__)
+
+# Coroutine that runs the triage pipeline for (assessment_id, refresh)
+TriageHandler = Callable[[str, bool], Awaitable[TriageData]]
+
+
+class TriageJobQueueFull(Exception):
+    """Raised when the job queue is at capacity."""
+    pass
+
+
+class InvalidCallbackUrl(ValueError):
+    """Raised when a job callback URL is not allowed."""
+    pass
+
+
+class TriageJobManager:
+    """Runs triage jobs on background workers inside the API process.
+
+    Jobs wait in a bounded in-memory queue and at most ``concurrency`` of them
+    run at once. Each job records when it was queued, started and finished so
+    queueing time can be told apart from compute time. Finished jobs are kept
+    for polling for ``finished_ttl`` seconds, and at most ``max_finished`` of
+    them; a background task prunes them every ``prune_interval`` seconds.
+
+    Callback URLs must be http(s). They are limited to ``callback_allowed_hosts``
+    (a host or a parent domain) when given, and may not resolve to private,
+    loopback, link-local or other non-public addresses unless
+    ``allow_private_callbacks`` is set.
+    """
+
+    def __init__(
+        self,
+        handler: TriageHandler,
+        max_queue: int = 100,
+        concurrency: int = 1,
+        max_finished: int = 1000,
+        max_retries: int = 5,
+        callback_timeout: float = 10.0,
+        callback_allowed_hosts: Sequence[str] = (),
+        allow_private_callbacks: bool = False,
+        finished_ttl: float = 3600.0,
+        prune_interval: float = 60.0
+    ):
+        self.handler = handler
+        self.max_queue = max_queue
+        self.concurrency = concurrency
+        self.max_finished = max_finished
+        self.max_retries = max_retries
+        self.callback_timeout = callback_timeout
+        self.callback_allowed_hosts = [h.strip().lower().lstrip(".") for h in callback_allowed_hosts if h.strip()]
+        self.allow_private_callbacks = allow_private_callbacks
+        self.finished_ttl = finished_ttl
+        self.prune_interval = prune_interval
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._pruner: Optional[asyncio.Task] = None
+        self._jobs: "OrderedDict[UUID, TriageJob]" = OrderedDict()
+        self.completed_count = 0
+        self.failed_count = 0
+        self.rejected_count = 0
+
+    def start(self):
+        """Start the worker tasks on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"triage-job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+        self._pruner = asyncio.create_task(self._prune_periodically(), name="triage-job-pruner")
+        logger.info(f"Started {self.concurrency} triage job workers")
+
+    async def stop(self):
+        """Cancel the worker and pruner tasks."""
+        tasks = self._workers + ([self._pruner] if self._pruner else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._pruner = None
+
+    def submit(self, assessment_id: UUID, refresh: bool = False, callback_url: Optional[str] = None) -> TriageJob:
+        """
+        Queue a triage job for an assessment.
+
+        Raises:
+            TriageJobQueueFull: If the queue is already at capacity
+        """
+        if self._queue is None:
+            raise RuntimeError("Job manager has not been started")
+
+        job = TriageJob(
+            id=uuid4(),
+            assessment_id=assessment_id,
+            refresh=refresh,
+            callback_url=callback_url,
+            created_at=datetime.now(timezone.utc)
+        )
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected_count += 1
+            raise TriageJobQueueFull(f"Triage job queue is full ({self.max_queue} jobs waiting)")
+
+        self._jobs[job.id] = job
+        self._prune()
+        return job
+
+    def get(self, job_id: UUID) -> Optional[TriageJob]:
+        """Look up a job by id."""
+        return self._jobs.get(job_id)
+
+    async def check_callback_url(self, url: str):
+        """
+        Check that a callback URL may receive job payloads.
+
+        The host is resolved and every address it resolves to must be public,
+        so a caller cannot make the server POST to internal services.
+
+        Raises:
+            InvalidCallbackUrl: If the URL is not http(s), its host is not
+                allowed, or it cannot be resolved or resolves to a non-public address
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise InvalidCallbackUrl("callback_url must be an http or https URL")
+
+        host = parts.hostname.lower()
+        if self.callback_allowed_hosts and not any(
+            host == allowed or host.endswith(f".{allowed}") for allowed in self.callback_allowed_hosts
+        ):
+            raise InvalidCallbackUrl(f"callback_url host {host} is not allowed")
+        if self.allow_private_callbacks:
+            return
+
+        try:
+            addresses = await asyncio.get_running_loop().getaddrinfo(
+                host, parts.port or (443 if parts.scheme == "https" else 80), type=socket.SOCK_STREAM
+            )
+        except socket.gaierror as e:
+            raise InvalidCallbackUrl(f"callback_url host {host} cannot be resolved") from e
+
+        for *_, sockaddr in addresses:
+            address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+            if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+                address = address.ipv4_mapped
+            if not address.is_global:
+                raise InvalidCallbackUrl(f"callback_url host {host} resolves to a non-public address")
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error(f"Unexpected error in triage job {job.id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: TriageJob):
+        job.state = TriageJobState.RUNNING
+        job.started_at = datetime.now(timezone.utc)
+        job.queue_seconds = (job.started_at - job.created_at).total_seconds()
+        started = time.perf_counter()
+
+        try:
+            while True:
+                job.attempts += 1
+                try:
+                    job.result = await self.handler(str(job.assessment_id), job.refresh)
+                    break
+                except HTTPException as e:
+                    # The inference pool is saturated; wait instead of failing the job
+                    if e.status_code != 503 or job.attempts > self.max_retries:
+                        raise
+                    retry_after = float((e.headers or {}).get("Retry-After", "1"))
+                    await asyncio.sleep(retry_after)
+
+            job.state = TriageJobState.COMPLETED
+            self.completed_count += 1
+        except HTTPException as e:
+            job.state = TriageJobState.FAILED
+            job.error = str(e.detail)
+            self.failed_count += 1
+        except Exception as e:
+            job.state = TriageJobState.FAILED
+            job.error = str(e)
+            self.failed_count += 1
+        finally:
+            job.compute_seconds = time.perf_counter() - started
+            job.finished_at = datetime.now(timezone.utc)
+
+        logger.info(
+            f"Triage job {job.id} {job.state.value} for assessment {job.assessment_id} "
+            f"(queued {job.queue_seconds:.3f}s, compute {job.compute_seconds:.3f}s)"
+        )
+
+        if job.callback_url:
+            await self._deliver_callback(job)
+
+    async def _deliver_callback(self, job: TriageJob):
+        url = job.callback_url
+        try:
+            # Checked again at delivery, since DNS may have changed since submit
+            await self.check_callback_url(url)
+            response = await get_http_pool().apost(
+                url, target="callback", json=job.model_dump(mode="json"),
+                timeout=self.callback_timeout, follow_redirects=False
+            )
+            response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Failed to deliver callback for triage job {job.id}: {str(e)}")
+
+    async def _prune_periodically(self):
+        while True:
+            await asyncio.sleep(self.prune_interval)
+            self._prune()
+
+    def _prune(self):
+        """Drop finished jobs older than finished_ttl, and the oldest beyond max_finished."""
+        expired_before = datetime.now(timezone.utc) - timedelta(seconds=self.finished_ttl)
+        finished = [
+            job_id for job_id, job in self._jobs.items()
+            if job.state in (TriageJobState.COMPLETED, TriageJobState.FAILED)
+        ]
+        excess = set(finished[:max(0, len(finished) - self.max_finished)])
+        for job_id in finished:
+            if job_id in excess or self._jobs[job_id].finished_at < expired_before:
+                del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and job counters."""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "concurrency": self.concurrency,
+            "tracked_jobs": len(self._jobs),
+            "completed": self.completed_count,
+            "failed": self.failed_count,
+            "rejected": self.rejected_count
+        }
@@ -0,0 +1,106 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Buckets from 5 ms up to 30 s to cover both DB round trips and cold inference
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_LATENCY = Histogram(
+    "triage_stage_duration_seconds",
+    "Latency of each stage of the triage pipeline",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+REQUEST_LATENCY = Histogram(
+    "triage_request_duration_seconds",
+    "End-to-end latency of triage requests",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS
+)
+
+ERRORS = Counter(
+    "triage_errors_total",
+    "Triage pipeline errors",
+    ["kind"]
+)
+
+RESULT_CACHE_LOOKUPS = Counter(
+    "triage_result_cache_lookups_total",
+    "Result cache lookups by outcome",
+    ["result"]
+)
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "triage_single_flight_calls_total",
+    "Calls that started (leader) or joined (follower) an in-flight computation",
+    ["name", "role"]
+)
+
+INFERENCE_QUEUE_DEPTH = Gauge(
+    "triage_inference_queue_depth",
+    "Callers waiting for an inference slot"
+)
+
+INFERENCE_IN_FLIGHT = Gauge(
+    "triage_inference_in_flight",
+    "Inference calls currently running"
+)
+
+INFERENCE_READY = Gauge(
+    "triage_inference_ready",
+    "1 once the models are loaded and warm"
+)
+
+
+def register_inference_pool(pool: Any):
+    """Expose an InferencePool's live state as gauges."""
+    INFERENCE_QUEUE_DEPTH.set_function(lambda: pool.stats()["queue_depth"])
+    INFERENCE_IN_FLIGHT.set_function(lambda: pool.stats()["in_flight"])
+    INFERENCE_READY.set_function(lambda: 1 if pool.ready else 0)
+
+
+def render_metrics() -> bytes:
+    """Metrics in the Prometheus text exposition format."""
+    return generate_latest()
+
+
+class StageTimings:
+    """Per-request stage latencies, recorded as histograms and a Server-Timing header."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Time a block as ``stage``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def add(self, stage: str, seconds: float):
+        """Add a measured duration to ``stage``."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def merge(self, timings: Optional[Dict[str, float]]):
+        """Add stage durations reported by the agent."""
+        for stage, seconds in (timings or {}).items():
+            self.add(stage, seconds)
+
+    def observe(self):
+        """Record every stage and the total into the histograms."""
+        for stage, seconds in self.stages.items():
+            STAGE_LATENCY.labels(stage=stage).observe(seconds)
+        REQUEST_LATENCY.labels(endpoint=self.endpoint).observe(time.perf_counter() - self.started)
+
+    def server_timing(self) -> str:
+        """Format the stages as a Server-Timing header value (durations in ms)."""
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
@@ -0,0 +1,181 @@
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+PERSIST_RPC_NAME = "persist_triage_analysis"
+BULK_PERSIST_RPC_NAME = "persist_triage_analyses"
+
+# PostgREST error code for "function not found in the schema cache"
+RPC_NOT_FOUND_CODE = "PGRST202"
+
+# RPCs found not to be installed, so later calls go straight to table writes
+_missing_rpcs = set()
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def persist_triage_analysis(
+    supabase: Client,
+    assessment_id: str,
+    update_data: Dict[str, Any],
+    diagnosis_rows: List[Dict[str, Any]]
+) -> Tuple[Dict[str, float], Optional[datetime]]:
+    """
+    Write the agent's analysis for one assessment.
+
+    Uses the persist_triage_analysis RPC so the diagnoses upsert and the
+    assessment update happen in a single round trip and transaction. If the
+    RPC is not installed, falls back to one bulk upsert plus one update; the
+    update is skipped if the upsert fails, so the row is never marked as
+    analyzed (analysis_input_hash) without its diagnoses.
+    Diagnosis ids are deterministic, so re-writing an analysis is idempotent.
+    Write failures are logged, not raised, so a response can still be served.
+
+    Returns:
+        Tuple[Dict[str, float], Optional[datetime]]: Latency in seconds of each
+            write that was made, and the assessment's updated_at after the
+            write, or None if nothing was written or the write failed
+    """
+    timings: Dict[str, float] = {}
+    if not update_data and not diagnosis_rows:
+        return timings, None
+
+    if PERSIST_RPC_NAME not in _missing_rpcs:
+        started = time.perf_counter()
+        try:
+            response = supabase.rpc(PERSIST_RPC_NAME, {
+                "p_assessment_id": assessment_id,
+                "p_update": update_data,
+                "p_diagnoses": diagnosis_rows
+            }).execute()
+            timings["rpc"] = time.perf_counter() - started
+            logger.info(
+                f"Persisted {len(diagnosis_rows)} diagnoses and assessment {assessment_id} "
+                f"via RPC in {timings['rpc'] * 1000:.1f} ms"
+            )
+            return timings, _parse_timestamp(response.data)
+        except APIError as e:
+            if e.code != RPC_NOT_FOUND_CODE:
+                logger.error(f"Failed to persist analysis for assessment {assessment_id}: {str(e)}")
+                return timings, None
+            logger.warning(f"RPC {PERSIST_RPC_NAME} is not installed, falling back to table writes")
+            _missing_rpcs.add(PERSIST_RPC_NAME)
+        except Exception as e:
+            logger.error(f"Failed to persist analysis for assessment {assessment_id}: {str(e)}")
+            return timings, None
+
+    if diagnosis_rows:
+        started = time.perf_counter()
+        try:
+            supabase.table("possible_diagnoses").upsert(diagnosis_rows, on_conflict="id").execute()
+            timings["upsert_diagnoses"] = time.perf_counter() - started
+            logger.info(
+                f"Saved {len(diagnosis_rows)} diagnoses for assessment {assessment_id} "
+                f"in {timings['upsert_diagnoses'] * 1000:.1f} ms"
+            )
+        except Exception as e:
+            logger.error(f"Failed to save diagnoses for assessment {assessment_id}, not updating it: {str(e)}")
+            return timings, None
+
+    # With diagnoses alone changed, touch the row like the RPC does; the
+    # update_assessments_updated_at trigger sets the actual value
+    values = update_data or {"updated_at": datetime.now(timezone.utc).isoformat()}
+    started = time.perf_counter()
+    try:
+        response = supabase.table("assessments").update(values).eq("id", assessment_id).execute()
+    except Exception as e:
+        logger.error(f"Failed to update assessment {assessment_id}: {str(e)}")
+        return timings, None
+    timings["update_assessment"] = time.perf_counter() - started
+    logger.info(
+        f"Updated assessment {assessment_id} with analysis results "
+        f"in {timings['update_assessment'] * 1000:.1f} ms"
+    )
+    return timings, _parse_timestamp(response.data[0].get("updated_at")) if response.data else None
+
+
+def persist_triage_analyses(
+    supabase: Client,
+    analyses: List[Tuple[str, Dict[str, Any], List[Dict[str, Any]]]]
+) -> Tuple[Dict[str, float], List[str]]:
+    """
+    Write the agent's analyses for many assessments in one bulk call.
+
+    Each analysis is an (assessment_id, update_data, diagnosis_rows) tuple.
+    Uses the persist_triage_analyses RPC (one round trip, one transaction);
+    if it is not installed, falls back to one bulk upsert of all diagnoses
+    plus one update per assessment. Failures are logged, not raised, and the
+    assessments whose analysis was not written are returned.
+
+    Returns:
+        Tuple[Dict[str, float], List[str]]: Latency in seconds of each kind of
+            write that was made, and the ids of the assessments that failed
+    """
+    timings: Dict[str, float] = {}
+    analyses = [a for a in analyses if a[1] or a[2]]
+    if not analyses:
+        return timings, []
+
+    diagnosis_rows = [row for _, _, rows in analyses for row in rows]
+
+    if BULK_PERSIST_RPC_NAME not in _missing_rpcs:
+        started = time.perf_counter()
+        try:
+            supabase.rpc(BULK_PERSIST_RPC_NAME, {
+                "p_analyses": [
+                    {"assessment_id": assessment_id, "update": update_data, "diagnoses": rows}
+                    for assessment_id, update_data, rows in analyses
+                ]
+            }).execute()
+            timings["rpc"] = time.perf_counter() - started
+            logger.info(
+                f"Persisted {len(analyses)} assessments and {len(diagnosis_rows)} diagnoses "
+                f"via RPC in {timings['rpc'] * 1000:.1f} ms"
+            )
+            return timings, []
+        except APIError as e:
+            if e.code != RPC_NOT_FOUND_CODE:
+                logger.error(f"Failed to persist batch of {len(analyses)} analyses: {str(e)}")
+                return timings, [assessment_id for assessment_id, _, _ in analyses]
+            logger.warning(f"RPC {BULK_PERSIST_RPC_NAME} is not installed, falling back to table writes")
+            _missing_rpcs.add(BULK_PERSIST_RPC_NAME)
+        except Exception as e:
+            logger.error(f"Failed to persist batch of {len(analyses)} analyses: {str(e)}")
+            return timings, [assessment_id for assessment_id, _, _ in analyses]
+
+    failed: List[str] = []
+    if diagnosis_rows:
+        started = time.perf_counter()
+        try:
+            supabase.table("possible_diagnoses").upsert(diagnosis_rows, on_conflict="id").execute()
+            timings["upsert_diagnoses"] = time.perf_counter() - started
+            logger.info(
+                f"Saved {len(diagnosis_rows)} diagnoses for {len(analyses)} assessments "
+                f"in {timings['upsert_diagnoses'] * 1000:.1f} ms"
+            )
+        except Exception as e:
+            logger.error(f"Failed to save batch of {len(diagnosis_rows)} diagnoses: {str(e)}")
+            failed = [assessment_id for assessment_id, _, rows in analyses if rows]
+
+    started = time.perf_counter()
+    for assessment_id, update_data, _ in analyses:
+        if not update_data or assessment_id in failed:
+            continue
+        try:
+            supabase.table("assessments").update(update_data).eq("id", assessment_id).execute()
+        except Exception as e:
+            logger.error(f"Failed to update assessment {assessment_id}: {str(e)}")
+            failed.append(assessment_id)
+    timings["update_assessments"] = time.perf_counter() - started
+
+    return timings, failed
@@ -0,0 +1,24 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# orjson serializes UUID, datetime and Enum natively; numpy covers agent scores
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class ModelJSONResponse(JSONResponse):
+    """JSON response encoded with orjson.
+
+    Returning one of these from a route bypasses FastAPI's response_model
+    re-validation, so a model that was validated when it was built from the
+    database rows is dumped once and encoded directly.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            content = content.model_dump()
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
@@ -0,0 +1,90 @@
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from models.triage import TriageData
+from api.metrics import RESULT_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Columns the image analysis fills in; required only when the assessment has an image
+IMAGE_ANALYSIS_FIELDS = ("predicted_injury_label", "severity_score", "triage_recommendation")
+
+
+def input_hash(symptom_description: Optional[str], image_url: Optional[str]) -> str:
+    """Hash of the inputs the agent analyzes for an assessment."""
+    digest = hashlib.sha256()
+    digest.update((symptom_description or "").encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update((image_url or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+def is_analyzed(triage_data: TriageData) -> bool:
+    """
+    Whether the persisted row carries a complete agent analysis.
+
+    analysis_input_hash is only written with a successful analysis. The
+    image columns are also required when there is an image; a text-only
+    analysis writes diagnoses alone.
+    """
+    if triage_data.analysis_input_hash is None:
+        return False
+    if not triage_data.image_url:
+        return True
+    return all(getattr(triage_data, field) is not None for field in IMAGE_ANALYSIS_FIELDS)
+
+
+class ResultCache:
+    """Decides whether a persisted analysis can be served without re-running the agent.
+
+    The persisted assessment row holds the cached result, and its
+    analysis_input_hash column holds the hash of the symptom_description and
+    image_url the analysis was made from. An analysis is reused only while
+    that hash matches the row's current inputs, so the decision is the same
+    on every worker and survives restarts. Rows analyzed before the column
+    existed have no hash and are analyzed once more.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, triage_data: TriageData) -> bool:
+        """Return True (a hit) if triage_data's persisted analysis is current."""
+        current = input_hash(triage_data.symptom_description, triage_data.image_url)
+        hit = is_analyzed(triage_data) and triage_data.analysis_input_hash == current
+        if not hit and triage_data.analysis_input_hash not in (None, current):
+            logger.info(f"Inputs changed for assessment {triage_data.id}, analysis is stale")
+
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        RESULT_CACHE_LOOKUPS.labels(result="hit" if hit else "miss").inc()
+        return hit
+
+    def record(self, triage_data: TriageData) -> Dict[str, Any]:
+        """
+        Mark a fresh analysis as made from triage_data's current inputs.
+
+        Returns:
+            Dict[str, Any]: The assessment column to write with the analysis, empty if unchanged
+        """
+        current = input_hash(triage_data.symptom_description, triage_data.image_url)
+        if triage_data.analysis_input_hash == current:
+            return {}
+        triage_data.analysis_input_hash = current
+        return {"analysis_input_hash": current}
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from api.metrics import SINGLE_FLIGHT_CALLS
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one computation.
+
+    The first caller for a key (the leader) starts the computation as a task;
+    callers that arrive while it is running (followers) await that same task
+    and get its result or exception. The task is shielded, so a caller that
+    disconnects does not cancel the work the others are waiting on.
+    """
+
+    def __init__(self, name: str = "triage"):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a computation for key is currently running."""
+        return key in self._in_flight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or join the computation already running for it."""
+        return await asyncio.shield(self.task(key, fn))
+
+    def task(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """
+        The computation running for key, starting fn() as it if there is none.
+
+        Unlike do(), the key is registered before returning, without yielding
+        to the event loop, so a caller can claim several keys at once.
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.followers += 1
+            SINGLE_FLIGHT_CALLS.labels(name=self.name, role="follower").inc()
+            logger.info(f"Joining in-flight {self.name} computation for {key}")
+            return task
+
+        self.leaders += 1
+        SINGLE_FLIGHT_CALLS.labels(name=self.name, role="leader").inc()
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return task
+
+    def stats(self) -> Dict[str, Any]:
+        """Leader/follower counters and the number of running computations."""
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders,
+            "followers": self.followers
+        }
@@ -0,0 +1,100 @@
+import unittest
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+sys.path.append('.')  # Run from backend/
+from api.claims import AnalysisClaims, CLAIM_RPC_NAME, RELEASE_RPC_NAME
+from bench.fake_supabase import InMemorySupabase
+
+ASSESSMENT_ID = "6f1c2b1e-4a53-4e1f-9d4c-0a4f3c7b9e21"
+UPDATED_AT = "2025-01-01T00:00:00+00:00"
+
+class TestAnalysisClaims(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with one assessment and two workers"""
+        self.db = InMemorySupabase()
+        self.db.insert_rows("assessments", [{
+            "id": ASSESSMENT_ID,
+            "symptom_description": "Itchy rash",
+            "created_at": UPDATED_AT,
+            "updated_at": UPDATED_AT
+        }])
+        self.first = AnalysisClaims(self.db, ttl_seconds=60, poll_interval=0.01, worker_id="worker-1")
+        self.second = AnalysisClaims(self.db, ttl_seconds=60, poll_interval=0.01, worker_id="worker-2")
+
+    def test_claim_is_exclusive_until_released(self):
+        """Test that only one worker holds a claim and another can take it after release"""
+        self.assertTrue(self.first.try_claim(ASSESSMENT_ID))
+        self.assertTrue(self.first.try_claim(ASSESSMENT_ID), "The holder should be able to renew its claim")
+        self.assertFalse(self.second.try_claim(ASSESSMENT_ID))
+        self.assertEqual(self.second.contended, 1)
+
+        self.second.release(ASSESSMENT_ID)
+        self.assertFalse(self.second.try_claim(ASSESSMENT_ID), "Releasing someone else's claim should do nothing")
+
+        self.first.release(ASSESSMENT_ID)
+        self.assertTrue(self.second.try_claim(ASSESSMENT_ID))
+
+    def test_claims_do_not_touch_assessments(self):
+        """Test that claiming and releasing leave the assessment row and its updated_at alone"""
+        before = dict(self.db.tables["assessments"][ASSESSMENT_ID])
+        self.first.try_claim(ASSESSMENT_ID)
+        self.second.try_claim(ASSESSMENT_ID)
+        self.first.release(ASSESSMENT_ID)
+        self.assertEqual(self.db.tables["assessments"][ASSESSMENT_ID], before)
+
+    def test_expired_claim_can_be_taken_over(self):
+        """Test that a claim older than the TTL no longer blocks other workers"""
+        self.assertTrue(self.first.try_claim(ASSESSMENT_ID))
+        stale = datetime.now(timezone.utc) - timedelta(seconds=120)
+        self.db.tables["triage_analysis_claims"][ASSESSMENT_ID]["claimed_at"] = stale.isoformat()
+        self.assertTrue(self.second.try_claim(ASSESSMENT_ID))
+
+    def test_unknown_assessment_is_not_claimed(self):
+        """Test that claiming a missing assessment fails"""
+        self.assertFalse(self.first.try_claim("00000000-0000-0000-0000-000000000000"))
+
+    def test_wait_returns_when_claim_is_released(self):
+        """Test that a contending worker wakes up once the holder releases"""
+        self.assertTrue(self.first.try_claim(ASSESSMENT_ID))
+
+        async def release_later():
+            await asyncio.sleep(0.05)
+            self.first.release(ASSESSMENT_ID)
+
+        async def wait():
+            releaser = asyncio.create_task(release_later())
+            released = await self.second.wait_released(ASSESSMENT_ID)
+            await releaser
+            return released
+
+        self.assertTrue(asyncio.run(wait()))
+        self.assertTrue(self.second.try_claim(ASSESSMENT_ID))
+
+    def test_wait_gives_up_on_expired_claim(self):
+        """Test that waiting stops with False once the holder's claim has expired"""
+        self.assertTrue(self.first.try_claim(ASSESSMENT_ID))
+        stale = datetime.now(timezone.utc) - timedelta(seconds=120)
+        self.db.tables["triage_analysis_claims"][ASSESSMENT_ID]["claimed_at"] = stale.isoformat()
+        self.assertFalse(asyncio.run(self.second.wait_released(ASSESSMENT_ID)))
+
+    def test_missing_rpcs_disable_claims(self):
+        """Test that PGRST202 (RPC not installed) makes every claim succeed"""
+        del self.db.rpcs[CLAIM_RPC_NAME]
+        del self.db.rpcs[RELEASE_RPC_NAME]
+
+        self.assertTrue(self.first.try_claim(ASSESSMENT_ID))
+        self.assertFalse(self.first.enabled, "Claims should be disabled after PGRST202")
+        self.assertTrue(self.first.try_claim(ASSESSMENT_ID))
+        self.first.release(ASSESSMENT_ID)
+        self.assertEqual(self.db.tables["triage_analysis_claims"], {})
+
+    def test_zero_ttl_disables_claims(self):
+        """Test that a TTL of 0 turns claims off without calling the database"""
+        claims = AnalysisClaims(self.db, ttl_seconds=0, worker_id="worker-3")
+        calls = self.db.calls
+        self.assertTrue(claims.try_claim(ASSESSMENT_ID))
+        self.assertEqual(self.db.calls, calls)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
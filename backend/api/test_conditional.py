@@ -0,0 +1,87 @@
+import unittest
+import struct
+import sys
+from datetime import datetime, timedelta, timezone
+sys.path.append('.')  # Run from backend/
+from api.conditional import compute_etag, http_date, is_not_modified, row_validators, triage_validators
+from models.triage import TriageData
+
+ASSESSMENT_ID = "6f1c2b1e-4a53-4e1f-9d4c-0a4f3c7b9e21"
+DIAGNOSIS_IDS = ["0b0f8f0e-1c6e-5d2a-9d1e-6a3c2f1b0a01", "0b0f8f0e-1c6e-5d2a-9d1e-6a3c2f1b0a02"]
+UPDATED_AT = datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+def as_real(value):
+    """Round a float to single precision, as a Postgres REAL column stores it"""
+    return struct.unpack('f', struct.pack('f', value))[0]
+
+class TestEtag(unittest.TestCase):
+    def test_etag_ignores_timestamp_format_and_diagnosis_order(self):
+        """Test that the same state read back in another format hashes the same"""
+        etag = compute_etag(UPDATED_AT, [(DIAGNOSIS_IDS[0], 0.8), (DIAGNOSIS_IDS[1], 0.1)])
+        self.assertEqual(etag, compute_etag("2025-03-01T12:30:15.123456Z", [(DIAGNOSIS_IDS[1], 0.1), (DIAGNOSIS_IDS[0], 0.8)]))
+        self.assertEqual(etag, compute_etag("2025-03-01T14:30:15.123456+02:00", [(DIAGNOSIS_IDS[0], 0.8), (DIAGNOSIS_IDS[1], 0.1)]))
+
+    def test_etag_ignores_real_precision_loss(self):
+        """Test that a confidence stored as REAL hashes the same as the value written"""
+        written = compute_etag(UPDATED_AT, [(DIAGNOSIS_IDS[0], 0.1)])
+        read_back = compute_etag(UPDATED_AT, [(DIAGNOSIS_IDS[0], as_real(0.1))])
+        self.assertEqual(written, read_back)
+
+    def test_etag_changes_with_content(self):
+        """Test that updated_at, a confidence or the diagnosis set changes the ETag"""
+        etag = compute_etag(UPDATED_AT, [(DIAGNOSIS_IDS[0], 0.8)])
+        self.assertNotEqual(etag, compute_etag(UPDATED_AT + timedelta(microseconds=1), [(DIAGNOSIS_IDS[0], 0.8)]))
+        self.assertNotEqual(etag, compute_etag(UPDATED_AT, [(DIAGNOSIS_IDS[0], 0.7)]))
+        self.assertNotEqual(etag, compute_etag(UPDATED_AT, [(DIAGNOSIS_IDS[0], 0.8), (DIAGNOSIS_IDS[1], 0.1)]))
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'), "ETag should be a quoted strong tag")
+
+    def test_triage_and_row_validators_agree(self):
+        """Test that the full model and the validator-only rows give the same ETag"""
+        triage_data = TriageData.model_validate({
+            "id": ASSESSMENT_ID,
+            "user_id": ASSESSMENT_ID,
+            "symptom_description": "Itchy rash",
+            "possible_diagnoses": [{
+                "id": DIAGNOSIS_IDS[0],
+                "assessment_id": ASSESSMENT_ID,
+                "name": "Eczema",
+                "confidence": 0.8,
+                "created_at": UPDATED_AT
+            }],
+            "created_at": UPDATED_AT,
+            "updated_at": UPDATED_AT
+        })
+        rows = ({"updated_at": "2025-03-01T12:30:15.123456+00:00"}, [{"id": DIAGNOSIS_IDS[0], "confidence": 0.8}])
+        self.assertEqual(triage_validators(triage_data), row_validators(*rows))
+
+class TestIsNotModified(unittest.TestCase):
+    def setUp(self):
+        self.etag = compute_etag(UPDATED_AT, [(DIAGNOSIS_IDS[0], 0.8)])
+
+    def test_if_none_match(self):
+        """Test strong, weak, listed and wildcard If-None-Match values"""
+        self.assertTrue(is_not_modified(self.etag, UPDATED_AT, self.etag, None))
+        self.assertTrue(is_not_modified(self.etag, UPDATED_AT, f'W/{self.etag}', None))
+        self.assertTrue(is_not_modified(self.etag, UPDATED_AT, f'"other", {self.etag}', None))
+        self.assertTrue(is_not_modified(self.etag, UPDATED_AT, "*", None))
+        self.assertFalse(is_not_modified(self.etag, UPDATED_AT, '"other"', None))
+
+    def test_if_modified_since(self):
+        """Test If-Modified-Since at second precision, since HTTP-dates have no fractions"""
+        self.assertTrue(is_not_modified(self.etag, UPDATED_AT, None, http_date(UPDATED_AT)))
+        later = http_date(UPDATED_AT + timedelta(seconds=1))
+        self.assertTrue(is_not_modified(self.etag, UPDATED_AT, None, later))
+        earlier = http_date(UPDATED_AT - timedelta(seconds=1))
+        self.assertFalse(is_not_modified(self.etag, UPDATED_AT, None, earlier))
+        self.assertFalse(is_not_modified(self.etag, UPDATED_AT, None, "not a date"))
+
+    def test_if_none_match_takes_precedence(self):
+        """Test that If-Modified-Since is ignored when If-None-Match is sent"""
+        self.assertFalse(is_not_modified(self.etag, UPDATED_AT, '"other"', http_date(UPDATED_AT)))
+
+    def test_no_conditions(self):
+        """Test that an unconditional request is always modified"""
+        self.assertFalse(is_not_modified(self.etag, UPDATED_AT, None, None))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,89 @@
+import unittest
+import base64
+import sys
+sys.path.append('.')  # Run from backend/
+from api.data_access import decode_cursor, encode_cursor, fetch_assessment_page
+from bench.fake_supabase import InMemorySupabase
+
+USER_ID = "9a7d3c1e-0000-4000-8000-000000000001"
+OTHER_USER_ID = "9a7d3c1e-0000-4000-8000-000000000002"
+
+def assessment(index, created_at, user_id=USER_ID):
+    return {
+        "id": f"6f1c2b1e-4a53-4e1f-9d4c-{index:012d}",
+        "user_id": user_id,
+        "created_at": created_at,
+        "updated_at": created_at
+    }
+
+class TestCursor(unittest.TestCase):
+    def test_round_trip(self):
+        """Test that a cursor decodes to the position it was made from"""
+        position = ("2025-03-01T12:30:15.123456+00:00", "6f1c2b1e-4a53-4e1f-9d4c-000000000001")
+        cursor = encode_cursor(*position)
+        self.assertEqual(decode_cursor(cursor), position)
+        self.assertNotIn("|", cursor, "The cursor should be opaque")
+
+    def test_invalid_cursors(self):
+        """Test that malformed cursors raise ValueError"""
+        invalid = [
+            "not base64!",
+            base64.urlsafe_b64encode(b"no separator").decode("ascii"),
+            encode_cursor("yesterday", "6f1c2b1e-4a53-4e1f-9d4c-000000000001"),
+            encode_cursor("2025-03-01T12:30:15+00:00", "not-a-uuid"),
+            encode_cursor("2025-03-01T12:30:15+00:00", "a|b"),
+        ]
+        for cursor in invalid:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError):
+                    decode_cursor(cursor)
+
+class TestAssessmentPage(unittest.TestCase):
+    def setUp(self):
+        """Set up assessments where several share a created_at"""
+        self.db = InMemorySupabase()
+        self.rows = [
+            assessment(1, "2025-03-01T10:00:00+00:00"),
+            assessment(2, "2025-03-01T11:00:00+00:00"),
+            assessment(3, "2025-03-01T11:00:00+00:00"),
+            assessment(4, "2025-03-01T11:00:00+00:00"),
+            assessment(5, "2025-03-01T12:00:00+00:00"),
+            assessment(6, "2025-03-01T12:30:00+00:00", user_id=OTHER_USER_ID),
+        ]
+        self.db.insert_rows("assessments", self.rows)
+
+    def pages(self, limit, user_id=None):
+        """Follow next_cursor until the last page and return the pages' ids"""
+        pages, cursor = [], None
+        while True:
+            rows, cursor = fetch_assessment_page(self.db, user_id=user_id, after=cursor, limit=limit, columns="id,created_at")
+            pages.append([row["id"] for row in rows])
+            if cursor is None:
+                return pages
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        """Test that paging through ties on created_at neither skips nor repeats rows"""
+        expected = [row["id"] for row in sorted(self.rows, key=lambda r: (r["created_at"], r["id"]), reverse=True)]
+        for limit in (1, 2, 4, 10):
+            with self.subTest(limit=limit):
+                pages = self.pages(limit)
+                self.assertEqual([i for page in pages for i in page], expected)
+                self.assertTrue(all(len(page) <= limit for page in pages))
+
+    def test_last_page_has_no_cursor(self):
+        """Test that a full final page does not produce an empty extra page"""
+        self.assertEqual([len(page) for page in self.pages(3)], [3, 3])
+
+    def test_user_filter(self):
+        """Test that only the given user's assessments are listed"""
+        ids = [i for page in self.pages(2, user_id=OTHER_USER_ID) for i in page]
+        self.assertEqual(ids, [self.rows[5]["id"]])
+
+    def test_invalid_cursor_is_rejected(self):
+        """Test that a malformed cursor raises ValueError before querying"""
+        with self.assertRaises(ValueError):
+            fetch_assessment_page(self.db, after="garbage")
+        self.assertEqual(self.db.calls, 0)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
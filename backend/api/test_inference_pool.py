@@ -0,0 +1,111 @@
+import unittest
+import asyncio
+import sys
+import threading
+sys.path.append('.')  # Run from backend/
+from api.inference_pool import InferencePool, InferencePoolFull, InferencePoolNotReady
+
+class StubAgent:
+    """Agent with the pool's interface whose calls block until released"""
+
+    def __init__(self, loaded=True):
+        self.loaded = loaded
+        self.release = threading.Event()
+
+    def warm_up(self):
+        return {"classifier": self.loaded, "embedder": True, "faiss_index": True}
+
+    def invoke(self, query):
+        self.release.wait(5)
+        return {"query": query}
+
+    def fail(self):
+        raise ValueError("boom")
+
+    def invoke_stages(self, query):
+        for stage in ("image_classification", "relevant_conditions"):
+            yield {"stage": stage, "query": query}
+
+class TestInferencePool(unittest.TestCase):
+    def run_with_pool(self, test, agent=None, **kwargs):
+        """Start a thread pool around agent, run test(pool, agent) and shut the pool down"""
+        agent = agent or StubAgent()
+
+        async def run():
+            pool = InferencePool(lambda: agent, **kwargs)
+            try:
+                await pool.start()
+                return await test(pool, agent)
+            finally:
+                agent.release.set()
+                pool.shutdown()
+
+        return asyncio.run(run())
+
+    def test_rejects_before_models_are_loaded(self):
+        """Test that calls before start() raise InferencePoolNotReady"""
+        async def run():
+            pool = InferencePool(StubAgent)
+            try:
+                with self.assertRaises(InferencePoolNotReady) as raised:
+                    await pool.run("invoke", "rash")
+                self.assertEqual(raised.exception.retry_after, 10)
+                self.assertTrue(pool.is_saturated())
+            finally:
+                pool.shutdown()
+
+        asyncio.run(run())
+
+    def test_rejects_when_a_model_failed_to_load(self):
+        """Test that a failed readiness check keeps the pool not ready"""
+        async def test(pool, agent):
+            self.assertFalse(pool.ready)
+            self.assertIn("classifier", pool.load_error)
+            with self.assertRaises(InferencePoolNotReady):
+                await pool.run("invoke", "rash")
+
+        self.run_with_pool(test, StubAgent(loaded=False))
+
+    def test_rejects_when_queue_is_full(self):
+        """Test that callers beyond max_in_flight + max_queue get InferencePoolFull"""
+        async def test(pool, agent):
+            running = asyncio.create_task(pool.run("invoke", "first"))
+            waiting = asyncio.create_task(pool.run("invoke", "second"))
+            await asyncio.sleep(0.05)
+            self.assertEqual((pool.stats()["in_flight"], pool.stats()["queue_depth"]), (1, 1))
+            self.assertTrue(pool.is_saturated())
+
+            with self.assertRaises(InferencePoolFull):
+                await pool.run("invoke", "third")
+            self.assertEqual(pool.rejected_count, 1)
+
+            agent.release.set()
+            self.assertEqual(await running, {"query": "first"})
+            self.assertEqual(await waiting, {"query": "second"})
+            await asyncio.sleep(0)
+            stats = pool.stats()
+            self.assertEqual((stats["in_flight"], stats["queue_depth"], stats["completed"]), (0, 0, 2))
+
+        self.run_with_pool(test, max_in_flight=1, max_queue=1)
+
+    def test_errors_are_raised_and_counted(self):
+        """Test that an agent exception reaches the caller and frees the slot"""
+        async def test(pool, agent):
+            with self.assertRaises(ValueError):
+                await pool.run("fail")
+            await asyncio.sleep(0)
+            self.assertEqual(pool.error_count, 1)
+            self.assertEqual(pool.stats()["in_flight"], 0)
+
+        self.run_with_pool(test)
+
+    def test_stream_yields_each_stage(self):
+        """Test that stream() forwards the generator's items in order"""
+        async def test(pool, agent):
+            return [item async for item in pool.stream("invoke_stages", "rash")]
+
+        stages = self.run_with_pool(test)
+        self.assertEqual([s["stage"] for s in stages], ["image_classification", "relevant_conditions"])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
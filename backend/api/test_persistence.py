@@ -0,0 +1,181 @@
+import unittest
+import sys
+from datetime import datetime
+from postgrest.exceptions import APIError
+sys.path.append('.')  # Run from backend/
+from api import persistence
+from api.persistence import BULK_PERSIST_RPC_NAME, PERSIST_RPC_NAME, persist_triage_analyses, persist_triage_analysis
+from bench.fake_supabase import InMemorySupabase
+
+ASSESSMENT_ID = "6f1c2b1e-4a53-4e1f-9d4c-0a4f3c7b9e21"
+OTHER_ASSESSMENT_ID = "6f1c2b1e-4a53-4e1f-9d4c-0a4f3c7b9e22"
+DIAGNOSIS_ID = "0b0f8f0e-1c6e-5d2a-9d1e-6a3c2f1b0a01"
+UPDATED_AT = "2025-01-01T00:00:00+00:00"
+
+def diagnosis_row(confidence):
+    return {
+        "id": DIAGNOSIS_ID,
+        "assessment_id": ASSESSMENT_ID,
+        "diagnosis_name": "Eczema",
+        "confidence_score": confidence,
+        "description": None
+    }
+
+def raise_api_error(params):
+    raise APIError({"code": "57014", "message": "canceling statement due to statement timeout"})
+
+class FailingDiagnosesSupabase(InMemorySupabase):
+    """In-memory database whose possible_diagnoses writes fail"""
+
+    def table(self, name):
+        if name == "possible_diagnoses":
+            raise APIError({"code": "42501", "message": "permission denied for table possible_diagnoses"})
+        return super().table(name)
+
+class TestPersistTriageAnalysis(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with one assessment and forget missing RPCs"""
+        persistence._missing_rpcs.clear()
+        self.db = InMemorySupabase()
+        self.db.insert_rows("assessments", [{
+            "id": ASSESSMENT_ID,
+            "symptom_description": "Itchy rash",
+            "created_at": UPDATED_AT,
+            "updated_at": UPDATED_AT
+        }])
+
+    def tearDown(self):
+        persistence._missing_rpcs.clear()
+
+    def stored_updated_at(self):
+        return datetime.fromisoformat(self.db.tables["assessments"][ASSESSMENT_ID]["updated_at"])
+
+    def test_rpc_returns_new_updated_at(self):
+        """Test that the RPC writes everything and returns the bumped updated_at"""
+        timings, updated_at = persist_triage_analysis(
+            self.db, ASSESSMENT_ID, {"severity_score": 3}, [diagnosis_row(0.8)]
+        )
+        self.assertIn("rpc", timings)
+        self.assertEqual(self.db.calls, 1, "The write should be a single round trip")
+        self.assertGreater(updated_at, datetime.fromisoformat(UPDATED_AT))
+        self.assertEqual(updated_at, self.stored_updated_at())
+        self.assertEqual(self.db.tables["assessments"][ASSESSMENT_ID]["severity_score"], 3)
+        self.assertEqual(self.db.tables["possible_diagnoses"][DIAGNOSIS_ID]["confidence_score"], 0.8)
+
+    def test_diagnoses_only_write_returns_new_updated_at(self):
+        """Test that a diagnoses-only write through the RPC also reports updated_at"""
+        _, updated_at = persist_triage_analysis(self.db, ASSESSMENT_ID, {}, [diagnosis_row(0.8)])
+        self.assertEqual(updated_at, self.stored_updated_at())
+
+    def test_nothing_to_write(self):
+        """Test that an unchanged analysis makes no database call"""
+        self.assertEqual(persist_triage_analysis(self.db, ASSESSMENT_ID, {}, []), ({}, None))
+        self.assertEqual(self.db.calls, 0)
+
+    def test_fallback_returns_new_updated_at(self):
+        """Test that the table-write fallback reports updated_at from the update"""
+        del self.db.rpcs[PERSIST_RPC_NAME]
+        timings, updated_at = persist_triage_analysis(
+            self.db, ASSESSMENT_ID, {"severity_score": 3}, [diagnosis_row(0.8)]
+        )
+        self.assertEqual(set(timings), {"upsert_diagnoses", "update_assessment"})
+        self.assertEqual(updated_at, self.stored_updated_at())
+        self.assertEqual(self.db.tables["assessments"][ASSESSMENT_ID]["severity_score"], 3)
+
+    def test_fallback_skips_update_when_diagnoses_fail(self):
+        """Test that a failed diagnoses upsert leaves the assessment unmarked and reports the failure"""
+        db = FailingDiagnosesSupabase()
+        db.tables["assessments"] = self.db.tables["assessments"]
+        del db.rpcs[PERSIST_RPC_NAME]
+        update = {"severity_score": 3, "analysis_input_hash": "abc"}
+        _, updated_at = persist_triage_analysis(db, ASSESSMENT_ID, update, [diagnosis_row(0.8)])
+
+        self.assertIsNone(updated_at)
+        stored = db.tables["assessments"][ASSESSMENT_ID]
+        self.assertNotIn("analysis_input_hash", stored)
+        self.assertNotIn("severity_score", stored)
+        self.assertEqual(stored["updated_at"], UPDATED_AT)
+
+    def test_fallback_touches_row_for_diagnoses_only_change(self):
+        """Test that the fallback bumps updated_at when only diagnoses changed, like the RPC"""
+        del self.db.rpcs[PERSIST_RPC_NAME]
+        _, updated_at = persist_triage_analysis(self.db, ASSESSMENT_ID, {}, [diagnosis_row(0.8)])
+        self.assertGreater(updated_at, datetime.fromisoformat(UPDATED_AT))
+        self.assertEqual(updated_at, self.stored_updated_at())
+
+    def test_missing_rpc_is_only_tried_once(self):
+        """Test that after PGRST202 later writes go straight to the tables"""
+        del self.db.rpcs[PERSIST_RPC_NAME]
+        persist_triage_analysis(self.db, ASSESSMENT_ID, {"severity_score": 3}, [diagnosis_row(0.8)])
+        self.assertIn(PERSIST_RPC_NAME, persistence._missing_rpcs)
+
+        calls = self.db.calls
+        persist_triage_analysis(self.db, ASSESSMENT_ID, {"severity_score": 4}, [diagnosis_row(0.7)])
+        self.assertEqual(self.db.calls - calls, 2, "Expected one upsert and one update, no RPC attempt")
+        self.assertEqual(self.db.tables["possible_diagnoses"][DIAGNOSIS_ID]["confidence_score"], 0.7)
+
+    def test_other_rpc_errors_do_not_fall_back(self):
+        """Test that an RPC failure other than PGRST202 writes nothing and keeps the RPC"""
+        self.db.rpcs[PERSIST_RPC_NAME] = raise_api_error
+        timings, updated_at = persist_triage_analysis(self.db, ASSESSMENT_ID, {"severity_score": 3}, [diagnosis_row(0.8)])
+        self.assertEqual((timings, updated_at), ({}, None))
+        self.assertNotIn(PERSIST_RPC_NAME, persistence._missing_rpcs)
+        self.assertEqual(self.db.tables["possible_diagnoses"], {})
+        self.assertNotIn("severity_score", self.db.tables["assessments"][ASSESSMENT_ID])
+
+class TestPersistTriageAnalyses(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with two assessments and forget missing RPCs"""
+        persistence._missing_rpcs.clear()
+        self.db = self.database()
+
+    def tearDown(self):
+        persistence._missing_rpcs.clear()
+
+    def database(self, cls=InMemorySupabase):
+        db = cls()
+        db.insert_rows("assessments", [
+            {"id": assessment_id, "created_at": UPDATED_AT, "updated_at": UPDATED_AT}
+            for assessment_id in (ASSESSMENT_ID, OTHER_ASSESSMENT_ID)
+        ])
+        return db
+
+    def analyses(self):
+        return [
+            (ASSESSMENT_ID, {"severity_score": 3}, [diagnosis_row(0.8)]),
+            (OTHER_ASSESSMENT_ID, {"severity_score": 2}, []),
+        ]
+
+    def test_bulk_rpc(self):
+        """Test that every analysis is written in one round trip"""
+        timings, failed = persist_triage_analyses(self.db, self.analyses())
+        self.assertEqual((set(timings), failed, self.db.calls), ({"rpc"}, [], 1))
+        self.assertEqual(self.db.tables["assessments"][OTHER_ASSESSMENT_ID]["severity_score"], 2)
+
+    def test_bulk_fallback_writes_everything(self):
+        """Test that without the bulk RPC all diagnoses and assessments are still written"""
+        del self.db.rpcs[BULK_PERSIST_RPC_NAME]
+        timings, failed = persist_triage_analyses(self.db, self.analyses())
+        self.assertEqual(failed, [])
+        self.assertEqual(set(timings), {"upsert_diagnoses", "update_assessments"})
+        self.assertIn(DIAGNOSIS_ID, self.db.tables["possible_diagnoses"])
+        self.assertEqual(self.db.tables["assessments"][ASSESSMENT_ID]["severity_score"], 3)
+        self.assertEqual(self.db.tables["assessments"][OTHER_ASSESSMENT_ID]["severity_score"], 2)
+
+    def test_bulk_fallback_reports_assessments_whose_diagnoses_failed(self):
+        """Test that a failed diagnoses upsert fails only the assessments that had diagnoses"""
+        db = self.database(FailingDiagnosesSupabase)
+        del db.rpcs[BULK_PERSIST_RPC_NAME]
+        _, failed = persist_triage_analyses(db, self.analyses())
+        self.assertEqual(failed, [ASSESSMENT_ID])
+        self.assertNotIn("severity_score", db.tables["assessments"][ASSESSMENT_ID])
+        self.assertEqual(db.tables["assessments"][OTHER_ASSESSMENT_ID]["severity_score"], 2)
+
+    def test_bulk_rpc_error_fails_every_assessment(self):
+        """Test that a failed bulk RPC reports all assessments, since its transaction rolled back"""
+        self.db.rpcs[BULK_PERSIST_RPC_NAME] = raise_api_error
+        _, failed = persist_triage_analyses(self.db, self.analyses())
+        self.assertEqual(failed, [ASSESSMENT_ID, OTHER_ASSESSMENT_ID])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,75 @@
+import unittest
+import sys
+sys.path.append('.')  # Run from backend/
+from api.result_cache import ResultCache, input_hash
+from models.triage import TriageData
+
+ASSESSMENT_ID = "6f1c2b1e-4a53-4e1f-9d4c-0a4f3c7b9e21"
+UPDATED_AT = "2025-01-01T00:00:00+00:00"
+IMAGE_URL = "https://example.supabase.co/storage/v1/object/sign/images/rash.jpg"
+IMAGE_ANALYSIS = {
+    "predicted_injury_label": "Eczema",
+    "severity_score": 3,
+    "triage_recommendation": "Seek urgent medical care for Eczema."
+}
+
+def triage_data(**fields):
+    return TriageData.model_validate({
+        "id": ASSESSMENT_ID,
+        "user_id": ASSESSMENT_ID,
+        "symptom_description": "Itchy rash",
+        "created_at": UPDATED_AT,
+        "updated_at": UPDATED_AT,
+        **fields
+    })
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResultCache()
+
+    def test_text_only_assessment_is_a_hit(self):
+        """Test that a text-only analysis is served again, although it sets no image columns"""
+        data = triage_data()
+        self.assertFalse(self.cache.lookup(data), "Never analyzed: no hash yet")
+        self.assertEqual(self.cache.record(data), {"analysis_input_hash": input_hash("Itchy rash", None)})
+
+        stored = triage_data(analysis_input_hash=data.analysis_input_hash)
+        self.assertTrue(self.cache.lookup(stored))
+
+    def test_image_assessment_needs_image_columns(self):
+        """Test that an assessment with an image is a hit only with its image analysis"""
+        current = input_hash("Itchy rash", IMAGE_URL)
+        self.assertTrue(self.cache.lookup(triage_data(image_url=IMAGE_URL, analysis_input_hash=current, **IMAGE_ANALYSIS)))
+        for missing in IMAGE_ANALYSIS:
+            with self.subTest(missing=missing):
+                fields = {**IMAGE_ANALYSIS, missing: None}
+                self.assertFalse(self.cache.lookup(triage_data(image_url=IMAGE_URL, analysis_input_hash=current, **fields)))
+
+    def test_changed_inputs_are_a_miss(self):
+        """Test that editing the symptoms or the image invalidates the analysis"""
+        recorded = input_hash("Itchy rash", IMAGE_URL)
+        self.assertFalse(self.cache.lookup(triage_data(
+            symptom_description="Itchy rash, now spreading", image_url=IMAGE_URL, analysis_input_hash=recorded, **IMAGE_ANALYSIS
+        )))
+        self.assertFalse(self.cache.lookup(triage_data(
+            image_url=IMAGE_URL + "?v=2", analysis_input_hash=recorded, **IMAGE_ANALYSIS
+        )))
+
+    def test_analysis_without_hash_is_a_miss(self):
+        """Test that rows analyzed before the hash column existed are analyzed once more"""
+        self.assertFalse(self.cache.lookup(triage_data(image_url=IMAGE_URL, **IMAGE_ANALYSIS)))
+
+    def test_record_is_empty_when_unchanged(self):
+        """Test that re-recording the same inputs writes nothing"""
+        data = triage_data(analysis_input_hash=input_hash("Itchy rash", None))
+        self.assertEqual(self.cache.record(data), {})
+
+    def test_stats(self):
+        """Test the hit/miss counters"""
+        data = triage_data(analysis_input_hash=input_hash("Itchy rash", None))
+        self.cache.lookup(data)
+        self.cache.lookup(triage_data())
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
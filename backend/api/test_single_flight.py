@@ -0,0 +1,105 @@
+import unittest
+import asyncio
+import sys
+sys.path.append('.')  # Run from backend/
+from api.single_flight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_computation(self):
+        """Test that callers for the same key get the leader's result and fn runs once"""
+        flight = SingleFlight("test")
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def run():
+            return await asyncio.gather(*(flight.do("key", compute) for _ in range(5)))
+
+        self.assertEqual(asyncio.run(run()), ["result"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats(), {"in_flight": 0, "leaders": 1, "followers": 4})
+
+    def test_different_keys_run_separately(self):
+        """Test that only calls for the same key are coalesced"""
+        flight = SingleFlight("test")
+
+        async def compute(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        async def run():
+            return await asyncio.gather(flight.do("a", lambda: compute("a")), flight.do("b", lambda: compute("b")))
+
+        self.assertEqual(asyncio.run(run()), ["a", "b"])
+        self.assertEqual(flight.leaders, 2)
+
+    def test_exception_reaches_every_caller(self):
+        """Test that the leader's exception is raised to followers too, and the key is freed"""
+        flight = SingleFlight("test")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def run():
+            results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+            return results, flight.in_flight("key")
+
+        results, in_flight = asyncio.run(run())
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertIsInstance(result, ValueError)
+        self.assertFalse(in_flight)
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that a disconnecting caller leaves the shared computation running"""
+        flight = SingleFlight("test")
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def run():
+            leader = asyncio.create_task(flight.do("key", compute))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flight.do("key", compute))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(run()), "done")
+
+    def test_task_registers_key_without_yielding(self):
+        """Test that task() makes the key in flight at once, so later calls join it"""
+        flight = SingleFlight("test")
+
+        async def run():
+            future = asyncio.get_running_loop().create_future()
+            task = flight.task("key", lambda: future)
+            in_flight = flight.in_flight("key")
+            follower = asyncio.ensure_future(flight.do("key", lambda: asyncio.sleep(0, "other")))
+            future.set_result("from task")
+            return in_flight, task is future, await follower
+
+        self.assertEqual(asyncio.run(run()), (True, True, "from task"))
+        self.assertEqual(flight.stats(), {"in_flight": 0, "leaders": 1, "followers": 1})
+
+    def test_later_call_starts_new_computation(self):
+        """Test that a call after the previous one finished computes again"""
+        flight = SingleFlight("test")
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return len(calls)
+
+        async def run():
+            return await flight.do("key", compute), await flight.do("key", compute)
+
+        self.assertEqual(asyncio.run(run()), (1, 2))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
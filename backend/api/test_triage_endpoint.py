@@ -0,0 +1,210 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+sys.path.append('.')  # Run from backend/
+# The endpoint module creates its Supabase client on import; the tests replace it
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY", "test")
+from api import triage_endpoint
+from api.claims import AnalysisClaims
+from api.result_cache import ResultCache, input_hash
+from api.single_flight import SingleFlight
+from bench.fake_supabase import InMemorySupabase
+from fastapi import HTTPException
+
+ASSESSMENT_ID = "6f1c2b1e-4a53-4e1f-9d4c-0a4f3c7b9e21"
+USER_ID = "9a7d3c1e-0000-4000-8000-000000000001"
+UPDATED_AT = "2025-01-01T00:00:00+00:00"
+IMAGE_URL = "https://example.supabase.co/storage/v1/object/sign/images/rash.jpg"
+
+RELEVANT_CONDITIONS = [{"data": "Eczema: itchy, inflamed skin", "score": 0.8}]
+IMAGE_ANALYSIS = [{"class": "Eczema", "confidence": 0.7, "description": "Eczema"}]
+CLASSIFICATION_FAILED = {
+    "image_analysis": None,
+    "relevant_conditions": RELEVANT_CONDITIONS,
+    "error": "Error processing image: model unavailable",
+    "error_type": "classification_failed"
+}
+
+class StubInferencePool:
+    """Returns canned agent responses and counts the calls per agent method"""
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+        self.release = None
+
+    async def run(self, method, *args, **kwargs):
+        self.calls.append(method)
+        if self.release is not None:
+            await self.release.wait()
+        if method == "invoke_batch":
+            return [dict(self.response) for _ in args[0]]
+        return dict(self.response)
+
+class EndpointTestCase(unittest.TestCase):
+    def setUp(self):
+        """Point the endpoint at an in-memory database with one assessment"""
+        self.db = InMemorySupabase()
+        self.db.insert_rows("assessments", [{
+            "id": ASSESSMENT_ID,
+            "user_id": USER_ID,
+            "symptom_description": "Itchy rash",
+            "image_url": IMAGE_URL,
+            "created_at": UPDATED_AT,
+            "updated_at": UPDATED_AT
+        }])
+        self.pool = StubInferencePool({"image_analysis": IMAGE_ANALYSIS, "relevant_conditions": RELEVANT_CONDITIONS})
+        self.claims = AnalysisClaims(self.db, ttl_seconds=60, poll_interval=0.01, worker_id="worker-1")
+        patched = {
+            "inference_pool": self.pool,
+            "analysis_claims": self.claims,
+            "single_flight": SingleFlight("triage"),
+            "result_cache": ResultCache()
+        }
+        for name, value in patched.items():
+            original = getattr(triage_endpoint, name)
+            setattr(triage_endpoint, name, value)
+            self.addCleanup(setattr, triage_endpoint, name, original)
+
+    def stored(self):
+        return self.db.tables["assessments"][ASSESSMENT_ID]
+
+class TestClassificationFailure(EndpointTestCase):
+    def test_complete_analysis_is_recorded(self):
+        """Test that a full analysis records the input hash, so the next request is served from the row"""
+        asyncio.run(triage_endpoint.run_triage(ASSESSMENT_ID, self.db))
+        self.assertEqual(self.stored()["analysis_input_hash"], input_hash("Itchy rash", IMAGE_URL))
+
+        asyncio.run(triage_endpoint.run_triage(ASSESSMENT_ID, self.db))
+        self.assertEqual(self.pool.calls, ["invoke"])
+
+    def test_failed_classification_is_not_recorded(self):
+        """Test that text diagnoses are kept but the analysis is not marked current without the image"""
+        self.pool.response = CLASSIFICATION_FAILED
+        triage_data = asyncio.run(triage_endpoint.run_triage(ASSESSMENT_ID, self.db))
+
+        self.assertEqual([d.name for d in triage_data.possible_diagnoses], ["Eczema"])
+        self.assertNotIn("analysis_input_hash", self.stored())
+        self.assertEqual(len(self.db.tables["possible_diagnoses"]), 1)
+
+        asyncio.run(triage_endpoint.run_triage(ASSESSMENT_ID, self.db))
+        self.assertEqual(self.pool.calls, ["invoke", "invoke"], "The failed analysis should be retried")
+
+    def test_batch_reports_failed_classification(self):
+        """Test that the batch route fails an assessment whose image could not be classified"""
+        self.pool.response = CLASSIFICATION_FAILED
+        batch = triage_endpoint.TriageBatchRequest(assessment_ids=[ASSESSMENT_ID])
+        response = asyncio.run(triage_endpoint.triage_assessment_batch(batch, self.db))
+
+        self.assertEqual(json.loads(response.body)["failed"], [ASSESSMENT_ID])
+        self.assertNotIn("analysis_input_hash", self.stored())
+
+class TestBatchOverlap(EndpointTestCase):
+    def batch(self):
+        batch = triage_endpoint.TriageBatchRequest(assessment_ids=[ASSESSMENT_ID])
+        return triage_endpoint.triage_assessment_batch(batch, self.db)
+
+    def overlap(self, first, second):
+        """Start first, let it reach the agent, then run second alongside it"""
+        async def run():
+            self.pool.release = asyncio.Event()
+            started = asyncio.ensure_future(first())
+            await asyncio.sleep(0.05)
+            joined = asyncio.ensure_future(second())
+            await asyncio.sleep(0.05)
+            self.pool.release.set()
+            return await asyncio.gather(started, joined)
+        return asyncio.run(run())
+
+    def test_batch_joins_single_request_in_flight(self):
+        """Test that a batch does not analyze an assessment a single request is already analyzing"""
+        triage_data, response = self.overlap(lambda: triage_endpoint.run_triage(ASSESSMENT_ID, self.db), self.batch)
+
+        self.assertEqual(self.pool.calls, ["invoke"])
+        self.assertEqual(json.loads(response.body)["results"][0]["id"], ASSESSMENT_ID)
+        self.assertEqual(triage_data.predicted_injury_label, "Eczema")
+
+    def test_single_request_joins_batch_in_flight(self):
+        """Test that a single request for an assessment in a running batch gets the batch's analysis"""
+        response, triage_data = self.overlap(self.batch, lambda: triage_endpoint.run_triage(ASSESSMENT_ID, self.db))
+
+        self.assertEqual(self.pool.calls, ["invoke_batch"])
+        self.assertEqual(triage_data.predicted_injury_label, "Eczema")
+        self.assertEqual(json.loads(response.body)["failed"], [])
+
+    def test_batch_claims_and_releases(self):
+        """Test that the batch holds the claim during its pass and releases it afterwards"""
+        other = AnalysisClaims(self.db, ttl_seconds=60, worker_id="worker-2")
+        async def run():
+            self.pool.release = asyncio.Event()
+            batch = asyncio.ensure_future(self.batch())
+            await asyncio.sleep(0.05)
+            held = await asyncio.to_thread(other.try_claim, ASSESSMENT_ID)
+            self.pool.release.set()
+            await batch
+            return held
+        self.assertFalse(asyncio.run(run()), "Another worker should not be able to claim during the batch")
+        self.assertTrue(other.try_claim(ASSESSMENT_ID))
+
+class TestClaimedByAnotherWorker(EndpointTestCase):
+    def setUp(self):
+        """Have a second worker hold the claim on the assessment"""
+        super().setUp()
+        self.other = AnalysisClaims(self.db, ttl_seconds=60, poll_interval=0.01, worker_id="worker-2")
+        self.assertTrue(self.other.try_claim(ASSESSMENT_ID))
+
+    def test_serves_analysis_persisted_by_other_worker(self):
+        """Test that after the claim is released the other worker's analysis is served without the agent"""
+        async def other_worker_finishes(assessment_id):
+            self.db.update_row("assessments", self.stored(), {
+                "predicted_injury_label": "Eczema",
+                "severity_score": 3,
+                "triage_recommendation": "Seek urgent medical care for Eczema.",
+                "analysis_input_hash": input_hash("Itchy rash", IMAGE_URL)
+            })
+            self.other.release(assessment_id)
+            return True
+        self.claims.wait_released = other_worker_finishes
+
+        triage_data = asyncio.run(triage_endpoint.run_triage(ASSESSMENT_ID, self.db))
+        self.assertEqual(triage_data.predicted_injury_label, "Eczema")
+        self.assertEqual(self.pool.calls, [])
+
+    def test_batch_serves_analysis_persisted_by_other_worker(self):
+        """Test that a batch waits for an assessment another worker claimed instead of analyzing it"""
+        async def other_worker_finishes(assessment_id):
+            self.db.update_row("assessments", self.stored(), {
+                "predicted_injury_label": "Eczema",
+                "severity_score": 3,
+                "triage_recommendation": "Seek urgent medical care for Eczema.",
+                "analysis_input_hash": input_hash("Itchy rash", IMAGE_URL)
+            })
+            self.other.release(assessment_id)
+            return True
+        self.claims.wait_released = other_worker_finishes
+
+        batch = triage_endpoint.TriageBatchRequest(assessment_ids=[ASSESSMENT_ID])
+        response = asyncio.run(triage_endpoint.triage_assessment_batch(batch, self.db))
+        self.assertEqual(json.loads(response.body)["results"][0]["predicted_injury_label"], "Eczema")
+        self.assertEqual(self.pool.calls, [])
+
+    def test_claim_taken_again_is_503(self):
+        """Test that a claim still held after the wait is answered with 503 and Retry-After, not an unclaimed run"""
+        third = AnalysisClaims(self.db, ttl_seconds=60, worker_id="worker-3")
+        async def reclaimed_by_third_worker(assessment_id):
+            self.other.release(assessment_id)
+            third.try_claim(assessment_id)
+            return True
+        self.claims.wait_released = reclaimed_by_third_worker
+
+        with self.assertRaises(HTTPException) as raised:
+            asyncio.run(triage_endpoint.run_triage(ASSESSMENT_ID, self.db))
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertIn("Retry-After", raised.exception.headers)
+        self.assertEqual(self.pool.calls, [])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
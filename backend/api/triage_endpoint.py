@@ -1,37 +1,46 @@
-from fastapi import FastAPI, HTTPException, Depends, Request
-from typing import List, Optional, Dict, Any
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any, Tuple, Callable, Awaitable, Set
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
-from models.triage import TriageData, PossibleDiagnosis
+from models.triage import (
+    TriageData, PossibleDiagnosis, TriageBatchRequest, TriageBatchResponse,
+    TriageJob, TriageJobRequest, AssessmentSummary, AssessmentPage
+)
 import sys
 from pathlib import Path
 import json
 from pydantic import ValidationError
-from uuid import UUID, uuid4
+from uuid import UUID, uuid5
+import math
 from datetime import datetime
 import logging
+import asyncio
 
-# Add the version_3_multi_agent directory to Python path
+# Add the version_3_multi_agent directory to Python path so the agent can be
+# imported by the inference pool once the app is already serving
 sys.path.append(str(Path(__file__).parent.parent / "version_3_multi_agent"))
-from agents.agent1.agent import DescriptorAgent
+from api.inference_pool import InferencePool, InferencePoolUnavailable
+from api.persistence import persist_triage_analysis, persist_triage_analyses
+from api.data_access import (
+    fetch_assessment_with_diagnoses, fetch_assessments_with_diagnoses, fetch_assessment_validators,
+    list_assessments
+)
+from api.conditional import http_date, is_not_modified, row_validators, triage_validators
+from api.result_cache import ResultCache
+from api.single_flight import SingleFlight
+from api.claims import AnalysisClaims
+from api.jobs import InvalidCallbackUrl, TriageJobManager, TriageJobQueueFull
+from api.metrics import CONTENT_TYPE_LATEST, ERRORS, StageTimings, register_inference_pool, render_metrics
+from api.responses import ModelJSONResponse
+from network.http_pool import get_http_pool
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def parse_list_field(value: Optional[str]) -> Optional[List[str]]:
-    """Parse a string field into a list, handling various formats."""
-    if value is None:
-        return None
-    if value == "None" or value == "":
-        return []
-    try:
-        return json.loads(value)
-    except json.JSONDecodeError:
-        return [item.strip() for item in value.split(",") if item.strip()]
-
 def parse_uuid(value: Any) -> UUID:
     """Parse a value into UUID, handling string and UUID types."""
     if isinstance(value, UUID):
@@ -41,19 +50,214 @@ def parse_uuid(value: Any) -> UUID:
     except ValueError as e:
         raise ValueError(f"Invalid UUID format: {value}") from e
 
-def parse_datetime(value: str) -> datetime:
-    """Parse a datetime string into datetime object."""
-    try:
-        return datetime.fromisoformat(value.replace("Z", "+00:00"))
-    except ValueError as e:
-        raise ValueError(f"Invalid datetime format: {value}") from e
+def build_triage_data(assessment_data: Dict[str, Any], possible_diagnoses: List[Dict[str, Any]]) -> TriageData:
+    """
+    Build a TriageData from an assessments row and its possible_diagnoses rows.
+
+    Each row is validated exactly once by pydantic's compiled validators;
+    list columns are split by TriageData's own field validators. Invalid
+    diagnosis rows are skipped.
+
+    Raises:
+        ValidationError: If the assessment row does not form a valid TriageData
+    """
+    diagnoses = []
+    for d in possible_diagnoses:
+        try:
+            diagnoses.append(PossibleDiagnosis.model_validate(d))
+        except ValidationError as e:
+            logger.warning(f"Skipping invalid diagnosis data: {e}")
+
+    triage_data = TriageData.model_validate(assessment_data)
+    triage_data.possible_diagnoses = diagnoses
+    return triage_data
+
+# Assessment columns written from the agent's analysis
+ANALYSIS_COLUMNS = (
+    "predicted_injury_label", "injury_description_summary", "severity_score",
+    "severity_reason", "recommendation_status", "triage_recommendation"
+)
+
+def diagnosis_id(assessment_uuid: UUID, diagnosis_name: str) -> UUID:
+    """
+    Deterministic id of an assessment's diagnosis, so re-analysis upserts instead of duplicating.
+
+    Matches uuid_generate_v5(assessment_id, diagnosis_name) in Postgres.
+    """
+    return uuid5(assessment_uuid, diagnosis_name)
+
+def diagnosis_changed(existing: Optional[PossibleDiagnosis], diagnosis: PossibleDiagnosis) -> bool:
+    """Whether a diagnosis differs from the stored one (confidence compared at REAL precision)."""
+    if existing is None:
+        return True
+    return (
+        existing.name != diagnosis.name
+        or existing.description != diagnosis.description
+        or not math.isclose(existing.confidence, diagnosis.confidence, rel_tol=1e-6)
+    )
+
+def analysis_complete(triage_data: TriageData, agent_response: Dict[str, Any]) -> bool:
+    """
+    Whether agent_response is a full analysis of triage_data's inputs.
+
+    Only a full analysis may be recorded as current: after a failed image
+    classification, the columns the image analysis writes would be stale.
+    """
+    if agent_response.get('error'):
+        return False
+    return not triage_data.image_url or bool(agent_response.get('image_analysis'))
+
+def apply_agent_response(
+    triage_data: TriageData,
+    agent_response: Dict[str, Any],
+    assessment_uuid: UUID
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Apply the agent's analysis to triage_data in place.
+
+    Diagnoses get deterministic ids, and only columns and diagnoses that differ
+    from what is already stored are returned for writing.
+
+    Returns:
+        The changed assessment columns and the possible_diagnoses rows to upsert.
+    """
+    stored = {column: getattr(triage_data, column) for column in ANALYSIS_COLUMNS}
+    update_data = {}
+    diagnosis_rows = []
+    
+    if agent_response.get('image_analysis'):
+        image_analysis = agent_response['image_analysis']
+        if image_analysis:
+            top_prediction = image_analysis[0]
+            predicted_label = top_prediction['class']
+            confidence = float(top_prediction['confidence'])
+
+            summary = None
+            if agent_response.get('relevant_conditions') and agent_response['relevant_conditions']:
+                summary = agent_response['relevant_conditions'][0]['data']
+            else:
+                summary = top_prediction['description']
+
+            triage_data.predicted_injury_label = predicted_label
+            triage_data.injury_description_summary = summary
+
+            severity_score = min(5, max(1, int(confidence * 5)))  
+
+            if severity_score >= 4:
+                recommendation_status = "critical"
+                triage_recommendation = f"Seek immediate medical attention for {predicted_label}. {summary}"
+            elif severity_score >= 3:
+                recommendation_status = "severe"
+                triage_recommendation = f"Seek urgent medical care for {predicted_label}. {summary}"
+            elif severity_score >= 2:
+                recommendation_status = "moderate"
+                triage_recommendation = f"Schedule a routine appointment for {predicted_label}. {summary}"
+            else:
+                recommendation_status = "mild"
+                triage_recommendation = f"Monitor {predicted_label} and practice self-care. {summary}"
+
+            triage_data.severity_score = severity_score
+            triage_data.severity_reason = f"Based on image analysis of {predicted_label} with {confidence:.2%} confidence"
+            triage_data.recommendation_status = recommendation_status
+            triage_data.triage_recommendation = triage_recommendation
+
+            update_data.update({
+                'predicted_injury_label': predicted_label,
+                'injury_description_summary': summary,
+                'severity_score': severity_score,
+                'severity_reason': f"Based on image analysis of {predicted_label} with {confidence:.2%} confidence",
+                'recommendation_status': recommendation_status,
+                'triage_recommendation': triage_recommendation
+            })
+
+            logger.info(f"Updated assessment with top prediction - Label: {predicted_label}, Summary: {summary}")
+    
+    if agent_response.get('relevant_conditions'):
+        relevant_conditions = agent_response['relevant_conditions']
+        if relevant_conditions:
+            existing = {d.id: d for d in triage_data.possible_diagnoses}
+            merged = dict(existing)
+            for condition in relevant_conditions:
+                try:
+                    condition_name = condition['data'].split(':')[0].strip()
+                    condition_description = condition['data'].split(':')[1].strip() if ':' in condition['data'] else None
+                    diagnosis_uuid = diagnosis_id(assessment_uuid, condition_name)
+                    previous = existing.get(diagnosis_uuid)
+                    
+                    diagnosis = PossibleDiagnosis(
+                        id=diagnosis_uuid,
+                        assessment_id=assessment_uuid,
+                        name=condition_name,
+                        confidence=float(condition['score']),
+                        description=condition_description,
+                        created_at=previous.created_at if previous else datetime.now()
+                    )
+                    merged[diagnosis_uuid] = diagnosis
+                    
+                    if not diagnosis_changed(previous, diagnosis):
+                        continue
+                    
+                    logger.info(f"Upserting diagnosis: {condition_name} with confidence {condition['score']}")
+                    
+                    diagnosis_rows.append({
+                        'id': str(diagnosis_uuid),
+                        'assessment_id': str(assessment_uuid),
+                        'diagnosis_name': condition_name,
+                        'confidence_score': float(condition['score']),
+                        'description': condition_description
+                    })
+                    
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"Skipping invalid diagnosis from agent: {e}")
+                    continue
+            
+            triage_data.possible_diagnoses = list(merged.values())
+            
+            logger.info(f"Total diagnoses after merge: {len(triage_data.possible_diagnoses)}")
+            
+            top_condition = relevant_conditions[0]
+            condition_name = top_condition['data'].split(':')[0].strip()
+            condition_description = top_condition['data'].split(':')[1].strip() if ':' in top_condition['data'] else None
+            
+            confidence = float(top_condition['score'])
+            severity_score = min(5, max(1, int(confidence * 5)))  
+            
+            if severity_score >= 4:
+                recommendation_status = "critical"
+                triage_recommendation = f"Seek immediate medical attention for {condition_name}. {condition_description}"
+            elif severity_score >= 3:
+                recommendation_status = "severe"
+                triage_recommendation = f"Seek urgent medical care for {condition_name}. {condition_description}"
+            elif severity_score >= 2:
+                recommendation_status = "moderate"
+                triage_recommendation = f"Schedule a routine appointment for {condition_name}. {condition_description}"
+            else:
+                recommendation_status = "mild"
+                triage_recommendation = f"Monitor {condition_name} and practice self-care. {condition_description}"
+            
+            triage_data.severity_score = severity_score
+            triage_data.severity_reason = f"Based on analysis of {condition_name} with {confidence:.2%} confidence"
+            triage_data.recommendation_status = recommendation_status
+            triage_data.triage_recommendation = triage_recommendation
+            
+            update_data.update({
+                'severity_score': severity_score,
+                'severity_reason': f"Based on analysis of {condition_name} with {confidence:.2%} confidence",
+                'recommendation_status': recommendation_status,
+                'triage_recommendation': triage_recommendation
+            })
+    
+    update_data = {column: value for column, value in update_data.items() if stored.get(column) != value}
+    return update_data, diagnosis_rows
+
 
 app = FastAPI(
     title="Triage API",
     description="API for medical triage assessment and diagnosis",
     version="1.0.0",
     docs_url="/docs",  
-    redoc_url="/redoc"  
+    redoc_url="/redoc",
+    default_response_class=ModelJSONResponse
 )
 
 supabase_url = os.getenv("SUPABASE_URL")
@@ -64,7 +268,28 @@ if not supabase_url or not supabase_key:
 
 supabase: Client = create_client(supabase_url, supabase_key)
 
-agent = DescriptorAgent()
+inference_pool = InferencePool(
+    agent_factory=os.getenv("INFERENCE_AGENT_FACTORY", "agents.agent1.agent:DescriptorAgent"),
+    executor_type=os.getenv("INFERENCE_EXECUTOR", "thread"),
+    max_workers=int(os.getenv("INFERENCE_MAX_WORKERS", "1")),
+    max_in_flight=int(os.getenv("INFERENCE_MAX_IN_FLIGHT", "0")) or None,
+    max_queue=int(os.getenv("INFERENCE_MAX_QUEUE", "8"))
+)
+register_inference_pool(inference_pool)
+
+BATCH_MAX_ASSESSMENTS = int(os.getenv("BATCH_MAX_ASSESSMENTS", "64"))
+LIST_MAX_LIMIT = 100
+
+# error_type the agent reports when an assessment's image cannot be downloaded or decoded
+INVALID_IMAGE_ERROR = "invalid_image"
+
+# Retry-After for a request whose assessment another worker still holds after the wait
+CLAIM_RETRY_AFTER_SECONDS = 5
+
+single_flight = SingleFlight("triage")
+analysis_claims = AnalysisClaims(supabase, ttl_seconds=int(os.getenv("TRIAGE_CLAIM_TTL_SECONDS", "120")))
+
+result_cache = ResultCache()
 
 def get_supabase_client() -> Client:
     """Dependency to get Supabase client"""
@@ -80,7 +305,19 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "root": "/",
+            "health": "/health",
+            "ready": "/ready",
+            "triage_list": "/api/triage",
             "triage_assessment": "/api/triage/{assessment_id}",
+            "triage_stream": "/api/triage/{assessment_id}/stream",
+            "triage_batch": "/api/triage/batch",
+            "triage_jobs": "/api/triage/{assessment_id}/jobs",
+            "triage_job_status": "/api/triage/jobs/{job_id}",
+            "metrics": "/metrics",
+            "inference_stats": "/api/inference/stats",
+            "cache_stats": "/api/cache/stats",
+            "http_stats": "/api/http/stats",
+            "single_flight_stats": "/api/single-flight/stats",
             "documentation": {
                 "swagger": "/docs",
                 "redoc": "/redoc"
@@ -88,10 +325,90 @@ async def root():
         }
     }
 
+@app.on_event("startup")
+async def start_background_workers():
+    """Start the job workers and load models in the background so the app can serve right away."""
+    job_manager.start()
+    app.state.model_loader = asyncio.create_task(inference_pool.start())
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop the job workers, the inference pool and the outbound HTTP clients."""
+    await job_manager.stop()
+    inference_pool.shutdown(wait=False)
+    await get_http_pool().aclose()
+
+@app.get("/health")
+async def health() -> Dict[str, str]:
+    """
+    Liveness probe; answers as soon as the app is serving
+    """
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready(response: Response) -> Dict[str, Any]:
+    """
+    Readiness probe; 200 once the classifier, embedder and FAISS index are loaded and warm, 503 before
+    """
+    readiness = inference_pool.readiness()
+    if not readiness["ready"]:
+        response.status_code = 503
+    return readiness
+
+@app.get("/api/inference/stats")
+async def get_inference_stats() -> Dict[str, Any]:
+    """
+    Queue depth, in-flight count and wait-time metrics of the inference pool
+    """
+    return inference_pool.stats()
+
+@app.get("/api/cache/stats")
+async def get_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters of the triage result cache and, when the agent runs
+    in-process, of its classifier prediction cache
+    """
+    stats = result_cache.stats()
+    agent = inference_pool.agent
+    if agent is not None:
+        stats["prediction_cache"] = agent.cache_stats()
+    return stats
+
+@app.get("/api/jobs/stats")
+async def get_job_stats() -> Dict[str, Any]:
+    """
+    Queue depth and counters of the background triage job workers
+    """
+    return job_manager.stats()
+
+@app.get("/api/single-flight/stats")
+async def get_single_flight_stats() -> Dict[str, Any]:
+    """
+    Coalesced triage computations in this worker and cross-worker claim contention
+    """
+    return {
+        "single_flight": single_flight.stats(),
+        "claims": analysis_claims.stats()
+    }
+
+@app.get("/api/http/stats")
+async def get_http_stats() -> Dict[str, Any]:
+    """
+    In-flight requests and saturation of the shared outbound connection pools
+    """
+    return get_http_pool().stats()
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """
+    Prometheus metrics: per-stage latency histograms, error and cache counters, inference pool gauges
+    """
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 @app.exception_handler(ValidationError)
 async def validation_exception_handler(request: Request, exc: ValidationError):
     """Handle Pydantic validation errors."""
-    return {
+    return ModelJSONResponse(status_code=422, content={
         "detail": [
             {
                 "loc": error["loc"],
@@ -100,245 +417,672 @@ async def validation_exception_handler(request: Request, exc: ValidationError):
             }
             for error in exc.errors()
         ]
-    }
+    })
 
-@app.get("/api/triage/{assessment_id}", response_model=TriageData)
-async def get_triage_assessment(
+# Receives (event, data) for each stage of a streamed triage
+StageCallback = Callable[[str, Any], None]
+
+# Agent stages forwarded to a stream, and the field of the stage they carry
+STREAMED_AGENT_STAGES = {
+    'image_classification': 'image_analysis',
+    'relevant_conditions': 'relevant_conditions'
+}
+
+async def run_triage(
     assessment_id: str,
-    supabase: Client = Depends(get_supabase_client)
+    supabase: Client,
+    refresh: bool = False,
+    timings: Optional[StageTimings] = None,
+    on_stage: Optional[StageCallback] = None
 ) -> TriageData:
     """
-    Get triage assessment data and process it through Agent 1.
+    Fetch an assessment, run it through Agent 1 and persist the analysis.
+    
+    Assessments that already carry an analysis for their current inputs are
+    returned as persisted without running the agent again. Concurrent calls
+    for the same assessment share one computation.
     
     Args:
-        assessment_id: The UUID of the assessment to retrieve
+        assessment_id: The UUID of the assessment to process
+        supabase: Supabase client
+        refresh: Re-run the agent even if a persisted analysis is current
+        timings: Collector for per-stage latencies, recorded to the metrics when done
+        on_stage: Called with each stage of the analysis as it finishes
+            (``image_classification``, ``relevant_conditions``, ``triage``,
+            ``persisted``) when this call runs the agent itself; not called
+            when the result is persisted or shared with a concurrent call
         
     Returns:
         TriageData: The assessment data with possible diagnoses
         
     Raises:
-        HTTPException: If the assessment is not found or there's an error processing it
+        HTTPException: If the assessment is not found or there's an error processing it,
+            or 503 if the inference queue is full or another worker keeps the assessment claimed
     """
+    timings = timings or StageTimings("triage")
     try:
         try:
-            assessment_uuid = parse_uuid(assessment_id)
+            key = str(parse_uuid(assessment_id))
         except ValueError as e:
+            ERRORS.labels(kind="invalid_id").inc()
             raise HTTPException(status_code=400, detail=str(e))
 
-        response = supabase.table("assessments").select("*").eq("id", assessment_id).execute()
+        pipeline = lambda: run_triage_pipeline(key, supabase, refresh, timings, on_stage)
+        if single_flight.in_flight(key):
+            with timings.time("coalesced_wait"):
+                return await single_flight.do(key, pipeline)
+        return await single_flight.do(key, pipeline)
+    finally:
+        timings.observe()
+
+async def stream_agent_stages(triage_data: TriageData, assessment_id: str, on_stage: StageCallback) -> Dict[str, Any]:
+    """
+    Run Agent 1 stage by stage, passing each intermediate stage to on_stage.
+    
+    Returns:
+        Dict[str, Any]: The agent's complete response
+    
+    Raises:
+        RuntimeError: If the agent finished without a complete stage
+    """
+    agent_response = None
+    async for stage in inference_pool.stream(
+        "invoke_stages",
+        query=triage_data.symptom_description,
+        session_id=assessment_id,
+        image_url=triage_data.image_url
+    ):
+        if stage['stage'] == 'complete':
+            agent_response = stage['response']
+        elif stage['stage'] in STREAMED_AGENT_STAGES:
+            field = STREAMED_AGENT_STAGES[stage['stage']]
+            on_stage(stage['stage'], {field: stage[field]})
+    
+    if agent_response is None:
+        raise RuntimeError("Agent finished without a result")
+    return agent_response
+
+async def run_triage_pipeline(
+    assessment_id: str,
+    supabase: Client,
+    refresh: bool,
+    timings: StageTimings,
+    on_stage: Optional[StageCallback] = None
+) -> TriageData:
+    """
+    The triage pipeline behind run_triage, run once per in-flight assessment.
+    
+    Across workers, the agent only runs after claiming the assessment; a
+    worker that finds it claimed waits for the claim to be released and
+    serves the analysis the other worker persisted. If that analysis is not
+    current and the claim cannot be taken after the wait, it answers 503
+    with Retry-After rather than run the agent unclaimed.
+    """
+    try:
+        assessment_uuid = UUID(assessment_id)
+
+        with timings.time("supabase_fetch"):
+            rows = await fetch_assessment_with_diagnoses(supabase, assessment_id)
         
-        if not response.data:
+        if rows is None:
+            ERRORS.labels(kind="not_found").inc()
             raise HTTPException(status_code=404, detail="Assessment not found")
             
-        assessment_data = response.data[0]
-        
-        diagnoses_response = supabase.table("possible_diagnoses").select("*").eq("assessment_id", assessment_id).execute()
-        possible_diagnoses = diagnoses_response.data if diagnoses_response.data else []
-        
-        diagnoses = []
-        for d in possible_diagnoses:
-            try:
-                diagnosis = PossibleDiagnosis(
-                    id=parse_uuid(d["id"]),
-                    assessment_id=parse_uuid(d["assessment_id"]),
-                    name=str(d["name"]),
-                    confidence=float(d["confidence"]),
-                    description=d.get("description"),
-                    created_at=parse_datetime(d["created_at"])
-                )
-                diagnoses.append(diagnosis)
-            except (ValueError, KeyError) as e:
-                logger.warning(f"Skipping invalid diagnosis data: {e}")
-                continue
-        
-        affected_body_parts = parse_list_field(assessment_data.get("affected_body_parts"))
-        known_allergies = parse_list_field(assessment_data.get("known_allergies"))
-        current_medications = parse_list_field(assessment_data.get("current_medications"))
-        pre_existing_conditions = parse_list_field(assessment_data.get("pre_existing_conditions"))
+        assessment_data, possible_diagnoses = rows
         
         try:
-            triage_data = TriageData(
-                id=parse_uuid(assessment_data["id"]),
-                user_id=parse_uuid(assessment_data["user_id"]),
-                symptom_description=str(assessment_data["symptom_description"]),
-                image_file_name=assessment_data.get("image_file_name"),
-                image_file_type=assessment_data.get("image_file_type"),
-                image_url=assessment_data.get("image_url"),
-                image_storage_path=assessment_data.get("image_storage_path"),
-                patient_name=assessment_data.get("patient_name"),
-                patient_age=assessment_data.get("patient_age"),
-                patient_sex=assessment_data.get("patient_sex"),
-                symptom_duration=assessment_data.get("symptom_duration"),
-                pain_level=assessment_data.get("pain_level"),
-                affected_body_parts=affected_body_parts,
-                has_fever=bool(assessment_data.get("has_fever", False)),
-                temperature_celsius=float(assessment_data["temperature_celsius"]) if assessment_data.get("temperature_celsius") is not None else None,
-                known_allergies=known_allergies,
-                current_medications=current_medications,
-                recent_travel=assessment_data.get("recent_travel"),
-                pre_existing_conditions=pre_existing_conditions,
-                predicted_injury_label=assessment_data.get("predicted_injury_label"),
-                injury_description_summary=assessment_data.get("injury_description_summary"),
-                severity_score=float(assessment_data["severity_score"]) if assessment_data.get("severity_score") is not None else None,
-                severity_reason=assessment_data.get("severity_reason"),
-                recommendation_status=assessment_data.get("recommendation_status"),
-                triage_recommendation=assessment_data.get("triage_recommendation"),
-                possible_diagnoses=diagnoses,
-                created_at=parse_datetime(assessment_data["created_at"]),
-                updated_at=parse_datetime(assessment_data["updated_at"])
-            )
+            triage_data = build_triage_data(assessment_data, possible_diagnoses)
         except ValidationError as e:
+            ERRORS.labels(kind="validation").inc()
             logger.error(f"Validation error for assessment {assessment_id}: {str(e)}")
             raise HTTPException(status_code=422, detail=str(e))
         
-        agent_response = agent.invoke(
-            query=triage_data.symptom_description,
-            session_id=assessment_id,
-            image_url=triage_data.image_url
-        )
+        if not refresh and result_cache.lookup(triage_data):
+            logger.info(f"Serving persisted analysis for assessment {assessment_id}")
+            return triage_data
         
-        logger.info(f"Agent analysis for assessment {assessment_id}: {agent_response}")
+        claimed = await asyncio.to_thread(analysis_claims.try_claim, assessment_id)
+        if not claimed:
+            logger.info(f"Assessment {assessment_id} is being analyzed by another worker, waiting")
+            with timings.time("claim_wait"):
+                await analysis_claims.wait_released(assessment_id)
+            with timings.time("supabase_fetch"):
+                rows = await fetch_assessment_with_diagnoses(supabase, assessment_id)
+            if rows is None:
+                ERRORS.labels(kind="not_found").inc()
+                raise HTTPException(status_code=404, detail="Assessment not found")
+            triage_data = build_triage_data(*rows)
+            if result_cache.lookup(triage_data):
+                logger.info(f"Serving analysis persisted by another worker for assessment {assessment_id}")
+                return triage_data
+            claimed = await asyncio.to_thread(analysis_claims.try_claim, assessment_id)
+            if not claimed:
+                ERRORS.labels(kind="unavailable").inc()
+                logger.warning(f"Assessment {assessment_id} is still claimed by another worker, rejecting")
+                raise HTTPException(
+                    status_code=503,
+                    detail="Assessment is being analyzed by another worker",
+                    headers={"Retry-After": str(CLAIM_RETRY_AFTER_SECONDS)}
+                )
         
-        if agent_response:
-            update_data = {}
-            
-            if agent_response.get('image_analysis'):
-                image_analysis = agent_response['image_analysis']
-                if image_analysis:
-                    top_prediction = image_analysis[0]
-                    predicted_label = top_prediction['class']
-                    confidence = float(top_prediction['confidence'])
-
-                    summary = None
-                    if agent_response.get('relevant_conditions') and agent_response['relevant_conditions']:
-                        summary = agent_response['relevant_conditions'][0]['data']
-                    else:
-                        summary = top_prediction['description']
-
-                    triage_data.predicted_injury_label = predicted_label
-                    triage_data.injury_description_summary = summary
-
-                    severity_score = min(5, max(1, int(confidence * 5)))  
-
-                    if severity_score >= 4:
-                        recommendation_status = "critical"
-                        triage_recommendation = f"Seek immediate medical attention for {predicted_label}. {summary}"
-                    elif severity_score >= 3:
-                        recommendation_status = "severe"
-                        triage_recommendation = f"Seek urgent medical care for {predicted_label}. {summary}"
-                    elif severity_score >= 2:
-                        recommendation_status = "moderate"
-                        triage_recommendation = f"Schedule a routine appointment for {predicted_label}. {summary}"
+        try:
+            try:
+                with timings.time("inference"):
+                    if on_stage is None:
+                        agent_response = await inference_pool.run(
+                            "invoke",
+                            query=triage_data.symptom_description,
+                            session_id=assessment_id,
+                            image_url=triage_data.image_url
+                        )
                     else:
-                        recommendation_status = "mild"
-                        triage_recommendation = f"Monitor {predicted_label} and practice self-care. {summary}"
-
-                    triage_data.severity_score = severity_score
-                    triage_data.severity_reason = f"Based on image analysis of {predicted_label} with {confidence:.2%} confidence"
-                    triage_data.recommendation_status = recommendation_status
-                    triage_data.triage_recommendation = triage_recommendation
-
-                    update_data.update({
-                        'predicted_injury_label': predicted_label,
-                        'injury_description_summary': summary,
-                        'severity_score': severity_score,
-                        'severity_reason': f"Based on image analysis of {predicted_label} with {confidence:.2%} confidence",
-                        'recommendation_status': recommendation_status,
-                        'triage_recommendation': triage_recommendation
-                    })
-
-                    logger.info(f"Updated assessment with top prediction - Label: {predicted_label}, Summary: {summary}")
+                        agent_response = await stream_agent_stages(triage_data, assessment_id, on_stage)
+            except InferencePoolUnavailable as e:
+                ERRORS.labels(kind="unavailable").inc()
+                logger.warning(f"Rejecting assessment {assessment_id}: {str(e)}")
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
             
-            if agent_response.get('relevant_conditions'):
-                relevant_conditions = agent_response['relevant_conditions']
-                if relevant_conditions:
-                    new_diagnoses = []
-                    for condition in relevant_conditions:
-                        try:
-                            diagnosis_id = uuid4()
-                            condition_name = condition['data'].split(':')[0].strip()
-                            condition_description = condition['data'].split(':')[1].strip() if ':' in condition['data'] else None
-                            
-                            diagnosis = PossibleDiagnosis(
-                                id=diagnosis_id,
-                                assessment_id=assessment_uuid,
-                                name=condition_name,
-                                confidence=float(condition['score']),
-                                description=condition_description,
-                                created_at=datetime.now()
-                            )
-                            new_diagnoses.append(diagnosis)
-                            
-                            logger.info(f"Created new diagnosis: {condition_name} with confidence {condition['score']}")
-                            
-                            try:
-                                diagnosis_data = {
-                                    'id': str(diagnosis_id),
-                                    'assessment_id': str(assessment_uuid),
-                                    'diagnosis_name': condition_name,
-                                    'confidence_score': float(condition['score']),
-                                    'description': condition_description,
-                                    'created_at': datetime.now().isoformat()
-                                }
-                                supabase.table("possible_diagnoses").insert(diagnosis_data).execute()
-                                logger.info(f"Saved diagnosis {condition_name} to database")
-                            except Exception as e:
-                                logger.error(f"Failed to save diagnosis {condition_name} to database: {str(e)}")
-                            
-                        except (ValueError, KeyError) as e:
-                            logger.warning(f"Skipping invalid diagnosis from agent: {e}")
-                            continue
-                    
-                    existing_ids = {d.id for d in triage_data.possible_diagnoses}
-                    triage_data.possible_diagnoses.extend([d for d in new_diagnoses if d.id not in existing_ids])
-                    
-                    logger.info(f"Total diagnoses after merge: {len(triage_data.possible_diagnoses)}")
-                    
-                    top_condition = relevant_conditions[0]
-                    condition_name = top_condition['data'].split(':')[0].strip()
-                    condition_description = top_condition['data'].split(':')[1].strip() if ':' in top_condition['data'] else None
-                    
-                    confidence = float(top_condition['score'])
-                    severity_score = min(5, max(1, int(confidence * 5)))  
-                    
-                    if severity_score >= 4:
-                        recommendation_status = "critical"
-                        triage_recommendation = f"Seek immediate medical attention for {condition_name}. {condition_description}"
-                    elif severity_score >= 3:
-                        recommendation_status = "severe"
-                        triage_recommendation = f"Seek urgent medical care for {condition_name}. {condition_description}"
-                    elif severity_score >= 2:
-                        recommendation_status = "moderate"
-                        triage_recommendation = f"Schedule a routine appointment for {condition_name}. {condition_description}"
-                    else:
-                        recommendation_status = "mild"
-                        triage_recommendation = f"Monitor {condition_name} and practice self-care. {condition_description}"
-                    
-                    triage_data.severity_score = severity_score
-                    triage_data.severity_reason = f"Based on analysis of {condition_name} with {confidence:.2%} confidence"
-                    triage_data.recommendation_status = recommendation_status
-                    triage_data.triage_recommendation = triage_recommendation
-                    
-                    update_data.update({
-                        'severity_score': severity_score,
-                        'severity_reason': f"Based on analysis of {condition_name} with {confidence:.2%} confidence",
-                        'recommendation_status': recommendation_status,
-                        'triage_recommendation': triage_recommendation
-                    })
+            logger.info(f"Agent analysis for assessment {assessment_id}: {agent_response}")
             
-            if update_data:
-                try:
-                    update_response = supabase.table("assessments").update(update_data).eq("id", assessment_id).execute()
-                    logger.info(f"Updated assessment {assessment_id} with analysis results")
-                except Exception as e:
-                    logger.error(f"Failed to update assessment {assessment_id}: {str(e)}")
+            if agent_response and agent_response.get('error_type') == INVALID_IMAGE_ERROR:
+                ERRORS.labels(kind="invalid_image").inc()
+                raise HTTPException(status_code=422, detail=agent_response['error'])
+            
+            if agent_response:
+                timings.merge(agent_response.get('timings'))
+                update_data, diagnosis_rows = apply_agent_response(triage_data, agent_response, assessment_uuid)
+                if analysis_complete(triage_data, agent_response):
+                    update_data.update(result_cache.record(triage_data))
+                else:
+                    ERRORS.labels(kind="agent").inc()
+                    logger.warning(f"Incomplete analysis for assessment {assessment_id}, not recording it as current")
+                write_timings, updated_at = await asyncio.to_thread(
+                    persist_triage_analysis, supabase, assessment_id, update_data, diagnosis_rows
+                )
+                timings.add("supabase_write", sum(write_timings.values()))
+                # The write bumps updated_at; ETag and Last-Modified must use the new value
+                if updated_at is not None:
+                    triage_data.updated_at = updated_at
+                write_failed = updated_at is None and bool(update_data or diagnosis_rows)
+                if write_failed:
+                    ERRORS.labels(kind="write").inc()
+                    logger.warning(f"Analysis of assessment {assessment_id} was not persisted, serving it unsaved")
+                if on_stage is not None:
+                    on_stage("triage", triage_data.model_dump_json())
+                    on_stage("persisted", {
+                        "assessment_id": assessment_id,
+                        "failed": write_failed,
+                        "diagnoses_written": 0 if write_failed else len(diagnosis_rows),
+                        "write_seconds": write_timings
+                    })
+        finally:
+            if claimed:
+                await asyncio.to_thread(analysis_claims.release, assessment_id)
         
         return triage_data
         
+    except HTTPException:
+        raise
     except Exception as e:
+        ERRORS.labels(kind="internal").inc()
         logger.error(f"Error processing assessment {assessment_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/triage", response_model=AssessmentPage)
+async def list_triage_assessments(
+    user_id: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 20,
+    supabase: Client = Depends(get_supabase_client)
+) -> AssessmentPage:
+    """
+    List assessment summaries, newest first, without running the agent.
+    
+    Pages are keyset-paginated on (created_at, id): pass the previous page's
+    next_cursor as ``after`` to get the next one.
+    
+    Args:
+        user_id: Only list this user's assessments
+        after: Cursor from the previous page
+        limit: Page size (1-100)
+        
+    Returns:
+        AssessmentPage: Summaries and the cursor for the next page
+        
+    Raises:
+        HTTPException: 400 for an invalid user id, cursor or limit
+    """
+    if not 1 <= limit <= LIST_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {LIST_MAX_LIMIT}")
+    try:
+        if user_id is not None:
+            user_id = str(parse_uuid(user_id))
+        rows, next_cursor = await list_assessments(supabase, user_id, after, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        ERRORS.labels(kind="internal").inc()
+        logger.error(f"Error listing assessments: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    page = AssessmentPage(
+        items=[AssessmentSummary.model_validate(row) for row in rows],
+        next_cursor=next_cursor
+    )
+    return ModelJSONResponse(page)
+
+@app.get("/api/triage/{assessment_id}", response_model=TriageData)
+async def get_triage_assessment(
+    assessment_id: str,
+    request: Request,
+    refresh: bool = False,
+    supabase: Client = Depends(get_supabase_client)
+) -> TriageData:
+    """
+    Get triage assessment data and process it through Agent 1.
+    
+    Responses carry an ETag (from updated_at and the diagnosis set) and a
+    Last-Modified header. A request whose If-None-Match / If-Modified-Since
+    still matches gets a 304 after a lightweight validator lookup, without
+    the full row fetch or the agent. The Server-Timing response header
+    carries the per-stage latency breakdown.
+    
+    Args:
+        assessment_id: The UUID of the assessment to retrieve
+        refresh: Re-run the agent even if a persisted analysis is current
+        
+    Returns:
+        TriageData: The assessment data with possible diagnoses
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    
+    if not refresh and (if_none_match or if_modified_since):
+        timings = StageTimings("triage_conditional")
+        try:
+            with timings.time("supabase_validate"):
+                rows = await asyncio.to_thread(fetch_assessment_validators, supabase, assessment_id)
+            if rows is not None:
+                etag, last_modified = row_validators(*rows)
+                if is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+                    return Response(status_code=304, headers={
+                        "ETag": etag,
+                        "Last-Modified": http_date(last_modified),
+                        "Cache-Control": "private, no-cache",
+                        "Server-Timing": timings.server_timing()
+                    })
+        except Exception as e:
+            logger.warning(f"Conditional check failed for assessment {assessment_id}, serving in full: {str(e)}")
+        finally:
+            timings.observe()
+    
+    timings = StageTimings("triage")
+    triage_data = await run_triage(assessment_id, supabase, refresh, timings)
+    etag, last_modified = triage_validators(triage_data)
+    return ModelJSONResponse(triage_data, headers={
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": "private, no-cache",
+        "Server-Timing": timings.server_timing()
+    })
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message; str data is sent as-is."""
+    payload = data if isinstance(data, str) else json.dumps(data)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+@app.get("/api/triage/{assessment_id}/stream")
+async def stream_triage_assessment(
+    assessment_id: str,
+    refresh: bool = False,
+    supabase: Client = Depends(get_supabase_client)
+) -> StreamingResponse:
+    """
+    Process a triage assessment and stream each stage as a Server-Sent Event.
+    
+    Events, in order: ``image_classification`` (top-5 predictions, when the
+    assessment has an image), ``relevant_conditions`` (RAG matches),
+    ``triage`` (the assessment with severity and recommendation) and
+    ``persisted`` (write confirmation). Failures after the stream has started
+    are sent as an ``error`` event.
+    
+    The stream runs the same pipeline as GET /api/triage/{assessment_id}, so
+    it shares the computation of a concurrent request for the same assessment
+    and honours cross-worker claims. A current persisted analysis, or one
+    computed by another request, is sent as a single ``triage`` event.
+    
+    Args:
+        assessment_id: The UUID of the assessment to process
+        refresh: Re-run the agent even if a persisted analysis is current
+        
+    Raises:
+        HTTPException: 400/404/422 before the stream starts, 503 if the inference queue is full
+    """
+    stages: asyncio.Queue = asyncio.Queue()
+    pipeline = asyncio.ensure_future(run_triage(
+        assessment_id, supabase, refresh, StageTimings("stream"),
+        on_stage=lambda event, data: stages.put_nowait((event, data))
+    ))
+
+    async def next_stage() -> Optional[Tuple[str, Any]]:
+        """The next stage the pipeline reported, or None once it has finished and every stage was taken."""
+        while stages.empty() and not pipeline.done():
+            getter = asyncio.ensure_future(stages.get())
+            try:
+                await asyncio.wait({getter, pipeline}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                got = getter.done()
+                if not got:
+                    getter.cancel()
+            if got:
+                return getter.result()
+        return None if stages.empty() else stages.get_nowait()
+
+    first = await next_stage()
+    if first is None:
+        # Finished without streaming anything: errors are still plain HTTP errors
+        first = ("triage", pipeline.result().model_dump_json())
+
+    async def events():
+        stage = first
+        sent_triage = False
+        while stage is not None:
+            sent_triage = sent_triage or stage[0] == "triage"
+            yield sse_event(*stage)
+            stage = await next_stage()
+
+        try:
+            triage_data = pipeline.result()
+        except HTTPException as e:
+            yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+            return
+        if not sent_triage:
+            yield sse_event("triage", triage_data.model_dump_json())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def run_triage_job(assessment_id: str, refresh: bool) -> TriageData:
+    """Run the triage pipeline for a background job."""
+    return await run_triage(assessment_id, supabase, refresh)
+
+job_manager = TriageJobManager(
+    handler=run_triage_job,
+    max_queue=int(os.getenv("JOB_MAX_QUEUE", "100")),
+    concurrency=int(os.getenv("JOB_CONCURRENCY", "1")),
+    callback_allowed_hosts=os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(","),
+    allow_private_callbacks=os.getenv("JOB_CALLBACK_ALLOW_PRIVATE", "false").lower() in ("1", "true", "yes"),
+    finished_ttl=float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+)
+
+@app.post("/api/triage/{assessment_id}/jobs", response_model=TriageJob, status_code=202)
+async def create_triage_job(
+    assessment_id: str,
+    response: Response,
+    job_request: Optional[TriageJobRequest] = None
+) -> TriageJob:
+    """
+    Queue a triage assessment to be processed in the background.
+    
+    Poll GET /api/triage/jobs/{job_id} for the result, or pass a callback_url
+    to have the finished job POSTed to it.
+    
+    Args:
+        assessment_id: The UUID of the assessment to process
+        job_request: Optional refresh flag and callback URL
+        
+    Returns:
+        TriageJob: The queued job
+        
+    Raises:
+        HTTPException: 400 for an invalid UUID or a callback URL that is not
+            allowed, 503 if the job queue is full
+    """
+    try:
+        assessment_uuid = parse_uuid(assessment_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job_request = job_request or TriageJobRequest()
+    callback_url = str(job_request.callback_url) if job_request.callback_url else None
+    if callback_url:
+        try:
+            await job_manager.check_callback_url(callback_url)
+        except InvalidCallbackUrl as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        job = job_manager.submit(assessment_uuid, job_request.refresh, callback_url)
+    except TriageJobQueueFull as e:
+        logger.warning(f"Rejecting job for assessment {assessment_id}: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    response.headers["Location"] = f"/api/triage/jobs/{job.id}"
+    return job
+
+@app.get("/api/triage/jobs/{job_id}", response_model=TriageJob)
+async def get_triage_job(job_id: str) -> TriageJob:
+    """
+    Get the state, timestamps and (once completed) result of a triage job.
+    
+    Raises:
+        HTTPException: 400 for an invalid UUID, 404 if the job is unknown
+    """
+    try:
+        job_uuid = parse_uuid(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = job_manager.get(job_uuid)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return ModelJSONResponse(job)
+
+async def resolve_with(future: asyncio.Future, computation: Awaitable[Any]):
+    """Settle future with the outcome of computation."""
+    try:
+        result = await computation
+    except Exception as e:
+        if not future.done():
+            future.set_exception(e)
+    else:
+        if not future.done():
+            future.set_result(result)
+
+async def analyze_batch(
+    pending: List[TriageData],
+    futures: Dict[str, asyncio.Future],
+    supabase: Client,
+    refresh: bool,
+    timings: StageTimings
+) -> Set[str]:
+    """
+    Analyze assessments in one vectorized agent pass and write them back in bulk.
+
+    Each assessment's future is settled with its TriageData, or with an
+    HTTPException if the agent failed on it. The pass only covers assessments
+    this worker could claim; ones claimed by another worker go through
+    run_triage_pipeline, which waits for that worker's analysis.
+
+    Returns:
+        Set[str]: Ids whose analysis was served but could not be persisted
+
+    Raises:
+        HTTPException: 503 if the inference queue is full
+    """
+    keys = [str(triage_data.id) for triage_data in pending]
+    claimed = set(await asyncio.to_thread(lambda: [key for key in keys if analysis_claims.try_claim(key)]))
+    unsaved: Set[str] = set()
+
+    try:
+        analyzed = [triage_data for triage_data in pending if str(triage_data.id) in claimed]
+        if analyzed:
+            try:
+                with timings.time("inference"):
+                    agent_responses = await inference_pool.run(
+                        "invoke_batch",
+                        [
+                            {
+                                "query": triage_data.symptom_description,
+                                "session_id": str(triage_data.id),
+                                "image_url": triage_data.image_url
+                            }
+                            for triage_data in analyzed
+                        ]
+                    )
+            except InferencePoolUnavailable as e:
+                ERRORS.labels(kind="unavailable").inc()
+                logger.warning(f"Rejecting batch of {len(analyzed)} assessments: {str(e)}")
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+            if agent_responses:
+                timings.merge(agent_responses[0].get('timings'))
+
+            analyses = []
+            written: List[TriageData] = []
+            for triage_data, agent_response in zip(analyzed, agent_responses):
+                key = str(triage_data.id)
+                if agent_response.get('error'):
+                    ERRORS.labels(kind="agent").inc()
+                    logger.error(f"Agent failed for assessment {key}: {agent_response['error']}")
+                    status_code = 422 if agent_response.get('error_type') == INVALID_IMAGE_ERROR else 500
+                    futures[key].set_exception(HTTPException(status_code=status_code, detail=agent_response['error']))
+                    continue
+
+                update_data, diagnosis_rows = apply_agent_response(triage_data, agent_response, triage_data.id)
+                if analysis_complete(triage_data, agent_response):
+                    update_data.update(result_cache.record(triage_data))
+                analyses.append((key, update_data, diagnosis_rows))
+                written.append(triage_data)
+
+            write_timings, failed_writes = await asyncio.to_thread(persist_triage_analyses, supabase, analyses)
+            timings.add("supabase_write", sum(write_timings.values()))
+            for triage_data in written:
+                key = str(triage_data.id)
+                if key in failed_writes:
+                    ERRORS.labels(kind="write").inc()
+                    unsaved.add(key)
+                futures[key].set_result(triage_data)
+    finally:
+        if claimed:
+            await asyncio.to_thread(lambda: [analysis_claims.release(key) for key in claimed])
+
+    await asyncio.gather(*(
+        resolve_with(futures[key], run_triage_pipeline(key, supabase, refresh, StageTimings("triage")))
+        for key in keys if key not in claimed
+    ))
+    return unsaved
+
+@app.post("/api/triage/batch", response_model=TriageBatchResponse)
+async def triage_assessment_batch(
+    batch: TriageBatchRequest,
+    supabase: Client = Depends(get_supabase_client)
+) -> TriageBatchResponse:
+    """
+    Process many triage assessments through Agent 1 in one vectorized pass.
+    
+    All rows are fetched with one query, the agent classifies every image with
+    one batched predict and embeds every query with one encode call, and the
+    results are written back with one bulk write. Assessments another request
+    is already analyzing are joined rather than analyzed twice, and ones
+    claimed by another worker are served once that worker has persisted them.
+    
+    Args:
+        batch: The assessment ids to process and whether to refresh analyzed ones
+        
+    Returns:
+        TriageBatchResponse: Processed assessments plus ids that were not found or failed
+        
+    Raises:
+        HTTPException: 400 if the batch is too large, 503 if the inference queue is full
+    """
+    assessment_ids = list(dict.fromkeys(str(i) for i in batch.assessment_ids))
+    if len(assessment_ids) > BATCH_MAX_ASSESSMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BATCH_MAX_ASSESSMENTS} assessments can be processed per batch"
+        )
+
+    timings = StageTimings("batch")
+    try:
+        with timings.time("supabase_fetch"):
+            rows_by_id = await fetch_assessments_with_diagnoses(supabase, assessment_ids)
+
+        response = TriageBatchResponse(
+            not_found=[UUID(i) for i in assessment_ids if i not in rows_by_id]
+        )
+
+        pending: List[TriageData] = []
+        for assessment_id in assessment_ids:
+            if assessment_id not in rows_by_id:
+                continue
+            try:
+                triage_data = build_triage_data(*rows_by_id[assessment_id])
+            except (ValidationError, ValueError) as e:
+                ERRORS.labels(kind="validation").inc()
+                logger.error(f"Validation error for assessment {assessment_id}: {str(e)}")
+                response.failed.append(UUID(assessment_id))
+                continue
+
+            if not batch.refresh and result_cache.lookup(triage_data):
+                response.results.append(triage_data)
+            else:
+                pending.append(triage_data)
+
+        if not pending:
+            return ModelJSONResponse(response, headers={"Server-Timing": timings.server_timing()})
+
+        # Register every pending assessment with single_flight before the first
+        # await: ones already being analyzed by another request are joined, and
+        # single requests for the others join this batch instead of running the agent
+        loop = asyncio.get_running_loop()
+        owned: Dict[str, asyncio.Future] = {}
+        flights: Dict[str, asyncio.Future] = {}
+        for triage_data in pending:
+            key = str(triage_data.id)
+            if not single_flight.in_flight(key):
+                owned[key] = loop.create_future()
+            flights[key] = single_flight.task(key, lambda future=owned.get(key): future)
+
+        try:
+            unsaved = await analyze_batch(
+                [triage_data for triage_data in pending if str(triage_data.id) in owned],
+                owned, supabase, batch.refresh, timings
+            )
+        except Exception as e:
+            for future in owned.values():
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        finally:
+            for future in owned.values():
+                future.cancel()
+
+        outcomes = await asyncio.gather(*(asyncio.shield(flight) for flight in flights.values()), return_exceptions=True)
+        for key, outcome in zip(flights, outcomes):
+            if isinstance(outcome, TriageData) and key not in unsaved:
+                response.results.append(outcome)
+            else:
+                response.failed.append(UUID(key))
+
+        logger.info(
+            f"Processed batch of {len(assessment_ids)} assessments: {len(pending)} analyzed, "
+            f"{len(response.not_found)} not found, {len(response.failed)} failed"
+        )
+        return ModelJSONResponse(response, headers={"Server-Timing": timings.server_timing()})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        ERRORS.labels(kind="internal").inc()
+        logger.error(f"Error processing assessment batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        timings.observe()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""Stand-in for DescriptorAgent that needs no model weights, TensorFlow or network.
+
+It has the same methods and response shapes as the real agent. It
+downloads each image through the shared HTTP pool, like the real one, so
+the transport stays in the measured path. Classification and retrieval are
+replaced by deterministic results and fixed sleeps:
+
+    BENCH_FAKE_PREDICT_MS   simulated ResNet predict per call (default 40)
+    BENCH_FAKE_EMBED_MS     simulated query embedding + FAISS search (default 5)
+"""
+import hashlib
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from network.http_pool import get_http_pool
+
+CLASSES = ["Acne", "Eczema", "Psoriasis", "Melanoma", "Rosacea", "Vitiligo"]
+CONDITIONS_PER_QUERY = 3
+
+
+def _fraction(text: str) -> float:
+    """Deterministic value in [0, 1) derived from text."""
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+
+class FakeDescriptorAgent:
+    def __init__(self):
+        self.predict_seconds = float(os.getenv("BENCH_FAKE_PREDICT_MS", "40")) / 1000.0
+        self.embed_seconds = float(os.getenv("BENCH_FAKE_EMBED_MS", "5")) / 1000.0
+
+    def readiness(self) -> Dict[str, bool]:
+        return {"classifier": True, "embedder": True, "faiss_index": True}
+
+    def warm_up(self) -> Dict[str, Any]:
+        return {**self.readiness(), "warm_up_seconds": 0.0}
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        return None
+
+    def _timed(self, timings: Dict[str, float], stage: str, started: float):
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+    def _classify(self, image_url: str, timings: Dict[str, float]) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        response = get_http_pool().get(image_url, target="image")
+        response.raise_for_status()
+        self._timed(timings, "image_download", started)
+
+        started = time.perf_counter()
+        time.sleep(self.predict_seconds)
+        self._timed(timings, "predict", started)
+
+        seed = _fraction(image_url)
+        first = int(seed * len(CLASSES))
+        return [
+            {
+                "class": CLASSES[(first + i) % len(CLASSES)],
+                "confidence": round(0.9 * (1 - seed) / (i + 1), 4),
+                "description": f"Skin condition: {CLASSES[(first + i) % len(CLASSES)]}",
+            }
+            for i in range(5)
+        ]
+
+    def _find_relevant_conditions(self, query: str, timings: Dict[str, float]) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        time.sleep(self.embed_seconds)
+        self._timed(timings, "faiss_search", started)
+
+        seed = _fraction(query)
+        return [
+            {
+                "id": f"condition-{int(seed * 1000) + i}",
+                "data": f"Condition {int(seed * 1000) + i}: Simulated description for {query}",
+                "score": round(0.8 - 0.1 * i - 0.2 * seed, 4),
+            }
+            for i in range(CONDITIONS_PER_QUERY)
+        ]
+
+    def invoke_stages(self, query: str, session_id: str, image_url: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        timings: Dict[str, float] = {}
+        response = {
+            "text_analysis": None,
+            "image_analysis": None,
+            "relevant_conditions": [],
+            "timings": timings,
+        }
+
+        if image_url:
+            image_analysis = self._classify(image_url, timings)
+            response["image_analysis"] = image_analysis
+            yield {"stage": "image_classification", "image_analysis": image_analysis}
+            response["relevant_conditions"] = self._find_relevant_conditions(image_analysis[0]["class"], timings)
+
+        if query:
+            existing_ids = {c["id"] for c in response["relevant_conditions"]}
+            response["relevant_conditions"].extend(
+                c for c in self._find_relevant_conditions(query, timings) if c["id"] not in existing_ids
+            )
+
+        yield {"stage": "relevant_conditions", "relevant_conditions": response["relevant_conditions"]}
+        yield {"stage": "complete", "response": response}
+
+    def invoke(self, query: str, session_id: str, image_url: Optional[str] = None) -> Dict[str, Any]:
+        response = None
+        for stage in self.invoke_stages(query, session_id, image_url):
+            if stage["stage"] == "complete":
+                response = stage["response"]
+        return response
+
+    def invoke_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        responses = [self.invoke(item.get("query"), item.get("session_id"), item.get("image_url")) for item in items]
+        # Like the real agent, every response shares the timings of the whole batch
+        timings: Dict[str, float] = {}
+        for response in responses:
+            for stage, seconds in response["timings"].items():
+                timings[stage] = timings.get(stage, 0.0) + seconds
+            response["timings"] = timings
+        return responses
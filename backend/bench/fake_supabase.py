@@ -0,0 +1,321 @@
+"""In-memory stand-in for the Supabase client used by the triage API.
+
+Implements the subset of the supabase-py / postgrest query builder the API
+calls (select with aliases and embedded possible_diagnoses, eq, in_, or_,
+order, limit, range, update, upsert, insert) plus the backend's RPCs, over
+the assessments, possible_diagnoses and triage_analysis_claims tables. Every
+UPDATE of an existing row, including the one an upsert makes, fires the
+table's BEFORE UPDATE trigger from schema.sql, so updated_at moves exactly
+when it would in Postgres. An optional per-call latency simulates the
+database round trip.
+"""
+import copy
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+# Foreign keys of embedded selects: child table -> column referencing assessments.id
+EMBEDDED_RELATIONS = {"possible_diagnoses": "assessment_id"}
+
+COMPARATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+}
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def update_updated_at_column(row: Dict[str, Any]):
+    row["updated_at"] = now_iso()
+
+
+# BEFORE UPDATE triggers of schema.sql: table -> function applied to the new row
+UPDATE_TRIGGERS: Dict[str, Callable[[Dict[str, Any]], None]] = {
+    "assessments": update_updated_at_column,  # update_assessments_updated_at
+}
+
+
+def split_top_level(text: str) -> List[str]:
+    """Split on commas that are not inside parentheses or double quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+
+def parse_logic_tree(text: str) -> Callable[[Dict[str, Any]], bool]:
+    """Compile a PostgREST or=(...) filter body, e.g. 'a.lt.1,and(a.eq.1,b.lt.2)'."""
+    predicates = [_parse_condition(part) for part in split_top_level(text)]
+    return lambda row: any(predicate(row) for predicate in predicates)
+
+
+def _parse_condition(text: str) -> Callable[[Dict[str, Any]], bool]:
+    for operator, combine in (("and(", all), ("or(", any)):
+        if text.startswith(operator) and text.endswith(")"):
+            predicates = [_parse_condition(part) for part in split_top_level(text[len(operator):-1])]
+            return lambda row, predicates=predicates, combine=combine: combine(p(row) for p in predicates)
+
+    column, operator, value = text.split(".", 2)
+    value = value[1:-1] if value.startswith('"') and value.endswith('"') else value
+    compare = COMPARATORS[operator]
+    return lambda row: compare(row.get(column), value)
+
+
+class InMemorySupabase:
+    """Thread-safe in-memory database answering the Supabase client calls."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.tables: Dict[str, Dict[str, Dict[str, Any]]] = {
+            "assessments": {},
+            "possible_diagnoses": {},
+            # Keyed by assessment_id, its primary key
+            "triage_analysis_claims": {},
+        }
+        self.lock = threading.RLock()
+        self.calls = 0
+        self.rpcs: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "persist_triage_analysis": self._persist_triage_analysis,
+            "persist_triage_analyses": self._persist_triage_analyses,
+            "claim_triage_analysis": self._claim_triage_analysis,
+            "release_triage_analysis": self._release_triage_analysis,
+        }
+
+    # -------------------------------------------------------------------------
+    # supabase.Client surface
+    # -------------------------------------------------------------------------
+    def table(self, name: str) -> "QueryBuilder":
+        return QueryBuilder(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> "RpcCall":
+        return RpcCall(self, name, params)
+
+    # -------------------------------------------------------------------------
+    # Seeding
+    # -------------------------------------------------------------------------
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        with self.lock:
+            for row in rows:
+                self.tables[table][str(row["id"])] = copy.deepcopy(row)
+
+    def update_row(self, table: str, row: Dict[str, Any], values: Dict[str, Any]):
+        """UPDATE one stored row in place and fire the table's BEFORE UPDATE trigger."""
+        row.update(values)
+        trigger = UPDATE_TRIGGERS.get(table)
+        if trigger is not None:
+            trigger(row)
+
+    def _round_trip(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    # -------------------------------------------------------------------------
+    # RPCs
+    # -------------------------------------------------------------------------
+    def _persist_triage_analysis(self, params: Dict[str, Any]):
+        assessment_id = str(params["p_assessment_id"])
+        diagnoses = params.get("p_diagnoses") or []
+        for row in diagnoses:
+            stored = self.tables["possible_diagnoses"].get(str(row["id"]))
+            merged = {"created_at": now_iso(), **(stored or {}), **row}
+            self.tables["possible_diagnoses"][str(row["id"])] = merged
+
+        assessment = self.tables["assessments"].get(assessment_id)
+        if assessment is None:
+            return None
+        if params.get("p_update"):
+            self.update_row("assessments", assessment, params["p_update"])
+        elif diagnoses:
+            self.update_row("assessments", assessment, {})
+        return assessment["updated_at"]
+
+    def _persist_triage_analyses(self, params: Dict[str, Any]):
+        for analysis in params["p_analyses"]:
+            self._persist_triage_analysis({
+                "p_assessment_id": analysis["assessment_id"],
+                "p_update": analysis.get("update"),
+                "p_diagnoses": analysis.get("diagnoses"),
+            })
+
+    def _claim_triage_analysis(self, params: Dict[str, Any]) -> bool:
+        assessment_id = str(params["p_assessment_id"])
+        if assessment_id not in self.tables["assessments"]:
+            return False
+        claims = self.tables["triage_analysis_claims"]
+        claim = claims.get(assessment_id)
+        expired = claim is None or (
+            datetime.fromisoformat(claim["claimed_at"])
+            < datetime.now(timezone.utc) - timedelta(seconds=params["p_ttl_seconds"])
+        )
+        if expired or claim["claimed_by"] == params["p_worker"]:
+            claims[assessment_id] = {
+                "assessment_id": assessment_id,
+                "claimed_by": params["p_worker"],
+                "claimed_at": now_iso(),
+            }
+            return True
+        return False
+
+    def _release_triage_analysis(self, params: Dict[str, Any]):
+        assessment_id = str(params["p_assessment_id"])
+        claim = self.tables["triage_analysis_claims"].get(assessment_id)
+        if claim is not None and claim["claimed_by"] == params["p_worker"]:
+            del self.tables["triage_analysis_claims"][assessment_id]
+
+
+class RpcCall:
+    def __init__(self, db: InMemorySupabase, name: str, params: Dict[str, Any]):
+        self.db = db
+        self.name = name
+        self.params = params
+
+    def execute(self) -> SimpleNamespace:
+        handler = self.db.rpcs.get(self.name)
+        if handler is None:
+            raise APIError({
+                "code": "PGRST202",
+                "message": f"Could not find the function public.{self.name} in the schema cache",
+            })
+        with self.db.lock:
+            self.db._round_trip()
+            return SimpleNamespace(data=copy.deepcopy(handler(self.params)))
+
+
+class QueryBuilder:
+    """Chainable query over one table, evaluated on execute()."""
+
+    def __init__(self, db: InMemorySupabase, table: str):
+        self.db = db
+        self.table = table
+        self.columns: Optional[str] = None
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.orders: List[Tuple[str, bool]] = []
+        self.row_limit: Optional[int] = None
+        self.row_offset = 0
+        self.write: Optional[Tuple[str, Any]] = None
+
+    # Reads
+    def select(self, columns: str = "*") -> "QueryBuilder":
+        self.columns = columns
+        return self
+
+    def eq(self, column: str, value: Any) -> "QueryBuilder":
+        self.filters.append(lambda row: str(row.get(column)) == str(value))
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "QueryBuilder":
+        wanted = {str(value) for value in values}
+        self.filters.append(lambda row: str(row.get(column)) in wanted)
+        return self
+
+    def or_(self, filters: str) -> "QueryBuilder":
+        self.filters.append(parse_logic_tree(filters))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "QueryBuilder":
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count: int) -> "QueryBuilder":
+        self.row_limit = count
+        return self
+
+    def range(self, start: int, end: int) -> "QueryBuilder":
+        self.row_offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    # Writes
+    def update(self, values: Dict[str, Any]) -> "QueryBuilder":
+        self.write = ("update", values)
+        return self
+
+    def insert(self, rows: Any) -> "QueryBuilder":
+        self.write = ("insert", rows if isinstance(rows, list) else [rows])
+        return self
+
+    def upsert(self, rows: Any, on_conflict: str = "id") -> "QueryBuilder":
+        self.write = ("upsert", rows if isinstance(rows, list) else [rows])
+        return self
+
+    def execute(self) -> SimpleNamespace:
+        with self.db.lock:
+            self.db._round_trip()
+            if self.write is not None:
+                return SimpleNamespace(data=self._execute_write())
+            return SimpleNamespace(data=self._execute_read())
+
+    def _matching(self) -> List[Dict[str, Any]]:
+        return [row for row in self.db.tables[self.table].values() if all(f(row) for f in self.filters)]
+
+    def _execute_read(self) -> List[Dict[str, Any]]:
+        rows = self._matching()
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column) or ""), reverse=desc)
+        end = None if self.row_limit is None else self.row_offset + self.row_limit
+        rows = rows[self.row_offset:end]
+        return [self._project(row, self.columns or "*") for row in rows]
+
+    def _project(self, row: Dict[str, Any], columns: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for spec in split_top_level(columns):
+            if spec == "*":
+                result.update(copy.deepcopy(row))
+            elif spec.endswith(")"):
+                child, _, child_columns = spec[:-1].partition("(")
+                foreign_key = EMBEDDED_RELATIONS[child]
+                result[child] = [
+                    self._project(child_row, child_columns)
+                    for child_row in self.db.tables[child].values()
+                    if str(child_row.get(foreign_key)) == str(row["id"])
+                ]
+            else:
+                alias, _, column = spec.partition(":")
+                column = column or alias
+                result[alias] = copy.deepcopy(row.get(column))
+        return result
+
+    def _execute_write(self) -> List[Dict[str, Any]]:
+        kind, payload = self.write
+        table = self.db.tables[self.table]
+        if kind == "update":
+            rows = self._matching()
+            for row in rows:
+                self.db.update_row(self.table, row, payload)
+            return copy.deepcopy(rows)
+
+        written = []
+        for row in payload:
+            key = str(row["id"])
+            stored = table.get(key)
+            if stored is None:
+                stored = table[key] = {"created_at": now_iso(), **row}
+            elif kind == "insert":
+                raise APIError({"code": "23505", "message": f"duplicate key value violates unique constraint ({key})"})
+            else:
+                self.db.update_row(self.table, stored, row)
+            written.append(copy.deepcopy(stored))
+        return written
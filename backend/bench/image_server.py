@@ -0,0 +1,59 @@
+"""Local static file server for the images the benchmark's assessments point at."""
+import functools
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the storage bucket
+
+    def log_message(self, format, *args):
+        pass
+
+
+def generate_images(directory: Path, count: int, size: Tuple[int, int]) -> List[str]:
+    """Write ``count`` random JPEGs of ``size`` (width, height) and return their file names."""
+    rng = np.random.default_rng(0)
+    names = []
+    for i in range(count):
+        pixels = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+        name = f"bench_{i:03d}.jpg"
+        cv2.imwrite(str(directory / name), pixels, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        names.append(name)
+    return names
+
+
+class ImageServer:
+    """Serves generated JPEGs from a temporary directory on 127.0.0.1."""
+
+    def __init__(self, count: int = 16, size: Tuple[int, int] = (1024, 768), directory: Optional[Path] = None):
+        self._tempdir = None if directory else tempfile.TemporaryDirectory(prefix="triage-bench-")
+        self.directory = Path(directory or self._tempdir.name)
+        self.names = generate_images(self.directory, count, size)
+        handler = functools.partial(QuietHandler, directory=str(self.directory))
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="bench-image-server", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def urls(self) -> List[str]:
+        return [f"{self.base_url}/{name}" for name in self.names]
+
+    def start(self) -> "ImageServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._tempdir:
+            self._tempdir.cleanup()
@@ -0,0 +1,144 @@
+"""Closed-loop load generator and latency report for the triage API."""
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+# One request of a scenario: (client, request index) -> response
+RequestFn = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(values))))
+    return values[min(rank, len(values)) - 1]
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """Server-Timing header -> {stage: milliseconds}."""
+    stages: Dict[str, float] = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if name and key == "dur":
+                stages[name] = float(value)
+    return stages
+
+
+@dataclass
+class LoadResult:
+    scenario: str
+    concurrency: int
+    duration_seconds: float
+    latencies_ms: List[float] = field(default_factory=list)
+    statuses: Dict[int, int] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    stages_ms: Dict[str, List[float]] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+        completed = len(latencies)
+        return {
+            "scenario": self.scenario,
+            "concurrency": self.concurrency,
+            "requests": completed,
+            "duration_seconds": round(self.duration_seconds, 3),
+            "throughput_rps": round(completed / self.duration_seconds, 2) if self.duration_seconds else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / completed, 2) if completed else 0.0,
+                "p50": round(percentile(latencies, 50), 2),
+                "p95": round(percentile(latencies, 95), 2),
+                "p99": round(percentile(latencies, 99), 2),
+                "max": round(latencies[-1], 2) if latencies else 0.0,
+            },
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "errors": self.errors,
+            "stages_ms": {
+                stage: {
+                    "count": len(values),
+                    "mean": round(sum(values) / len(values), 2),
+                    "p50": round(percentile(sorted(values), 50), 2),
+                    "p95": round(percentile(sorted(values), 95), 2),
+                }
+                for stage, values in sorted(self.stages_ms.items())
+            },
+        }
+
+
+async def run_load(
+    base_url: str,
+    scenario: str,
+    request_fn: RequestFn,
+    concurrency: int,
+    requests: Optional[int] = None,
+    duration: Optional[float] = None,
+    warmup: int = 0,
+    timeout: float = 120.0
+) -> LoadResult:
+    """
+    Drive request_fn from ``concurrency`` workers until ``requests`` have been
+    sent or ``duration`` seconds have passed. The first ``warmup`` requests are
+    sent sequentially and excluded from the results.
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        for i in range(warmup):
+            await request_fn(client, i)
+
+        result = LoadResult(scenario=scenario, concurrency=concurrency, duration_seconds=0.0)
+        counter = itertools.count(warmup)
+        deadline = time.perf_counter() + duration if duration else None
+        last = warmup + requests if requests else None
+
+        async def worker():
+            while True:
+                index = next(counter)
+                if last is not None and index >= last:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                started = time.perf_counter()
+                try:
+                    response = await request_fn(client, index)
+                except Exception as e:
+                    name = type(e).__name__
+                    result.errors[name] = result.errors.get(name, 0) + 1
+                    continue
+                result.latencies_ms.append((time.perf_counter() - started) * 1000)
+                result.statuses[response.status_code] = result.statuses.get(response.status_code, 0) + 1
+                for stage, ms in parse_server_timing(response.headers.get("server-timing")).items():
+                    result.stages_ms.setdefault(stage, []).append(ms)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        result.duration_seconds = time.perf_counter() - started
+        return result
+
+
+def format_report(summary: Dict[str, Any]) -> str:
+    """Human-readable report of a LoadResult.summary()."""
+    latency = summary["latency_ms"]
+    lines = [
+        f"scenario     {summary['scenario']} (concurrency {summary['concurrency']})",
+        f"requests     {summary['requests']} in {summary['duration_seconds']}s "
+        f"-> {summary['throughput_rps']} req/s",
+        f"latency ms   mean {latency['mean']}  p50 {latency['p50']}  p95 {latency['p95']}  "
+        f"p99 {latency['p99']}  max {latency['max']}",
+        f"statuses     {summary['statuses']}",
+    ]
+    if summary["errors"]:
+        lines.append(f"errors       {summary['errors']}")
+    if summary["stages_ms"]:
+        lines.append("stages (Server-Timing, ms):")
+        for stage, stats in summary["stages_ms"].items():
+            lines.append(
+                f"  {stage:<20} n={stats['count']:<6} mean {stats['mean']:<9} "
+                f"p50 {stats['p50']:<9} p95 {stats['p95']}"
+            )
+    return "\n".join(lines)
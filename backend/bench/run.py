@@ -0,0 +1,209 @@
+"""
+Benchmark the triage API end to end on one machine, without network access.
+
+Boots api.triage_endpoint:app under uvicorn on 127.0.0.1 with an in-memory
+Supabase stand-in, a local image server and a fake (or the real) agent, then
+drives it at a fixed concurrency and reports throughput, p50/p95/p99 latency
+and the per-stage breakdown from the Server-Timing headers.
+
+Usage (from backend/):
+    python -m bench.run --scenario get --concurrency 16 --requests 2000
+    python -m bench.run --scenario refresh --duration 30 --json results.json
+    python -m bench.run --agent real ...   # needs the model weights and GOOGLE_API_KEY
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import httpx
+
+from bench.fake_supabase import InMemorySupabase
+from bench.image_server import ImageServer
+from bench.load import RequestFn, format_report, run_load
+
+SCENARIOS = ("get", "refresh", "conditional", "list", "batch", "stream")
+AGENTS = {
+    "fake": "bench.fake_agent:FakeDescriptorAgent",
+    "real": "agents.agent1.agent:DescriptorAgent",
+}
+SYMPTOMS = [
+    "Itchy red rash on my forearm for three days",
+    "Dark irregular mole on my back that has grown",
+    "Dry scaly patches on elbows and knees",
+    "Painful pimples on my face and chest",
+    "White patches of skin on my hands",
+]
+
+
+def seed_assessments(store: InMemorySupabase, image_urls: List[str], count: int, users: int) -> List[str]:
+    """Insert ``count`` unanalyzed assessments spread over ``users`` users; returns their ids."""
+    rng = random.Random(0)
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(users)]
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        created_at = (start + timedelta(minutes=i)).isoformat()
+        rows.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "user_id": user_ids[i % users],
+            "symptom_description": SYMPTOMS[i % len(SYMPTOMS)],
+            "image_url": image_urls[i % len(image_urls)],
+            "patient_age": 20 + i % 50,
+            "pain_level": str(i % 10),
+            "affected_body_parts": "arm, back",
+            "has_fever": False,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+    store.insert_rows("assessments", rows)
+    return [row["id"] for row in rows]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_api(store: InMemorySupabase, port: int, verbose: bool):
+    """Import the app against the in-memory store and serve it on a background thread."""
+    import supabase
+    supabase.create_client = lambda *args, **kwargs: store
+
+    import uvicorn
+    from api import triage_endpoint
+
+    if not verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    config = uvicorn.Config(
+        triage_endpoint.app, host="127.0.0.1", port=port,
+        log_level="info" if verbose else "warning", access_log=verbose
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name="bench-api", daemon=True)
+    thread.start()
+    return server, thread
+
+
+def wait_ready(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API did not become ready within {timeout:.0f}s")
+
+
+def build_scenario(name: str, base_url: str, ids: List[str], batch_size: int) -> RequestFn:
+    """Request function for a scenario, doing any priming requests it needs."""
+    if name == "get":
+        return lambda client, i: client.get(f"/api/triage/{ids[i % len(ids)]}")
+
+    if name == "refresh":
+        return lambda client, i: client.get(f"/api/triage/{ids[i % len(ids)]}", params={"refresh": "true"})
+
+    if name == "stream":
+        return lambda client, i: client.get(f"/api/triage/{ids[i % len(ids)]}/stream")
+
+    if name == "batch":
+        def batch(client: httpx.AsyncClient, i: int):
+            start = (i * batch_size) % len(ids)
+            chunk = (ids[start:] + ids[:start])[:batch_size]
+            return client.post("/api/triage/batch", json={"assessment_ids": chunk, "refresh": True})
+        return batch
+
+    if name == "conditional":
+        etags: Dict[str, str] = {}
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            for assessment_id in ids:
+                etags[assessment_id] = client.get(f"/api/triage/{assessment_id}").headers.get("etag", "")
+        return lambda client, i: client.get(
+            f"/api/triage/{ids[i % len(ids)]}",
+            headers={"If-None-Match": etags[ids[i % len(ids)]]}
+        )
+
+    if name == "list":
+        cursors: List[Any] = [None]
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            while True:
+                params = {"limit": 20, **({"after": cursors[-1]} if cursors[-1] else {})}
+                next_cursor = client.get("/api/triage", params=params).json().get("next_cursor")
+                if not next_cursor:
+                    break
+                cursors.append(next_cursor)
+        return lambda client, i: client.get(
+            "/api/triage",
+            params={"limit": 20, **({"after": cursors[i % len(cursors)]} if cursors[i % len(cursors)] else {})}
+        )
+
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the triage API with local stand-ins")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="get")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests to send (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead of --requests")
+    parser.add_argument("--warmup", type=int, default=20, help="Sequential requests excluded from the results")
+    parser.add_argument("--assessments", type=int, default=200)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--image-size", default="1024x768", help="WIDTHxHEIGHT of the generated JPEGs")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0, help="Simulated Supabase round trip")
+    parser.add_argument("--agent", default="fake", help="fake, real, or a module:attr agent factory")
+    parser.add_argument("--ready-timeout", type=float, default=600.0)
+    parser.add_argument("--json", help="Also write the summary to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the API's INFO logs")
+    args = parser.parse_args()
+
+    os.environ["INFERENCE_AGENT_FACTORY"] = AGENTS.get(args.agent, args.agent)
+    os.environ.setdefault("SUPABASE_URL", "http://supabase.bench.invalid")
+    os.environ.setdefault("SUPABASE_KEY", "bench")
+
+    width, height = (int(v) for v in args.image_size.lower().split("x"))
+    images = ImageServer(count=args.images, size=(width, height)).start()
+    store = InMemorySupabase(latency_ms=args.db_latency_ms)
+    ids = seed_assessments(store, images.urls(), args.assessments, args.users)
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server, thread = start_api(store, port, args.verbose)
+    try:
+        wait_ready(base_url, args.ready_timeout)
+        request_fn = build_scenario(args.scenario, base_url, ids, args.batch_size)
+        result = asyncio.run(run_load(
+            base_url, args.scenario, request_fn, args.concurrency,
+            requests=None if args.duration else args.requests,
+            duration=args.duration,
+            warmup=args.warmup
+        ))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        images.stop()
+
+    summary = result.summary()
+    summary["supabase_calls"] = store.calls
+    print(format_report(summary))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
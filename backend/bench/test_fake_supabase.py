@@ -0,0 +1,54 @@
+import unittest
+import sys
+sys.path.append('.')  # Run from backend/
+from bench.fake_supabase import InMemorySupabase
+
+ASSESSMENT_ID = "6f1c2b1e-4a53-4e1f-9d4c-0a4f3c7b9e21"
+DIAGNOSIS_ID = "0b0f8f0e-1c6e-5d2a-9d1e-6a3c2f1b0a01"
+UPDATED_AT = "2025-01-01T00:00:00+00:00"
+
+class TestUpdateTrigger(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with one assessment and one diagnosis"""
+        self.db = InMemorySupabase()
+        self.db.insert_rows("assessments", [{"id": ASSESSMENT_ID, "created_at": UPDATED_AT, "updated_at": UPDATED_AT}])
+        self.db.insert_rows("possible_diagnoses", [{
+            "id": DIAGNOSIS_ID,
+            "assessment_id": ASSESSMENT_ID,
+            "confidence_score": 0.5,
+            "created_at": UPDATED_AT
+        }])
+
+    def updated_at(self):
+        return self.db.tables["assessments"][ASSESSMENT_ID]["updated_at"]
+
+    def test_update_bumps_updated_at(self):
+        """Test that an UPDATE of assessments sets updated_at, even with an unchanged value"""
+        self.db.table("assessments").update({"severity_score": None}).eq("id", ASSESSMENT_ID).execute()
+        self.assertGreater(self.updated_at(), UPDATED_AT)
+
+    def test_client_cannot_set_updated_at(self):
+        """Test that the trigger overrides an updated_at sent by the client"""
+        self.db.table("assessments").update({"updated_at": UPDATED_AT}).eq("id", ASSESSMENT_ID).execute()
+        self.assertGreater(self.updated_at(), UPDATED_AT)
+
+    def test_upsert_of_existing_row_bumps_updated_at(self):
+        """Test that an upsert hitting an existing row fires the UPDATE trigger"""
+        self.db.table("assessments").upsert({"id": ASSESSMENT_ID, "severity_score": 2}).execute()
+        self.assertGreater(self.updated_at(), UPDATED_AT)
+
+    def test_other_tables_have_no_trigger(self):
+        """Test that writes to possible_diagnoses leave both tables' timestamps alone"""
+        self.db.table("possible_diagnoses").update({"confidence_score": 0.6}).eq("id", DIAGNOSIS_ID).execute()
+        self.assertNotIn("updated_at", self.db.tables["possible_diagnoses"][DIAGNOSIS_ID])
+        self.assertEqual(self.updated_at(), UPDATED_AT)
+
+    def test_reads_and_claims_leave_updated_at_alone(self):
+        """Test that only writes to assessments move updated_at"""
+        self.db.table("assessments").select("*").eq("id", ASSESSMENT_ID).execute()
+        self.db.rpc("claim_triage_analysis", {"p_assessment_id": ASSESSMENT_ID, "p_worker": "w", "p_ttl_seconds": 60}).execute()
+        self.db.rpc("release_triage_analysis", {"p_assessment_id": ASSESSMENT_ID, "p_worker": "w"}).execute()
+        self.assertEqual(self.updated_at(), UPDATED_AT)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
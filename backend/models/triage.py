@@ -1,8 +1,23 @@
 from enum import Enum
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import Any, List, Optional
+from pydantic import BaseModel, Field, HttpUrl, field_validator
 from datetime import datetime
 from uuid import UUID
+import json
+
+# Free-text columns stored as JSON arrays or comma-separated strings
+LIST_FIELDS = ("affected_body_parts", "known_allergies", "current_medications", "pre_existing_conditions")
+
+def parse_list_field(value: Optional[str]) -> Optional[List[str]]:
+    """Parse a string field into a list, handling various formats."""
+    if value is None:
+        return None
+    if value == "None" or value == "":
+        return []
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return [item.strip() for item in value.split(",") if item.strip()]
 
 class PatientSex(str, Enum):
     MALE = "male"
@@ -54,6 +69,66 @@ class TriageData(BaseModel):
     severity_reason: Optional[str] = None
     recommendation_status: Optional[str] = None
     triage_recommendation: Optional[str] = None
+    # Hash of the inputs the persisted analysis was made from; internal, not serialized
+    analysis_input_hash: Optional[str] = Field(None, exclude=True)
     possible_diagnoses: List[PossibleDiagnosis] = []
     created_at: datetime
-    updated_at: datetime 
\ No newline at end of file
+    updated_at: datetime
+
+    @field_validator(*LIST_FIELDS, mode="before")
+    @classmethod
+    def split_list_fields(cls, value: Any) -> Any:
+        return parse_list_field(value) if isinstance(value, str) else value
+
+    @field_validator("has_fever", mode="before")
+    @classmethod
+    def default_has_fever(cls, value: Any) -> Any:
+        return False if value is None else value
+
+class AssessmentSummary(BaseModel):
+    id: UUID
+    # assessments.user_id is nullable (ON DELETE SET NULL)
+    user_id: Optional[UUID] = None
+    predicted_injury_label: Optional[str] = None
+    severity_score: Optional[float] = None
+    recommendation_status: Optional[str] = None
+    created_at: datetime
+
+class AssessmentPage(BaseModel):
+    items: List[AssessmentSummary] = []
+    next_cursor: Optional[str] = None
+
+class TriageBatchRequest(BaseModel):
+    assessment_ids: List[UUID] = Field(..., min_length=1)
+    refresh: bool = False
+
+class TriageBatchResponse(BaseModel):
+    results: List[TriageData] = []
+    not_found: List[UUID] = []
+    failed: List[UUID] = []
+
+class TriageJobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class TriageJobRequest(BaseModel):
+    refresh: bool = False
+    callback_url: Optional[HttpUrl] = None
+
+class TriageJob(BaseModel):
+    id: UUID
+    assessment_id: UUID
+    state: TriageJobState = TriageJobState.QUEUED
+    refresh: bool = False
+    # Validated as an HttpUrl by TriageJobRequest, kept as str for serialization
+    callback_url: Optional[str] = None
+    attempts: int = 0
+    result: Optional[TriageData] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queue_seconds: Optional[float] = None
+    compute_seconds: Optional[float] = None
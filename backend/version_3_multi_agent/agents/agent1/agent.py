@@ -1,16 +1,22 @@
 from datetime import datetime 
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, List, Any, Iterator, Tuple, Optional, Union
 import json
 import os
 import io
-import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 import gdown
 
+# Size the native thread pools before TensorFlow, PyTorch, FAISS and OpenCV load
+from runtime.thread_budget import ThreadBudget, apply_thread_budget, configure_thread_env
+THREAD_BUDGET = ThreadBudget.from_env()
+configure_thread_env(THREAD_BUDGET)
+
 # Data processing and model imports
 import numpy as np
 import cv2
-import requests
 import tensorflow as tf
 from tensorflow.keras.models import load_model
 from tensorflow.keras.preprocessing import image as keras_image
@@ -18,6 +24,12 @@ from PIL import Image
 from sentence_transformers import SentenceTransformer
 import faiss
 
+from network.image_fetch import ImageFetcher, ImageFetchError
+from agents.agent1.micro_batcher import MicroBatcher
+from agents.agent1.classifier import CascadeClassifier, CompiledClassifier, create_classifier, undo_resnet_preprocessing
+from agents.agent1.prediction_cache import PredictionCache
+from agents.agent1.image_decode import decode_for_size
+
 # Google imports
 from google.adk.agents.llm_agent import LlmAgent
 from google.adk.sessions import InMemorySessionService
@@ -49,6 +61,20 @@ RAG_DATA_PATH = BASE_DIR / "rag" / "ragData.json"
 MODEL_DIR = BASE_DIR / "weights"
 MODEL_PATH = MODEL_DIR / MODEL_FILENAME
 
+# Classifier backend: keras (resnet152.h5), or the quantized exports produced by
+# classfication-model/export_quantized.py served with onnxruntime or tflite
+CLASSIFIER_BACKEND = os.getenv('AGENT_CLASSIFIER_BACKEND', 'keras')
+EXPORTED_MODEL_FILENAMES = {
+    'onnxruntime': 'resnet152_int8.onnx',
+    'tflite': 'resnet152_int8.tflite'
+}
+
+# Optional cascade: a small front model (classfication-model/front_model.py)
+# answers confident images and ResNet152 only runs for the rest
+CASCADE_MODEL_PATH = os.getenv('AGENT_CASCADE_MODEL')
+CASCADE_MIN_CONFIDENCE = float(os.getenv('AGENT_CASCADE_MIN_CONFIDENCE', '0.8'))
+CASCADE_MIN_MARGIN = float(os.getenv('AGENT_CASCADE_MIN_MARGIN', '0.0'))
+
 def download_model_if_needed():
     """Download the model from Google Drive if it doesn't exist locally"""
     if MODEL_PATH.exists():
@@ -103,6 +129,62 @@ CLASS_MAPPING = {
 EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
 TOP_K_RESULTS = 3
 IMAGE_SIZE = (224, 224)
+PREDICT_BATCH_SIZE = 16
+
+# Concurrent predict calls are grouped into one forward pass of up to this many
+# images, waiting at most PREDICT_MAX_WAIT_MS for callers still preprocessing;
+# a lone caller does not wait (1 disables it)
+PREDICT_MAX_BATCH = int(os.getenv('AGENT_PREDICT_MAX_BATCH', str(PREDICT_BATCH_SIZE)))
+PREDICT_MAX_WAIT_MS = float(os.getenv('AGENT_PREDICT_MAX_WAIT_MS', '10'))
+
+# Largest image body the fetcher will download before decoding
+MAX_IMAGE_BYTES = int(os.getenv('AGENT_MAX_IMAGE_BYTES', str(10 * 1024 * 1024)))
+INVALID_IMAGE_ERROR = 'invalid_image'
+CLASSIFICATION_ERROR = 'classification_failed'
+
+# Predictions cached by image bytes and model version: an in-memory LRU of this
+# many bytes, plus an optional SQLite file shared by all workers on the host
+PREDICTION_CACHE_BYTES = int(os.getenv('AGENT_PREDICTION_CACHE_BYTES', str(16 * 1024 * 1024)))
+PREDICTION_CACHE_DB = os.getenv('AGENT_PREDICTION_CACHE_DB')
+PREDICTION_CACHE_DB_MAX_ENTRIES = int(os.getenv('AGENT_PREDICTION_CACHE_DB_MAX_ENTRIES', '100000'))
+
+class ImageLoadError(Exception):
+    """Raised when an image cannot be downloaded, breaks the limits, or cannot be decoded"""
+    pass
+
+class ClassificationError(Exception):
+    """Raised when a loaded image cannot be classified (no classifier, or preprocess/predict failed)"""
+    pass
+
+def decode_image(data: Union[bytes, memoryview], target_size: Optional[Tuple[int, int]] = IMAGE_SIZE) -> np.ndarray:
+    """Decode encoded image bytes into a BGR array in memory
+
+    Large JPEGs are decoded directly at 1/2, 1/4 or 1/8 scale, never below
+    target_size, since they are resized to the model input right after.
+    """
+    img = decode_for_size(data, target_size)
+    if img is None:
+        raise ImageLoadError(f"Could not decode image ({len(data)} bytes)")
+    return img
+
+# Per-thread accumulator of stage latencies for the call currently running
+_stage_timings = threading.local()
+
+@contextmanager
+def timed_stage(stage: str):
+    """Add the time spent in the block to the current call's stage timings"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = getattr(_stage_timings, 'current', None)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+def start_stage_timings() -> Dict[str, float]:
+    """Begin collecting stage timings for a new call on this thread"""
+    _stage_timings.current = {}
+    return _stage_timings.current
 
 class DescriptorAgent:
     """Agent that provides medical condition descriptions and image analysis"""
@@ -114,6 +196,12 @@ class DescriptorAgent:
         self.faiss_passages = []
         self.faiss_ids = []
         self.classification_model = None
+        self.classifier = None
+        self.classifier_batcher = None
+        self.prediction_cache = None
+        self.image_fetcher = ImageFetcher.from_env(max_bytes=MAX_IMAGE_BYTES)
+        self.thread_budget = THREAD_BUDGET
+        print(f"Thread budget {THREAD_BUDGET.to_dict()}: {apply_thread_budget(THREAD_BUDGET)}")
         self._initialize_models()
 
     def _initialize_models(self):
@@ -154,52 +242,239 @@ class DescriptorAgent:
             self.faiss_index = None
 
     def _initialize_classification_model(self):
-        """Initialize the custom ResNet152 model"""
+        """Initialize the custom ResNet152 model on the configured backend"""
         try:
-            # Download model if needed before loading
-            if download_model_if_needed():
-                self.classification_model = load_model(MODEL_PATH)
+            if CLASSIFIER_BACKEND == 'keras':
+                # Download model if needed before loading
+                model_path = os.getenv('AGENT_CLASSIFIER_MODEL') or (MODEL_PATH if download_model_if_needed() else None)
+            else:
+                model_path = os.getenv('AGENT_CLASSIFIER_MODEL') or MODEL_DIR / EXPORTED_MODEL_FILENAMES.get(CLASSIFIER_BACKEND, '')
+
+            if model_path:
+                self.classifier, self.classification_model = create_classifier(
+                    CLASSIFIER_BACKEND, model_path, top_k=5, image_size=IMAGE_SIZE, batch_size=PREDICT_BATCH_SIZE,
+                    num_threads=self.thread_budget.tf_intra
+                )
+                print(f"Classifier loaded with the {CLASSIFIER_BACKEND} backend from {model_path}")
+                if CASCADE_MODEL_PATH:
+                    self._initialize_cascade()
+                self._initialize_prediction_cache(model_path)
+                if PREDICT_MAX_BATCH > 1:
+                    self.classifier_batcher = MicroBatcher(
+                        self.classifier,
+                        max_batch_size=PREDICT_MAX_BATCH,
+                        max_wait=PREDICT_MAX_WAIT_MS / 1000.0
+                    )
             else:
                 print("Failed to download model from Supabase")
                 self.classification_model = None
         except Exception as e:
             print(f"Error loading classification model: {e}")
             self.classification_model = None
+            self.classifier = None
 
-    def _process_image(self, image_url: str) -> List[Dict[str, Any]]:
-        """Process an image using the custom ResNet152 model, matching the inference.py pipeline"""
-        if not self.classification_model:
-            return []
-
+    def _initialize_cascade(self):
+        """Put the front model before the full classifier; the full one is kept if it fails to load"""
         try:
-            response = requests.get(image_url)
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp:
-                tmp.write(response.content)
-                tmp_path = tmp.name
+            front_model = load_model(CASCADE_MODEL_PATH, compile=False)
+        except Exception as e:
+            print(f"Error loading cascade front model, using the full classifier only: {e}")
+            return
+        # The front model takes 0-255 RGB pixels, so it undoes the ResNet preprocessing in-graph
+        front = CompiledClassifier(
+            front_model, top_k=5, image_size=IMAGE_SIZE, batch_size=PREDICT_BATCH_SIZE,
+            input_transform=undo_resnet_preprocessing
+        )
+        self.classifier = CascadeClassifier(
+            front, self.classifier, min_confidence=CASCADE_MIN_CONFIDENCE, min_margin=CASCADE_MIN_MARGIN
+        )
+        print(
+            f"Cascade enabled with {CASCADE_MODEL_PATH} "
+            f"(min confidence {CASCADE_MIN_CONFIDENCE}, min margin {CASCADE_MIN_MARGIN})"
+        )
+
+    def _initialize_prediction_cache(self, model_path: Union[str, Path]):
+        """Set up the prediction cache, keyed to this exact model file (and cascade setup); classification runs uncached if it fails"""
+        try:
+            stat = Path(model_path).stat()
+            model_version = os.getenv('AGENT_MODEL_VERSION') or (
+                f"{CLASSIFIER_BACKEND}:{Path(model_path).name}:{stat.st_size}:{int(stat.st_mtime)}"
+            )
+            if isinstance(self.classifier, CascadeClassifier) and not os.getenv('AGENT_MODEL_VERSION'):
+                front_stat = Path(CASCADE_MODEL_PATH).stat()
+                model_version += (
+                    f"|cascade:{Path(CASCADE_MODEL_PATH).name}:{front_stat.st_size}:{int(front_stat.st_mtime)}"
+                    f":{CASCADE_MIN_CONFIDENCE}:{CASCADE_MIN_MARGIN}"
+                )
+            cache = PredictionCache(
+                model_version,
+                max_bytes=PREDICTION_CACHE_BYTES,
+                db_path=PREDICTION_CACHE_DB,
+                max_disk_entries=PREDICTION_CACHE_DB_MAX_ENTRIES
+            )
+        except Exception as e:
+            print(f"Warning: Failed to initialize prediction cache, predictions will not be cached: {e}")
+            self.prediction_cache = None
+            return
+        self.prediction_cache = cache if cache.enabled else None
 
-            img = cv2.imread(tmp_path)
-            img = cv2.resize(img, IMAGE_SIZE)
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img_array = np.expand_dims(img, axis=0)
-            img_array = tf.keras.applications.resnet.preprocess_input(img_array)
+    def _fetch_image(self, image_url: str) -> memoryview:
+        """Download an image's bytes with the streaming fetcher
 
-            predictions = self.classification_model.predict(img_array)
+        Raises:
+            ImageLoadError: If the download fails or times out, the response is not
+                an image or is larger than MAX_IMAGE_BYTES
+        """
+        with timed_stage('image_download'):
+            try:
+                return self.image_fetcher.fetch_sync(image_url).data
+            except ImageFetchError as e:
+                raise ImageLoadError(str(e)) from e
+
+    def _cached_predictions(self, data: memoryview) -> Tuple[Optional[str], Optional[List[Dict[str, Any]]]]:
+        """(cache key, cached predictions or None) for an image's bytes"""
+        if not self.prediction_cache:
+            return None, None
+        with timed_stage('prediction_cache'):
+            key = self.prediction_cache.key(data)
+            return key, self.prediction_cache.get(key)
+
+    def _cache_predictions(self, key: Optional[str], predictions: List[Dict[str, Any]]):
+        if key and predictions:
+            self.prediction_cache.put(key, predictions)
+
+    def _preprocess_image(self, img: np.ndarray) -> np.ndarray:
+        """Resize a BGR image to the model input size and convert it to RGB"""
+        img = cv2.resize(img, IMAGE_SIZE)
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+    def _predict(self, img_array: np.ndarray) -> Dict[str, np.ndarray]:
+        """Top-5 scores and class indices for a batch of preprocessed images
+
+        With the micro-batcher enabled, calls from concurrent requests share one
+        forward pass and each caller gets back only its own rows.
+        """
+        if self.classifier_batcher:
+            return self.classifier_batcher.predict(img_array)
+        return self.classifier(img_array)
+
+    def _predict_caller(self):
+        """Announce a coming _predict to the micro-batcher, so concurrent batches wait for it"""
+        if self.classifier_batcher:
+            return self.classifier_batcher.caller()
+        return nullcontext()
+
+    def _top_predictions(self, top_scores: np.ndarray, top_indices: np.ndarray) -> List[Dict[str, Any]]:
+        """Convert one image's top-k scores and class indices into predictions"""
+        return [
+            {
+                'class': CLASS_MAPPING.get(idx, f"Unknown_Class_{idx}"),
+                'confidence': float(score),
+                'description': f"Skin condition: {CLASS_MAPPING.get(idx, f'Unknown_Class_{idx}')}"
 
-            top_indices = np.argsort(predictions[0])[-5:][::-1]
-            top_scores = predictions[0][top_indices]
+            }
+            for idx, score in zip(top_indices.tolist(), top_scores)
+        ]
 
-            return [
-                {
-                    'class': CLASS_MAPPING.get(idx, f"Unknown_Class_{idx}"),
-                    'confidence': float(score),
-                    'description': f"Skin condition: {CLASS_MAPPING.get(idx, f'Unknown_Class_{idx}')}"
+    def _process_image(self, image_url: str) -> List[Dict[str, Any]]:
+        """Process an image using the custom ResNet152 model, matching the inference.py pipeline
+
+        Raises:
+            ImageLoadError: If the image cannot be downloaded or decoded
+            ClassificationError: If the classifier is not loaded or fails
+        """
+        if not self.classifier:
+            raise ClassificationError("Classifier is not loaded")
+
+        data = self._fetch_image(image_url)
+        key, cached = self._cached_predictions(data)
+        if cached is not None:
+            return cached
+
+        with self._predict_caller():
+            with timed_stage('image_decode'):
+                img = decode_image(data)
+            try:
+                with timed_stage('image_decode'):
+                    img = self._preprocess_image(img)
+                    img_array = np.expand_dims(img, axis=0)
+                    img_array = tf.keras.applications.resnet.preprocess_input(img_array)
 
-                }
-                for idx, score in zip(top_indices, top_scores)
-            ]
+                with timed_stage('predict'):
+                    predictions = self._predict(img_array)
+
+                image_analysis = self._top_predictions(predictions['scores'][0], predictions['indices'][0])
+            except Exception as e:
+                print(f"Error processing image: {e}")
+                raise ClassificationError(f"Error processing image: {e}") from e
+
+        self._cache_predictions(key, image_analysis)
+        return image_analysis
+
+    def _process_images(
+        self, image_urls: List[Optional[str]]
+    ) -> List[Union[List[Dict[str, Any]], ImageLoadError, ClassificationError]]:
+        """Classify many images with concurrent downloads and a single batched predict
+
+        Images that fail to load get their ImageLoadError in place of predictions,
+        and images that were loaded but not classified get a ClassificationError.
+        Items without an image get an empty list.
+        """
+        results: List[Union[List[Dict[str, Any]], ImageLoadError, ClassificationError]] = [[] for _ in image_urls]
+        positions = [i for i, url in enumerate(image_urls) if url]
+        if not positions:
+            return results
+        if not self.classifier:
+            for position in positions:
+                results[position] = ClassificationError("Classifier is not loaded")
+            return results
+
+        try:
+            # All downloads stream concurrently on the fetcher's event loop
+            with timed_stage('image_download'):
+                fetched = self.image_fetcher.fetch_many_sync([image_urls[i] for i in positions])
+
+            with self._predict_caller():
+                batch = []
+                batch_positions = []
+                batch_keys = []
+                for position, item in zip(positions, fetched):
+                    try:
+                        if isinstance(item, ImageFetchError):
+                            raise ImageLoadError(str(item))
+                        key, cached = self._cached_predictions(item.data)
+                        if cached is not None:
+                            results[position] = cached
+                            continue
+                        with timed_stage('image_decode'):
+                            img = decode_image(item.data)
+                            batch.append(self._preprocess_image(img))
+                    except ImageLoadError as e:
+                        print(f"Error loading image {image_urls[position]}: {e}")
+                        results[position] = e
+                        continue
+                    batch_positions.append(position)
+                    batch_keys.append(key)
+
+                if not batch:
+                    return results
+
+                with timed_stage('image_decode'):
+                    img_array = tf.keras.applications.resnet.preprocess_input(np.stack(batch))
+
+                with timed_stage('predict'):
+                    predictions = self._predict(img_array)
+
+            for position, key, scores, indices in zip(batch_positions, batch_keys, predictions['scores'], predictions['indices']):
+                results[position] = self._top_predictions(scores, indices)
+                self._cache_predictions(key, results[position])
         except Exception as e:
-            print(f"Error processing image: {e}")
-            return []
+            print(f"Error processing image batch: {e}")
+            for position in positions:
+                if isinstance(results[position], list) and not results[position]:
+                    results[position] = ClassificationError(f"Error processing image batch: {e}")
+
+        return results
 
     def _initialize_knowledge_base(self) -> Dict[str, Dict[str, str]]:
         """Initialize the medical knowledge base with sample data"""
@@ -233,13 +508,17 @@ class DescriptorAgent:
             return []
 
         try:
-            query_embedding = self.embedding_model.encode(
-                [query], 
-                convert_to_numpy=True, 
-                normalize_embeddings=True
-            )
+            with timed_stage('query_embedding'):
+                query_embedding = self.embedding_model.encode(
+                    [query], 
+                    convert_to_numpy=True, 
+                    normalize_embeddings=True
+                )
             
-            scores, indices = self.faiss_index.search(query_embedding, top_k)
+            with timed_stage('faiss_search'):
+                # OpenMP thread counts are per calling thread, so set it on the worker thread
+                faiss.omp_set_num_threads(self.thread_budget.faiss)
+                scores, indices = self.faiss_index.search(query_embedding, top_k)
             
             return [
                 {
@@ -253,6 +532,38 @@ class DescriptorAgent:
             print(f"Error in FAISS search: {e}")
             return []
 
+    def _find_relevant_conditions_batch(self, queries: List[str], top_k: int = TOP_K_RESULTS) -> List[List[Dict[str, Any]]]:
+        """Find relevant conditions for many queries with one encode and one FAISS search"""
+        if not queries or not self.faiss_index or not self.embedding_model:
+            return [[] for _ in queries]
+
+        try:
+            with timed_stage('query_embedding'):
+                query_embeddings = self.embedding_model.encode(
+                    queries,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+
+            with timed_stage('faiss_search'):
+                faiss.omp_set_num_threads(self.thread_budget.faiss)
+                scores, indices = self.faiss_index.search(query_embeddings, top_k)
+
+            return [
+                [
+                    {
+                        'id': self.faiss_ids[idx],
+                        'data': self.faiss_passages[idx],
+                        'score': float(scores[row][i])
+                    }
+                    for i, idx in enumerate(indices[row])
+                ]
+                for row in range(len(queries))
+            ]
+        except Exception as e:
+            print(f"Error in batched FAISS search: {e}")
+            return [[] for _ in queries]
+
     def _update_knowledge_base(self, new_data: Dict[str, Any]):
         """Update the knowledge base with new data"""
         if not new_data:
@@ -276,18 +587,68 @@ class DescriptorAgent:
         except Exception as e:
             print(f"Error updating knowledge base: {e}")
 
-    def invoke(self, query: str, session_id: str, image_url: Optional[str] = None) -> Dict[str, Any]:
-        """Process a medical query and return a comprehensive response"""
-        try:
-            response = {
-                'text_analysis': None,
-                'image_analysis': None,
-                'relevant_conditions': []
-            }
+    def readiness(self) -> Dict[str, bool]:
+        """Report which models are loaded"""
+        return {
+            'classifier': self.classifier is not None,
+            'embedder': self.embedding_model is not None,
+            'faiss_index': self.faiss_index is not None
+        }
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Prediction cache counters, or None if predictions are not cached"""
+        return self.prediction_cache.stats() if self.prediction_cache else None
+
+    def warm_up(self) -> Dict[str, Any]:
+        """Run one inference on a dummy image and query so the first real request doesn't pay graph tracing"""
+        started = time.perf_counter()
+
+        if self.classifier:
+            self.classifier.warm_up()
+
+        self._find_relevant_conditions("skin rash")
+
+        status = self.readiness()
+        status['warm_up_seconds'] = time.perf_counter() - started
+        print(f"Warm-up finished in {status['warm_up_seconds']:.2f}s: {status}")
+        return status
+
+    def invoke_stages(self, query: str, session_id: str, image_url: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Run the pipeline incrementally, yielding each stage as soon as it finishes.
+
+        Yields {'stage': 'image_classification', 'image_analysis': [...]} right
+        after predict (only when an image is given), then
+        {'stage': 'relevant_conditions', 'relevant_conditions': [...]} after the
+        RAG lookups, and finally {'stage': 'complete', 'response': {...}} with
+        the same dict that invoke returns, including the per-stage latencies
+        in seconds under 'timings'. If the image cannot be loaded, only the
+        'complete' stage is yielded, with 'error' and 'error_type' set to
+        'invalid_image'. If it loads but cannot be classified, the text
+        lookup still runs and the response carries 'error' with 'error_type'
+        'classification_failed'.
+        """
+        timings = start_stage_timings()
+        response = {
+            'text_analysis': None,
+            'image_analysis': None,
+            'relevant_conditions': [],
+            'timings': timings
+        }
 
-            if image_url:
+        if image_url:
+            try:
                 image_analysis = self._process_image(image_url)
+            except ImageLoadError as e:
+                response['error'] = str(e)
+                response['error_type'] = INVALID_IMAGE_ERROR
+                yield {'stage': 'complete', 'response': response}
+                return
+            except ClassificationError as e:
+                response['error'] = str(e)
+                response['error_type'] = CLASSIFICATION_ERROR
+            else:
                 response['image_analysis'] = image_analysis
+                yield {'stage': 'image_classification', 'image_analysis': image_analysis}
 
                 if image_analysis:
                     top_prediction = image_analysis[0]
@@ -296,12 +657,23 @@ class DescriptorAgent:
                     if relevant_conditions:
                         response['relevant_conditions'] = relevant_conditions
 
-            if query:
-                text_conditions = self._find_relevant_conditions(query)
-                if text_conditions:
-                    existing_ids = {c['id'] for c in response['relevant_conditions']}
-                    new_conditions = [c for c in text_conditions if c['id'] not in existing_ids]
-                    response['relevant_conditions'].extend(new_conditions)
+        if query:
+            text_conditions = self._find_relevant_conditions(query)
+            if text_conditions:
+                existing_ids = {c['id'] for c in response['relevant_conditions']}
+                new_conditions = [c for c in text_conditions if c['id'] not in existing_ids]
+                response['relevant_conditions'].extend(new_conditions)
+
+        yield {'stage': 'relevant_conditions', 'relevant_conditions': response['relevant_conditions']}
+        yield {'stage': 'complete', 'response': response}
+
+    def invoke(self, query: str, session_id: str, image_url: Optional[str] = None) -> Dict[str, Any]:
+        """Process a medical query and return a comprehensive response"""
+        try:
+            response = None
+            for stage in self.invoke_stages(query, session_id, image_url):
+                if stage['stage'] == 'complete':
+                    response = stage['response']
 
             return response
 
@@ -313,14 +685,81 @@ class DescriptorAgent:
                 'relevant_conditions': []
             }
 
+    def invoke_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process many queries and images in one vectorized pass.
+
+        Each item takes the same arguments as invoke (query, session_id,
+        image_url). Images are downloaded concurrently and classified with one
+        predict call; image labels and text queries are embedded with one
+        encode call and looked up with one FAISS search. Returns one response
+        per item, in order, shaped like the result of invoke; 'timings' holds
+        the latencies of the whole batch.
+        """
+        try:
+            timings = start_stage_timings()
+            image_analyses = self._process_images([item.get('image_url') for item in items])
+
+            responses = []
+            queries = []
+            owners = []
+            for i, (item, image_analysis) in enumerate(zip(items, image_analyses)):
+                if isinstance(image_analysis, (ImageLoadError, ClassificationError)):
+                    responses.append({
+                        'error': str(image_analysis),
+                        'error_type': INVALID_IMAGE_ERROR if isinstance(image_analysis, ImageLoadError) else CLASSIFICATION_ERROR,
+                        'text_analysis': None,
+                        'image_analysis': None,
+                        'relevant_conditions': [],
+                        'timings': timings
+                    })
+                    continue
+                responses.append({
+                    'text_analysis': None,
+                    'image_analysis': image_analysis if item.get('image_url') else None,
+                    'relevant_conditions': [],
+                    'timings': timings
+                })
+                if image_analysis:
+                    queries.append(image_analysis[0]['class'])
+                    owners.append(i)
+                if item.get('query'):
+                    queries.append(item['query'])
+                    owners.append(i)
+
+            conditions = self._find_relevant_conditions_batch(queries)
+
+            for i, found in zip(owners, conditions):
+                relevant_conditions = responses[i]['relevant_conditions']
+                existing_ids = {c['id'] for c in relevant_conditions}
+                relevant_conditions.extend(c for c in found if c['id'] not in existing_ids)
+
+            return responses
+
+        except Exception as e:
+            return [
+                {
+                    'error': str(e),
+                    'text_analysis': None,
+                    'image_analysis': None,
+                    'relevant_conditions': []
+                }
+                for _ in items
+            ]
+
     async def stream(self, query: str, session_id: str, image_url: Optional[str] = None):
-        """Streaming response implementation with image support"""
+        """Streaming response implementation with image support, one chunk per pipeline stage"""
         try:
-            response = self.invoke(query, session_id, image_url)
-            yield {
-                "is_task_complete": True,
-                "content": response
-            }
+            for stage in self.invoke_stages(query, session_id, image_url):
+                if stage['stage'] == 'complete':
+                    yield {
+                        "is_task_complete": True,
+                        "content": stage['response']
+                    }
+                else:
+                    yield {
+                        "is_task_complete": False,
+                        "content": stage
+                    }
         except Exception as e:
             yield {
                 "is_task_complete": True,
@@ -0,0 +1,281 @@
+"""Compiled inference path for the Keras skin classifier.
+
+Keras ``model.predict`` builds a data adapter, a callback list and a progress
+bar on every call, which dominates the runtime of small batches and keeps
+growing memory in a long-running server. ``CompiledClassifier`` instead
+calls the model inside a ``tf.function`` with a fixed input signature, so it
+is traced once, and computes the top-k in the graph. Only the top-k scores
+and class indices (plus the full distribution) come back to numpy.
+
+The quantized ONNX Runtime and TFLite exports of the same model (see
+classfication-model/export_quantized.py) are served by ``OnnxClassifier``
+and ``TFLiteClassifier`` with the same call signature, and
+``create_classifier`` picks one by backend name.
+
+``CascadeClassifier`` puts a small front model (see
+classfication-model/front_model.py) before any of them and only escalates
+the images the front model is unsure about.
+"""
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import tensorflow as tf
+from prometheus_client import Counter
+
+CASCADE_DECISIONS = Counter(
+    "classifier_cascade_images_total",
+    "Images answered by the cascade's front model (accepted) or sent to the full model (escalated)",
+    ["decision"]
+)
+
+# Per-channel means subtracted by tf.keras.applications.resnet.preprocess_input (BGR order)
+RESNET_BGR_MEANS = (103.939, 116.779, 123.68)
+
+
+def undo_resnet_preprocessing(images: tf.Tensor) -> tf.Tensor:
+    """Map ResNet ("caffe") preprocessed BGR input back to 0-255 RGB pixels"""
+    return tf.reverse(images + tf.constant(RESNET_BGR_MEANS, dtype=images.dtype), axis=[-1])
+
+
+class CompiledClassifier:
+    """
+    Wraps a Keras classifier in a single traced inference function.
+
+    Args:
+        model: Keras model taking preprocessed (n, height, width, 3) float32 images
+        top_k: Number of classes returned per image
+        image_size: (height, width) of the model input
+        batch_size: Largest chunk passed to the model at once; bigger inputs
+            are split so peak memory stays bounded
+        input_transform: Optional in-graph mapping from the ResNet-preprocessed
+            input to what this model expects, e.g. undo_resnet_preprocessing
+    """
+
+    def __init__(
+        self,
+        model: tf.keras.Model,
+        top_k: int = 5,
+        image_size: Tuple[int, int] = (224, 224),
+        batch_size: int = 16,
+        input_transform: Optional[Callable[[tf.Tensor], tf.Tensor]] = None
+    ):
+        self.model = model
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.input_transform = input_transform
+        self._classify = tf.function(
+            self._forward,
+            input_signature=[tf.TensorSpec([None, image_size[0], image_size[1], 3], tf.float32)]
+        )
+
+    def _forward(self, images: tf.Tensor) -> Dict[str, tf.Tensor]:
+        if self.input_transform is not None:
+            images = self.input_transform(images)
+        probabilities = self.model(images, training=False)
+        scores, indices = tf.math.top_k(probabilities, k=self.top_k)
+        return {'scores': scores, 'indices': indices, 'probabilities': probabilities}
+
+    def __call__(self, images: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Classify a batch of preprocessed images.
+
+        Returns:
+            dict: 'scores' (n, top_k) and 'indices' (n, top_k), best class first,
+                and 'probabilities' (n, num_classes)
+        """
+        images = np.asarray(images, dtype=np.float32)
+        chunks = [
+            self._classify(tf.constant(images[start:start + self.batch_size]))
+            for start in range(0, len(images), self.batch_size)
+        ]
+        return {
+            key: np.concatenate([chunk[key].numpy() for chunk in chunks])
+            for key in ('scores', 'indices', 'probabilities')
+        }
+
+    def warm_up(self):
+        """Trace the function so the first real call doesn't pay for it"""
+        self(np.zeros((1, *self._classify.input_signature[0].shape[1:]), dtype=np.float32))
+
+
+def _top_k(probabilities: np.ndarray, top_k: int) -> Dict[str, np.ndarray]:
+    """Top-k scores and indices per row, best class first, like the compiled path"""
+    indices = np.argsort(-probabilities, axis=1, kind='stable')[:, :top_k]
+    return {
+        'scores': np.take_along_axis(probabilities, indices, axis=1),
+        'indices': indices.astype(np.int32),
+        'probabilities': probabilities
+    }
+
+
+class OnnxClassifier:
+    """
+    Runs an exported (optionally INT8-quantized) ONNX model with ONNX Runtime on CPU.
+
+    Args:
+        model_path: Path to the .onnx file
+        top_k: Number of classes returned per image
+        batch_size: Largest chunk passed to the session at once
+        num_threads: Intra-op threads for the session, ONNX Runtime's default when None
+    """
+
+    def __init__(self, model_path: str, top_k: int = 5, batch_size: int = 16, num_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnxruntime classifier backend needs the onnxruntime package") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(str(model_path), sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        self.input_shape = self.session.get_inputs()[0].shape
+        self.top_k = top_k
+        self.batch_size = batch_size
+
+    def __call__(self, images: np.ndarray) -> Dict[str, np.ndarray]:
+        images = np.asarray(images, dtype=np.float32)
+        probabilities = np.concatenate([
+            self.session.run(None, {self.input_name: images[start:start + self.batch_size]})[0]
+            for start in range(0, len(images), self.batch_size)
+        ])
+        return _top_k(probabilities, self.top_k)
+
+    def warm_up(self):
+        self(np.zeros((1, *self.input_shape[1:]), dtype=np.float32))
+
+
+class TFLiteClassifier:
+    """
+    Runs an exported (optionally INT8-quantized) TFLite model.
+
+    The interpreter is not thread-safe, so calls are serialized; with the
+    micro-batcher in front there is a single caller anyway.
+
+    Args:
+        model_path: Path to the .tflite file
+        top_k: Number of classes returned per image
+        batch_size: Largest chunk passed to the interpreter at once
+        num_threads: Interpreter threads, TFLite's default when None
+    """
+
+    def __init__(self, model_path: str, top_k: int = 5, batch_size: int = 16, num_threads: Optional[int] = None):
+        self.interpreter = tf.lite.Interpreter(model_path=str(model_path), num_threads=num_threads)
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self._batch = None
+        self._lock = threading.Lock()
+
+    def _run(self, images: np.ndarray) -> np.ndarray:
+        if self._batch != len(images):
+            self.interpreter.resize_tensor_input(self.input_details['index'], [len(images), *self.input_details['shape'][1:]])
+            self.interpreter.allocate_tensors()
+            self._batch = len(images)
+        self.interpreter.set_tensor(self.input_details['index'], images)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_details['index']).copy()
+
+    def __call__(self, images: np.ndarray) -> Dict[str, np.ndarray]:
+        images = np.asarray(images, dtype=np.float32)
+        with self._lock:
+            probabilities = np.concatenate([
+                self._run(images[start:start + self.batch_size])
+                for start in range(0, len(images), self.batch_size)
+            ])
+        return _top_k(probabilities, self.top_k)
+
+    def warm_up(self):
+        self(np.zeros((1, *self.input_details['shape'][1:]), dtype=np.float32))
+
+
+class CascadeClassifier:
+    """
+    Two-stage classifier: a small front model answers when it is confident,
+    the full model runs only for the rest.
+
+    An image is accepted from the front model when its top-1 probability is at
+    least min_confidence and leads the runner-up by at least min_margin;
+    otherwise it is escalated. Both classifiers take the same input and return
+    the same dict, so the cascade is a drop-in replacement.
+
+    Args:
+        front: Fast classifier, e.g. a CompiledClassifier over MobileNetV3
+        full: Accurate classifier used for escalations (any backend)
+        min_confidence: Front top-1 probability needed to accept
+        min_margin: Front top-1 minus top-2 probability needed to accept
+    """
+
+    def __init__(self, front: Any, full: Any, min_confidence: float = 0.8, min_margin: float = 0.0):
+        self.front = front
+        self.full = full
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.escalated = 0
+
+    def escalate(self, scores: np.ndarray) -> np.ndarray:
+        """Boolean mask of the rows (top-k scores, best first) the front model isn't sure about"""
+        margin = scores[:, 0] - scores[:, 1] if scores.shape[1] > 1 else scores[:, 0]
+        return (scores[:, 0] < self.min_confidence) | (margin < self.min_margin)
+
+    def __call__(self, images: np.ndarray) -> Dict[str, np.ndarray]:
+        outputs = self.front(images)
+        escalate = self.escalate(outputs['scores'])
+        if escalate.any():
+            full_outputs = self.full(np.asarray(images)[escalate])
+            outputs = {key: value.copy() for key, value in outputs.items()}
+            for key in ('scores', 'indices', 'probabilities'):
+                outputs[key][escalate] = full_outputs[key]
+
+        escalated = int(escalate.sum())
+        with self._lock:
+            self.escalated += escalated
+            self.accepted += len(escalate) - escalated
+        CASCADE_DECISIONS.labels(decision="escalated").inc(escalated)
+        CASCADE_DECISIONS.labels(decision="accepted").inc(len(escalate) - escalated)
+        outputs['escalated'] = escalate
+        return outputs
+
+    def warm_up(self):
+        self.front.warm_up()
+        self.full.warm_up()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.accepted + self.escalated
+            return {
+                "accepted": self.accepted,
+                "escalated": self.escalated,
+                "escalation_rate": self.escalated / total if total else 0.0,
+                "min_confidence": self.min_confidence,
+                "min_margin": self.min_margin
+            }
+
+
+CLASSIFIER_BACKENDS = ('keras', 'onnxruntime', 'tflite')
+
+
+def create_classifier(backend: str, model_path: str, top_k: int = 5, image_size: Tuple[int, int] = (224, 224), batch_size: int = 16, num_threads: Optional[int] = None):
+    """
+    Load a classifier for the given backend.
+
+    Returns:
+        tuple: (classifier, keras_model); keras_model is None for the exported backends
+
+    Raises:
+        ValueError: If the backend is not one of CLASSIFIER_BACKENDS
+    """
+    if backend == 'keras':
+        model = tf.keras.models.load_model(model_path, compile=False)
+        return CompiledClassifier(model, top_k=top_k, image_size=image_size, batch_size=batch_size), model
+    if backend == 'onnxruntime':
+        return OnnxClassifier(model_path, top_k=top_k, batch_size=batch_size, num_threads=num_threads), None
+    if backend == 'tflite':
+        return TFLiteClassifier(model_path, top_k=top_k, batch_size=batch_size, num_threads=num_threads), None
+    raise ValueError(f"Unknown classifier backend: {backend} (expected one of {', '.join(CLASSIFIER_BACKENDS)})")
@@ -0,0 +1,199 @@
+"""Dynamic micro-batching of classifier forward passes across concurrent callers.
+
+Caller threads submit preprocessed tensors and block on a future. A single
+worker thread takes the first waiting submission, keeps collecting more until
+the batch holds max_batch_size rows or max_wait has passed, runs one forward
+pass over the concatenated rows and hands each caller back its own slice.
+
+The worker only waits while another caller has announced itself (see
+MicroBatcher.caller) and not yet submitted, so a lone caller's submission runs
+at once instead of sitting out max_wait.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from prometheus_client import Counter, Histogram
+
+PREDICT_BATCH_ROWS = Histogram(
+    "classifier_batch_size",
+    "Images per classifier forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+PREDICT_QUEUE_WAIT = Histogram(
+    "classifier_batch_wait_seconds",
+    "Time a submission waited for its forward pass to start",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+
+# A forward pass returns one array, or a dict of arrays with one row per input
+Outputs = Union[np.ndarray, Dict[str, np.ndarray]]
+
+PREDICT_BATCHES = Counter(
+    "classifier_batches_total",
+    "Classifier forward passes run by the micro-batcher",
+    ["outcome"]
+)
+
+
+class MicroBatcher:
+    """
+    Groups concurrent predict calls into batched forward passes.
+
+    Args:
+        predict_fn: Maps an (n, ...) array to an (n, ...) array of outputs, or to a
+            dict of such arrays
+        max_batch_size: Most rows per forward pass; a single submission larger
+            than this runs on its own
+        max_wait: Seconds the worker waits for more submissions after the first,
+            while announced callers have yet to submit
+        name: Name of the worker thread
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], Outputs],
+        max_batch_size: int = 16,
+        max_wait: float = 0.01,
+        name: str = "classifier-batcher"
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.name = name
+        self._queue: "queue.Queue[Optional[Tuple[np.ndarray, Future, float]]]" = queue.Queue()
+        self._carry: Optional[Tuple[np.ndarray, Future, float]] = None
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._callers = 0
+        self._batches = 0
+        self._rows = 0
+
+    @contextmanager
+    def caller(self) -> Iterator[None]:
+        """
+        Announce a caller that is about to submit, e.g. while it preprocesses its inputs.
+
+        A batch waits up to max_wait only for announced callers that have not
+        submitted yet; with no other caller announced it runs immediately.
+        """
+        with self._lock:
+            self._callers += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._callers -= 1
+
+    def predict(self, inputs: np.ndarray) -> Outputs:
+        """Run inputs through the next batched forward pass and return their outputs."""
+        return self.submit(inputs).result()
+
+    def submit(self, inputs: np.ndarray) -> Future:
+        """Queue inputs for the next forward pass; the future resolves to their outputs."""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+            self._queue.put((inputs, future, time.perf_counter()))
+        return future
+
+    def close(self):
+        """Stop the worker after the submissions already queued have run."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._worker is not None:
+                self._queue.put(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queued": self._queue.qsize() + (self._carry is not None),
+            "callers": self._callers,
+            "batches": self._batches,
+            "rows": self._rows,
+            "mean_batch_size": self._rows / self._batches if self._batches else 0.0,
+        }
+
+    def _collect(self, first: Tuple[np.ndarray, Future, float]) -> Tuple[List[Tuple[np.ndarray, Future, float]], bool]:
+        """
+        Gather submissions after the first until the batch is full or max_wait passes.
+
+        Submissions already queued are always taken; the worker only waits for
+        more while announced callers outside this batch have yet to submit.
+        """
+        batch = [first]
+        rows = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            expecting = self._callers > len(batch)
+            try:
+                if remaining > 0 and expecting:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            if rows + len(item[0]) > self.max_batch_size:
+                # Doesn't fit: run what we have now and start the next batch with it
+                self._carry = item
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first, self._carry = self._carry or self._queue.get(), None
+            if first is None:
+                break
+            batch, stopping = self._collect(first)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[Tuple[np.ndarray, Future, float]]):
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        for _, _, submitted in batch:
+            PREDICT_QUEUE_WAIT.observe(started - submitted)
+
+        try:
+            inputs = batch[0][0] if len(batch) == 1 else np.concatenate([item[0] for item in batch])
+            outputs = self.predict_fn(inputs)
+        except Exception as e:
+            PREDICT_BATCHES.labels(outcome="error").inc()
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        PREDICT_BATCHES.labels(outcome="ok").inc()
+        PREDICT_BATCH_ROWS.observe(len(inputs))
+        self._batches += 1
+        self._rows += len(inputs)
+
+        offset = 0
+        for item_inputs, future, _ in batch:
+            end = offset + len(item_inputs)
+            if isinstance(outputs, dict):
+                future.set_result({key: value[offset:end] for key, value in outputs.items()})
+            else:
+                future.set_result(outputs[offset:end])
+            offset = end
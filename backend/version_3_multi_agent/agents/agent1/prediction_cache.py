@@ -0,0 +1,177 @@
+"""Content-addressed cache of classifier predictions.
+
+Predictions are keyed by the SHA-256 of the image bytes and the model
+version, so the same photo behind a new signed URL is still a hit, and
+swapping the model invalidates everything. An in-memory LRU bounded by the
+size of the stored entries sits in front of an optional SQLite file that
+several worker processes can share.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union
+
+from prometheus_client import Counter
+
+PREDICTION_CACHE_LOOKUPS = Counter(
+    "classifier_prediction_cache_lookups_total",
+    "Prediction cache lookups by result (memory, disk or miss)",
+    ["result"]
+)
+
+# Rows pruned from the SQLite tier once per this many writes
+DISK_PRUNE_INTERVAL = 256
+
+Predictions = List[Dict[str, Any]]
+
+
+def prediction_key(data: Union[bytes, memoryview], model_version: str) -> str:
+    """Cache key for an image's bytes under a model version."""
+    digest = hashlib.sha256()
+    digest.update(model_version.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Two-tier prediction cache: a byte-bounded LRU plus an optional SQLite file.
+
+    Args:
+        model_version: Identifies the model; part of every key
+        max_bytes: Budget for the serialized entries held in memory (0 disables the tier)
+        db_path: SQLite file shared between workers, None disables the tier
+        max_disk_entries: Rows kept in SQLite; the least recently written are pruned
+    """
+
+    def __init__(self, model_version: str, max_bytes: int = 16 * 1024 * 1024, db_path: Optional[str] = None, max_disk_entries: int = 100_000):
+        self.model_version = model_version
+        self.max_bytes = max_bytes
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._disk_writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            self._connection().execute(
+                "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT NOT NULL, written_at REAL NOT NULL)"
+            )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or bool(self.db_path)
+
+    def key(self, data: Union[bytes, memoryview]) -> str:
+        return prediction_key(data, self.model_version)
+
+    def get(self, key: str) -> Optional[Predictions]:
+        """Cached predictions for key, or None on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+        if value is not None:
+            PREDICTION_CACHE_LOOKUPS.labels(result="memory").inc()
+            return json.loads(value)
+
+        value = self._disk_get(key)
+        if value is not None:
+            self._memory_put(key, value)
+            with self._lock:
+                self.disk_hits += 1
+            PREDICTION_CACHE_LOOKUPS.labels(result="disk").inc()
+            return json.loads(value)
+
+        with self._lock:
+            self.misses += 1
+        PREDICTION_CACHE_LOOKUPS.labels(result="miss").inc()
+        return None
+
+    def put(self, key: str, predictions: Predictions):
+        """Store predictions in both tiers."""
+        value = json.dumps(predictions, separators=(",", ":"))
+        self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def _memory_put(self, key: str, value: str):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    # -------------------------------------------------------------------------
+    # SQLite tier; errors are logged and treated as misses
+    # -------------------------------------------------------------------------
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        if not self.db_path:
+            return None
+        try:
+            row = self._connection().execute("SELECT value FROM predictions WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Prediction cache read failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def _disk_put(self, key: str, value: str):
+        if not self.db_path:
+            return
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO predictions (key, value, written_at) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            with self._lock:
+                self._disk_writes += 1
+                prune = self._disk_writes % DISK_PRUNE_INTERVAL == 0
+            if prune:
+                connection.execute(
+                    "DELETE FROM predictions WHERE key NOT IN "
+                    "(SELECT key FROM predictions ORDER BY written_at DESC LIMIT ?)",
+                    (self.max_disk_entries,)
+                )
+        except sqlite3.Error as e:
+            print(f"Prediction cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per tier and memory usage."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "model_version": self.model_version,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk": self.db_path
+            }
@@ -0,0 +1,89 @@
+import unittest
+import os
+import sys
+from pathlib import Path
+import numpy as np
+import cv2
+sys.path.append('.')  # Add current directory to Python path
+from image_decode import decode_for_size, jpeg_size, reduction_factor
+
+IMAGE_SIZE = (224, 224)
+
+# Reference photos and classifier for the prediction check; skipped when absent
+REFERENCE_IMAGES_DIR = os.getenv('REFERENCE_IMAGES_DIR')
+MODEL_PATH = Path(os.getenv('AGENT_CLASSIFIER_MODEL', Path(__file__).parent.parent.parent.parent / "weights" / "resnet152.h5"))
+
+def preprocess(img):
+    """The agent's pipeline after decode: resize to the model input and convert to RGB"""
+    img = cv2.resize(img, IMAGE_SIZE)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+def encode_jpeg(width, height):
+    """A smooth synthetic photo of the given size, JPEG-encoded"""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    img = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)), (x + y) / 2], axis=-1)
+    ok, encoded = cv2.imencode('.jpg', img.astype(np.uint8), [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+class TestImageDecode(unittest.TestCase):
+    def test_jpeg_size_from_header(self):
+        """Test that the header parser reads the frame size"""
+        self.assertEqual(jpeg_size(encode_jpeg(1200, 900)), (1200, 900))
+        ok, png = cv2.imencode('.png', np.zeros((10, 10, 3), dtype=np.uint8))
+        self.assertIsNone(jpeg_size(png.tobytes()), "PNG should not be parsed as JPEG")
+        self.assertIsNone(jpeg_size(b"\xff\xd8"), "Truncated data should return None")
+
+    def test_reduction_factor_never_drops_below_target(self):
+        """Test that the chosen factor keeps both sides at least the target size"""
+        self.assertEqual(reduction_factor(4032, 3024, IMAGE_SIZE), 8)
+        self.assertEqual(reduction_factor(1000, 800, IMAGE_SIZE), 2)
+        self.assertEqual(reduction_factor(300, 300, IMAGE_SIZE), 1)
+        for width, height in [(4032, 3024), (3000, 400), (640, 480), (225, 2000)]:
+            factor = reduction_factor(width, height, IMAGE_SIZE)
+            self.assertGreaterEqual(-(-width // factor), IMAGE_SIZE[0])
+            self.assertGreaterEqual(-(-height // factor), IMAGE_SIZE[1])
+
+    def test_reduced_decode_matches_full_decode(self):
+        """Test that reduced decoding yields nearly the same model input as a full decode"""
+        data = encode_jpeg(4032, 3024)
+        reduced = decode_for_size(data, IMAGE_SIZE)
+        full = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+        self.assertEqual(reduced.shape[:2], (378, 504), "A 12 MP JPEG should decode at 1/8 scale")
+        difference = np.abs(preprocess(reduced).astype(np.int16) - preprocess(full).astype(np.int16))
+        self.assertLess(difference.mean(), 2.0, "Model input should be nearly identical")
+
+    def test_non_jpeg_and_invalid_input(self):
+        """Test that other formats decode in full and garbage returns None"""
+        ok, png = cv2.imencode('.png', np.full((600, 800, 3), 127, dtype=np.uint8))
+        self.assertEqual(decode_for_size(png.tobytes(), IMAGE_SIZE).shape[:2], (600, 800))
+        self.assertIsNone(decode_for_size(b"not an image", IMAGE_SIZE))
+        self.assertIsNone(decode_for_size(b"", IMAGE_SIZE))
+
+    @unittest.skipUnless(REFERENCE_IMAGES_DIR and MODEL_PATH.exists(), "Set REFERENCE_IMAGES_DIR and provide the classifier weights")
+    def test_predictions_unchanged_on_reference_set(self):
+        """Test that the classifier gives the same answers for full and reduced decoding"""
+        import tensorflow as tf
+        from classifier import create_classifier
+
+        classifier, _ = create_classifier(os.getenv('AGENT_CLASSIFIER_BACKEND', 'keras'), MODEL_PATH)
+        paths = sorted(p for p in Path(REFERENCE_IMAGES_DIR).rglob('*') if p.suffix.lower() in ('.jpg', '.jpeg'))
+        self.assertTrue(paths, f"No JPEGs found under {REFERENCE_IMAGES_DIR}")
+
+        overlaps = []
+        for path in paths:
+            data = path.read_bytes()
+            full = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            reduced = decode_for_size(data, IMAGE_SIZE)
+            batch = np.stack([preprocess(full), preprocess(reduced)]).astype(np.float32)
+            indices = classifier(tf.keras.applications.resnet.preprocess_input(batch))['indices']
+
+            self.assertEqual(indices[0][0], indices[1][0], f"Top-1 prediction changed for {path}")
+            overlaps.append(len(set(indices[0]) & set(indices[1])) / len(indices[0]))
+
+        print(f"\nTop-1 unchanged on {len(paths)} images, mean top-5 overlap {np.mean(overlaps):.1%}")
+        self.assertGreaterEqual(np.mean(overlaps), 0.9, "Top-5 predictions should be nearly unchanged")
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
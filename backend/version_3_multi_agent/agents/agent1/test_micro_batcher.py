@@ -0,0 +1,153 @@
+import unittest
+import sys
+import threading
+import time
+from contextlib import ExitStack
+import numpy as np
+sys.path.append('.')  # Add current directory to Python path
+from micro_batcher import MicroBatcher
+
+class RecordingModel:
+    """Doubles its inputs and records the number of rows of each forward pass"""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def __call__(self, inputs):
+        with self.lock:
+            self.batch_sizes.append(len(inputs))
+        return inputs * 2
+
+def rows(*values):
+    """A (n, 1) float array with one row per value"""
+    return np.array(values, dtype=np.float32).reshape(-1, 1)
+
+class TestMicroBatcher(unittest.TestCase):
+    def setUp(self):
+        self.model = RecordingModel()
+        self.batchers = []
+
+    def tearDown(self):
+        for batcher in self.batchers:
+            batcher.close()
+
+    def batcher(self, **kwargs):
+        batcher = MicroBatcher(self.model, **kwargs)
+        self.batchers.append(batcher)
+        return batcher
+
+    def announce(self, batcher, count):
+        """Announce count callers until the test ends, as concurrent requests would"""
+        stack = ExitStack()
+        for _ in range(count):
+            stack.enter_context(batcher.caller())
+        self.addCleanup(stack.close)
+
+    def test_flushes_when_batch_is_full(self):
+        """Test that a full batch runs at once instead of waiting out max_wait"""
+        batcher = self.batcher(max_batch_size=4, max_wait=10.0)
+        self.announce(batcher, 5)
+        started = time.perf_counter()
+        futures = [batcher.submit(rows(i)) for i in range(4)]
+        results = [future.result(timeout=5) for future in futures]
+
+        self.assertLess(time.perf_counter() - started, 5.0)
+        self.assertEqual(self.model.batch_sizes, [4])
+        for i, result in enumerate(results):
+            np.testing.assert_array_equal(result, rows(2 * i))
+
+    def test_flushes_after_max_wait(self):
+        """Test that a partial batch runs once max_wait has passed"""
+        batcher = self.batcher(max_batch_size=16, max_wait=0.05)
+        # A third announced caller never submits, so the batch waits out max_wait
+        self.announce(batcher, 3)
+        started = time.perf_counter()
+        futures = [batcher.submit(rows(1)), batcher.submit(rows(2, 3))]
+        results = [future.result(timeout=5) for future in futures]
+        elapsed = time.perf_counter() - started
+
+        self.assertGreaterEqual(elapsed, 0.04)
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual(self.model.batch_sizes, [3])
+        np.testing.assert_array_equal(results[1], rows(4, 6))
+        self.assertEqual(batcher.stats()["batches"], 1)
+        self.assertEqual(batcher.stats()["mean_batch_size"], 3.0)
+
+    def test_lone_submission_is_not_delayed(self):
+        """Test that with no other caller announced a submission runs without waiting out max_wait"""
+        batcher = self.batcher(max_batch_size=16, max_wait=10.0)
+        started = time.perf_counter()
+        with batcher.caller():
+            result = batcher.predict(rows(1))
+        batcher.predict(rows(2))
+
+        self.assertLess(time.perf_counter() - started, 1.0)
+        np.testing.assert_array_equal(result, rows(2))
+        self.assertEqual(self.model.batch_sizes, [1, 1])
+
+    def test_waits_for_announced_caller(self):
+        """Test that a batch waits for an announced caller that is still preparing its inputs"""
+        batcher = self.batcher(max_batch_size=16, max_wait=5.0)
+        announced = threading.Event()
+
+        def late_caller():
+            with batcher.caller():
+                announced.set()
+                time.sleep(0.05)
+                batcher.predict(rows(2))
+
+        thread = threading.Thread(target=late_caller)
+        thread.start()
+        announced.wait(timeout=5)
+        with batcher.caller():
+            result = batcher.predict(rows(1))
+        thread.join(timeout=5)
+
+        np.testing.assert_array_equal(result, rows(2))
+        self.assertEqual(self.model.batch_sizes, [2])
+
+    def test_submission_that_does_not_fit_starts_next_batch(self):
+        """Test that rows are never split across batches or over max_batch_size"""
+        batcher = self.batcher(max_batch_size=4, max_wait=0.2)
+        self.announce(batcher, 2)
+        futures = [batcher.submit(rows(1, 2, 3)), batcher.submit(rows(4, 5))]
+        results = [future.result(timeout=5) for future in futures]
+
+        self.assertEqual(self.model.batch_sizes, [3, 2])
+        np.testing.assert_array_equal(results[0], rows(2, 4, 6))
+        np.testing.assert_array_equal(results[1], rows(8, 10))
+
+    def test_dict_outputs_are_sliced_per_caller(self):
+        """Test that each caller gets its own rows of every output array"""
+        batcher = MicroBatcher(lambda inputs: {"scores": inputs, "indices": inputs.astype(np.int64)}, max_batch_size=2, max_wait=1.0)
+        self.batchers.append(batcher)
+        futures = [batcher.submit(rows(1)), batcher.submit(rows(2))]
+        second = futures[1].result(timeout=5)
+
+        self.assertEqual(set(second), {"scores", "indices"})
+        np.testing.assert_array_equal(second["indices"], np.array([[2]]))
+
+    def test_error_reaches_every_caller_in_the_batch(self):
+        """Test that a failing forward pass fails all of its submissions"""
+        def fail(inputs):
+            raise ValueError("boom")
+
+        batcher = MicroBatcher(fail, max_batch_size=2, max_wait=1.0)
+        self.batchers.append(batcher)
+        futures = [batcher.submit(rows(1)), batcher.submit(rows(2))]
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(timeout=5)
+
+    def test_closed_batcher_rejects_submissions(self):
+        """Test that queued work still runs after close() but new work is refused"""
+        batcher = self.batcher(max_batch_size=4, max_wait=0.05)
+        future = batcher.submit(rows(1))
+        batcher.close()
+        np.testing.assert_array_equal(future.result(timeout=5), rows(2))
+        with self.assertRaises(RuntimeError):
+            batcher.submit(rows(1))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
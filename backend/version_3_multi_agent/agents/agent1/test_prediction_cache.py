@@ -0,0 +1,72 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+sys.path.append('.')  # Add current directory to Python path
+from prediction_cache import PredictionCache, prediction_key
+
+def predictions(label):
+    """A top-1 prediction list for the given label"""
+    return [{"class": label, "confidence": 0.9, "description": f"Skin condition: {label}"}]
+
+def entry_size(label):
+    """Bytes an entry takes in the memory tier"""
+    return len(json.dumps(predictions(label), separators=(",", ":")))
+
+class TestPredictionCache(unittest.TestCase):
+    def test_memory_tier_evicts_least_recently_used_by_bytes(self):
+        """Test that the memory tier stays within max_bytes and evicts the coldest entry"""
+        cache = PredictionCache("v1", max_bytes=2 * entry_size("aaaa") + 1)
+        cache.put("a", predictions("aaaa"))
+        cache.put("b", predictions("bbbb"))
+        self.assertIsNotNone(cache.get("a"), "Reading a should make b the coldest entry")
+
+        cache.put("c", predictions("cccc"))
+        self.assertEqual(cache.get("a"), predictions("aaaa"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), predictions("cccc"))
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertLessEqual(stats["bytes"], cache.max_bytes)
+
+    def test_replacing_an_entry_keeps_byte_count(self):
+        """Test that re-putting a key does not count its old value twice"""
+        cache = PredictionCache("v1", max_bytes=10 * entry_size("aaaa"))
+        cache.put("a", predictions("aaaa"))
+        cache.put("a", predictions("aaaa"))
+        self.assertEqual(cache.stats()["bytes"], entry_size("aaaa"))
+
+    def test_entry_larger_than_budget_is_not_stored(self):
+        """Test that an oversized entry neither gets stored nor evicts others"""
+        cache = PredictionCache("v1", max_bytes=entry_size("a") + 1)
+        cache.put("a", predictions("a"))
+        cache.put("big", predictions("a" * 100))
+        self.assertIsNone(cache.get("big"))
+        self.assertEqual(cache.get("a"), predictions("a"))
+
+    def test_disk_tier_is_shared_and_refills_memory(self):
+        """Test that a second cache on the same file hits on disk, then in memory"""
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "predictions.db")
+            PredictionCache("v1", max_bytes=0, db_path=db_path).put("a", predictions("aaaa"))
+
+            cache = PredictionCache("v1", max_bytes=1024, db_path=db_path)
+            self.assertEqual(cache.get("a"), predictions("aaaa"))
+            self.assertEqual(cache.get("a"), predictions("aaaa"))
+            stats = cache.stats()
+            self.assertEqual((stats["disk_hits"], stats["memory_hits"], stats["misses"]), (1, 1, 0))
+
+    def test_key_depends_on_bytes_and_model_version(self):
+        """Test that the key is content-addressed and changes with the model"""
+        data = b"\xff\xd8image bytes"
+        self.assertEqual(prediction_key(data, "v1"), prediction_key(memoryview(data), "v1"))
+        self.assertNotEqual(prediction_key(data, "v1"), prediction_key(data, "v2"))
+        self.assertNotEqual(PredictionCache("v1").key(data), PredictionCache("v2").key(data))
+
+    def test_disabled_cache(self):
+        """Test that no memory budget and no file disables the cache"""
+        self.assertFalse(PredictionCache("v1", max_bytes=0).enabled)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
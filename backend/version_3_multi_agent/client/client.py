@@ -31,6 +31,9 @@ from models.json_rpc import JSONRPCRequest
 from models.task import Task, TaskSendParams
 from models.agent import AgentCard
 
+# Process-wide pooled HTTP clients (keep-alive, per-host limits, timeouts)
+from network.http_pool import get_http_pool
+
 
 # -----------------------------------------------------------------------------
 # Custom Error Classes
@@ -95,18 +98,18 @@ class A2AClient:
     # _send_request: Internal helper to send a JSON-RPC request
     # -------------------------------------------------------------------------
     async def _send_request(self, request: JSONRPCRequest) -> dict[str, Any]:
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    self.url,
-                    json=request.model_dump(),  # Convert Pydantic model to JSON
-                    timeout=30
-                )
-                response.raise_for_status()     # Raise error if status code is 4xx/5xx
-                return response.json()          # Return parsed response as a dict
-
-            except httpx.HTTPStatusError as e:
-                raise A2AClientHTTPError(e.response.status_code, str(e)) from e
-
-            except json.JSONDecodeError as e:
-                raise A2AClientJSONError(str(e)) from e
+        try:
+            response = await get_http_pool().apost(
+                self.url,
+                target="agent",
+                json=request.model_dump(),  # Convert Pydantic model to JSON
+                timeout=30
+            )
+            response.raise_for_status()     # Raise error if status code is 4xx/5xx
+            return response.json()          # Return parsed response as a dict
+
+        except httpx.HTTPStatusError as e:
+            raise A2AClientHTTPError(e.response.status_code, str(e)) from e
+
+        except json.JSONDecodeError as e:
+            raise A2AClientJSONError(str(e)) from e
@@ -0,0 +1,305 @@
+# =============================================================================
+# network/http_pool.py
+# =============================================================================
+# Purpose:
+# One process-wide HTTP connection-pool manager shared by the triage API,
+# agent1's image downloads and the A2A client, so connections (and their TLS
+# sessions) are reused instead of being re-established for every request.
+#
+# - One httpx client per origin, so connection limits apply per host
+# - Keep-alive, HTTP/2 when the `h2` package is installed
+# - Explicit connect / read / write / pool timeouts
+# - Prometheus gauges and counters for pool saturation, labelled by target
+# =============================================================================
+
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from prometheus_client import Counter, Gauge, Histogram
+
+# What an outbound request is for; metrics are labelled with these rather
+# than the host, since callback URLs come from clients and would make the
+# label set unbounded. Any other target is counted as OTHER_TARGET.
+TARGETS = frozenset({"supabase", "agent", "image", "callback"})
+OTHER_TARGET = "other"
+
+HTTP_POOL_IN_FLIGHT = Gauge(
+    "http_pool_in_flight_requests",
+    "Outbound requests currently holding or waiting for a pooled connection",
+    ["target"]
+)
+
+HTTP_POOL_SATURATION = Gauge(
+    "http_pool_saturation_ratio",
+    "In-flight outbound requests divided by the per-host connection limit",
+    ["target"]
+)
+
+HTTP_POOL_REQUESTS = Counter(
+    "http_pool_requests_total",
+    "Outbound requests by target and outcome",
+    ["target", "outcome"]
+)
+
+HTTP_POOL_LATENCY = Histogram(
+    "http_pool_request_duration_seconds",
+    "Outbound request latency, including time spent waiting for a connection",
+    ["target"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+
+def _origin(url: str) -> str:
+    """scheme://host[:port] of a URL, used as the pool key."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _target_label(target: str) -> str:
+    """The metrics label for a request target, OTHER_TARGET unless it is one of TARGETS."""
+    return target if target in TARGETS else OTHER_TARGET
+
+
+class HttpPool:
+    """
+    Process-wide registry of pooled httpx clients, one per origin.
+
+    httpx limits connections per client, so keeping one client per origin
+    makes ``max_connections_per_host`` a true per-host limit. Sync clients
+    are shared by every thread; async clients are kept per event loop since
+    an AsyncClient cannot be used across loops. A loop's async clients are
+    closed when the loop shuts down (asyncio.run closes them on exit) and
+    forgotten once the loop is closed, so short-lived loops don't leak them.
+
+    Request methods take a keyword-only ``target`` (one of TARGETS) naming
+    what the request is for; in-flight counts and metrics are kept per target.
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = 20,
+        max_keepalive_per_host: int = 10,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        write_timeout: float = 30.0,
+        pool_timeout: float = 10.0,
+        http2: Optional[bool] = None
+    ):
+        self.max_connections_per_host = max_connections_per_host
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_per_host,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=write_timeout,
+            pool=pool_timeout
+        )
+        # HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+        self.http2 = importlib.util.find_spec("h2") is not None if http2 is None else http2
+
+        self._lock = threading.Lock()
+        self._clients: Dict[str, httpx.Client] = {}
+        # event loop -> origin -> client, dropped with the loop
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+        # Keeps each loop's shutdown watcher (an async generator) alive until it runs
+        self._loop_watchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self._in_flight: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "HttpPool":
+        """Build a pool configured from HTTP_POOL_* / HTTP_*_TIMEOUT environment variables."""
+        http2 = os.getenv("HTTP_POOL_HTTP2")
+        return cls(
+            max_connections_per_host=int(os.getenv("HTTP_POOL_MAX_CONNECTIONS_PER_HOST", "20")),
+            max_keepalive_per_host=int(os.getenv("HTTP_POOL_MAX_KEEPALIVE_PER_HOST", "10")),
+            keepalive_expiry=float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "60")),
+            connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+            pool_timeout=float(os.getenv("HTTP_POOL_TIMEOUT", "10")),
+            http2=None if http2 is None else http2.lower() in ("1", "true", "yes")
+        )
+
+    # -------------------------------------------------------------------------
+    # Clients
+    # -------------------------------------------------------------------------
+    def client(self, url: str) -> httpx.Client:
+        """The shared sync client for url's origin."""
+        origin = _origin(url)
+        with self._lock:
+            client = self._clients.get(origin)
+            if client is None or client.is_closed:
+                client = httpx.Client(
+                    limits=self.limits, timeout=self.timeout, http2=self.http2, follow_redirects=True
+                )
+                self._clients[origin] = client
+            return client
+
+    def async_client(self, url: str) -> httpx.AsyncClient:
+        """The shared async client for url's origin on the running event loop."""
+        loop = asyncio.get_running_loop()
+        origin = _origin(url)
+        with self._lock:
+            self._forget_closed_loops()
+            clients = self._async_clients.get(loop)
+            if clients is None:
+                clients = self._async_clients[loop] = {}
+                self._watch_loop(loop, clients)
+            client = clients.get(origin)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    limits=self.limits, timeout=self.timeout, http2=self.http2, follow_redirects=True
+                )
+                clients[origin] = client
+            return client
+
+    def _watch_loop(self, loop: asyncio.AbstractEventLoop, clients: Dict[str, httpx.AsyncClient]):
+        """Close a loop's async clients when the loop shuts down its async generators."""
+        watcher = self._close_at_loop_shutdown(loop, clients)
+        self._loop_watchers[loop] = watcher
+        # Starting the generator registers it with the loop; loop.shutdown_asyncgens()
+        # (called by asyncio.run before closing the loop) then closes it.
+        loop.create_task(watcher.__anext__())
+
+    async def _close_at_loop_shutdown(self, loop: asyncio.AbstractEventLoop, clients: Dict[str, httpx.AsyncClient]):
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._async_clients.get(loop) is clients:
+                    del self._async_clients[loop]
+                    self._loop_watchers.pop(loop, None)
+            for client in list(clients.values()):
+                await client.aclose()
+
+    def _forget_closed_loops(self):
+        """Drop the clients of loops that were closed without shutting them down."""
+        for loop in [loop for loop in self._async_clients if loop.is_closed()]:
+            del self._async_clients[loop]
+            self._loop_watchers.pop(loop, None)
+
+    # -------------------------------------------------------------------------
+    # Requests
+    # -------------------------------------------------------------------------
+    def request(self, method: str, url: str, *, target: str = OTHER_TARGET, **kwargs: Any) -> httpx.Response:
+        """Send a request through the pooled sync client for url's origin."""
+        with self._track(target):
+            return self.client(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, *, target: str = OTHER_TARGET, **kwargs: Any) -> Iterator[httpx.Response]:
+        """Stream a response body through the pooled sync client."""
+        with self._track(target):
+            with self.client(url).stream(method, url, **kwargs) as response:
+                yield response
+
+    async def arequest(self, method: str, url: str, *, target: str = OTHER_TARGET, **kwargs: Any) -> httpx.Response:
+        """Send a request through the pooled async client for url's origin."""
+        with self._track(target):
+            return await self.async_client(url).request(method, url, **kwargs)
+
+    async def aget(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.arequest("GET", url, **kwargs)
+
+    async def apost(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.arequest("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def astream(self, method: str, url: str, *, target: str = OTHER_TARGET, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+        """Stream a response body through the pooled async client."""
+        with self._track(target):
+            async with self.async_client(url).stream(method, url, **kwargs) as response:
+                yield response
+
+    @contextmanager
+    def _track(self, target: str) -> Iterator[None]:
+        """Count a request as in flight for the saturation metrics."""
+        target = _target_label(target)
+        self._adjust(target, 1)
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except httpx.PoolTimeout:
+            outcome = "pool_timeout"
+            raise
+        except httpx.TimeoutException:
+            outcome = "timeout"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            self._adjust(target, -1)
+            HTTP_POOL_LATENCY.labels(target=target).observe(time.perf_counter() - started)
+            HTTP_POOL_REQUESTS.labels(target=target, outcome=outcome).inc()
+
+    def _adjust(self, target: str, delta: int):
+        with self._lock:
+            count = self._in_flight.get(target, 0) + delta
+            self._in_flight[target] = count
+        HTTP_POOL_IN_FLIGHT.labels(target=target).set(count)
+        HTTP_POOL_SATURATION.labels(target=target).set(count / self.max_connections_per_host)
+
+    # -------------------------------------------------------------------------
+    # Stats and shutdown
+    # -------------------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        """Per-target in-flight counts and pool configuration."""
+        with self._lock:
+            in_flight = dict(self._in_flight)
+        return {
+            "http2": self.http2,
+            "max_connections_per_host": self.max_connections_per_host,
+            "targets": {
+                target: {
+                    "in_flight": count,
+                    "saturation": count / self.max_connections_per_host
+                }
+                for target, count in in_flight.items()
+            }
+        }
+
+    def close(self):
+        """Close the sync clients. Async clients are closed by aclose()."""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+    async def aclose(self):
+        """Close every client, including the async ones on the running loop."""
+        self.close()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.pop(loop, {})
+            self._loop_watchers.pop(loop, None)
+        for client in clients.values():
+            await client.aclose()
+
+
+_pool: Optional[HttpPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_http_pool() -> HttpPool:
+    """The process-wide HttpPool, created from the environment on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HttpPool.from_env()
+        return _pool
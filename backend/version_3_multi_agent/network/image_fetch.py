@@ -0,0 +1,231 @@
+# =============================================================================
+# network/image_fetch.py
+# =============================================================================
+# Purpose:
+# Async image downloader for the classifier path. Each body is streamed
+# into a preallocated buffer with a hard byte cap, under connect/read
+# timeouts and an overall per-image deadline. Many images can be fetched
+# concurrently with a bound on parallelism.
+#
+# Sync callers (agent worker threads, classfication-model/inference.py) use
+# fetch_sync / fetch_many_sync, which run on one background event loop so
+# they share the pooled connections of network.http_pool.
+# =============================================================================
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Union
+
+import httpx
+from prometheus_client import Counter, Histogram
+
+from network.http_pool import HttpPool, get_http_pool
+
+IMAGE_FETCH_BYTES = Histogram(
+    "image_fetch_bytes",
+    "Size of downloaded images",
+    buckets=(16e3, 64e3, 256e3, 1e6, 4e6, 16e6)
+)
+
+IMAGE_FETCH_LATENCY = Histogram(
+    "image_fetch_duration_seconds",
+    "Image download latency, from request to last byte",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+IMAGE_FETCHES = Counter(
+    "image_fetch_total",
+    "Image downloads by outcome",
+    ["outcome"]
+)
+
+DEFAULT_CONTENT_TYPES = (
+    "image/jpeg", "image/png", "image/webp", "image/bmp", "image/tiff",
+    "application/octet-stream"
+)
+
+# Initial buffer when the server sends no Content-Length
+INITIAL_BUFFER_BYTES = 256 * 1024
+
+
+class ImageFetchError(Exception):
+    """Raised when an image cannot be downloaded within the limits"""
+
+    def __init__(self, url: str, reason: str, outcome: str = "error"):
+        super().__init__(f"Failed to download image {url}: {reason}")
+        self.url = url
+        self.reason = reason
+        self.outcome = outcome
+
+
+@dataclass
+class FetchedImage:
+    url: str
+    data: memoryview
+    content_type: str
+    seconds: float
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+class ImageFetcher:
+    """
+    Streams images into preallocated buffers with a byte cap and deadlines.
+
+    Args:
+        max_bytes: Largest body accepted; larger images fail without being read in full
+        connect_timeout: Seconds to establish a connection
+        read_timeout: Seconds to wait for each chunk of the body
+        deadline: Seconds for the whole download of one image
+        max_concurrency: Downloads in flight at once in fetch_many
+        content_types: Accepted Content-Type values (a missing header is accepted)
+        pool: HttpPool to fetch through, defaults to the process-wide pool
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 10 * 1024 * 1024,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 10.0,
+        deadline: float = 20.0,
+        max_concurrency: int = 8,
+        content_types: Sequence[str] = DEFAULT_CONTENT_TYPES,
+        pool: Optional[HttpPool] = None
+    ):
+        self.max_bytes = max_bytes
+        self.timeout = httpx.Timeout(connect=connect_timeout, read=read_timeout, write=read_timeout, pool=deadline)
+        self.deadline = deadline
+        self.max_concurrency = max_concurrency
+        self.content_types = tuple(content_types)
+        self._pool = pool
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, max_bytes: Optional[int] = None) -> "ImageFetcher":
+        """Build a fetcher configured from IMAGE_FETCH_* environment variables."""
+        return cls(
+            max_bytes=max_bytes or int(os.getenv("IMAGE_FETCH_MAX_BYTES", str(10 * 1024 * 1024))),
+            connect_timeout=float(os.getenv("IMAGE_FETCH_CONNECT_TIMEOUT", "3")),
+            read_timeout=float(os.getenv("IMAGE_FETCH_READ_TIMEOUT", "10")),
+            deadline=float(os.getenv("IMAGE_FETCH_DEADLINE", "20")),
+            max_concurrency=int(os.getenv("IMAGE_FETCH_CONCURRENCY", "8"))
+        )
+
+    @property
+    def pool(self) -> HttpPool:
+        return self._pool or get_http_pool()
+
+    # -------------------------------------------------------------------------
+    # Async API
+    # -------------------------------------------------------------------------
+    async def fetch(self, url: str) -> FetchedImage:
+        """
+        Download one image.
+
+        Raises:
+            ImageFetchError: On HTTP errors, timeouts, a disallowed content type
+                or a body larger than max_bytes
+        """
+        started = time.perf_counter()
+        try:
+            image = await asyncio.wait_for(self._stream(url, started), timeout=self.deadline)
+        except ImageFetchError as e:
+            IMAGE_FETCHES.labels(outcome=e.outcome).inc()
+            raise
+        except asyncio.TimeoutError:
+            IMAGE_FETCHES.labels(outcome="deadline").inc()
+            raise ImageFetchError(url, f"not finished within {self.deadline:.1f}s", "deadline")
+        except httpx.TimeoutException as e:
+            IMAGE_FETCHES.labels(outcome="timeout").inc()
+            raise ImageFetchError(url, f"timed out ({type(e).__name__})", "timeout") from e
+        except httpx.HTTPError as e:
+            IMAGE_FETCHES.labels(outcome="error").inc()
+            raise ImageFetchError(url, str(e)) from e
+
+        IMAGE_FETCHES.labels(outcome="ok").inc()
+        IMAGE_FETCH_BYTES.observe(image.size)
+        IMAGE_FETCH_LATENCY.observe(image.seconds)
+        return image
+
+    async def fetch_many(self, urls: Sequence[str]) -> List[Union[FetchedImage, ImageFetchError]]:
+        """Download images concurrently; failures are returned in place, not raised."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(url: str) -> Union[FetchedImage, ImageFetchError]:
+            async with semaphore:
+                try:
+                    return await self.fetch(url)
+                except ImageFetchError as e:
+                    return e
+
+        return list(await asyncio.gather(*(bounded(url) for url in urls)))
+
+    async def _stream(self, url: str, started: float) -> FetchedImage:
+        async with self.pool.astream("GET", url, target="image", timeout=self.timeout) as response:
+            if response.status_code >= 400:
+                raise ImageFetchError(url, f"HTTP {response.status_code}", "http_error")
+
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in self.content_types:
+                raise ImageFetchError(url, f"unsupported content type {content_type!r}", "content_type")
+
+            declared = response.headers.get("content-length")
+            declared = int(declared) if declared and declared.isdigit() else None
+            if declared is not None and declared > self.max_bytes:
+                raise ImageFetchError(url, f"{declared} bytes exceeds the {self.max_bytes} byte limit", "too_large")
+
+            buffer = bytearray(declared if declared is not None else min(INITIAL_BUFFER_BYTES, self.max_bytes))
+            size = 0
+            async for chunk in response.aiter_bytes():
+                end = size + len(chunk)
+                if end > self.max_bytes:
+                    raise ImageFetchError(url, f"body exceeds the {self.max_bytes} byte limit", "too_large")
+                if end > len(buffer):
+                    buffer.extend(bytes(max(end - len(buffer), min(len(buffer), self.max_bytes - len(buffer)))))
+                buffer[size:end] = chunk
+                size = end
+
+        return FetchedImage(
+            url=url,
+            data=memoryview(buffer)[:size],
+            content_type=content_type,
+            seconds=time.perf_counter() - started
+        )
+
+    # -------------------------------------------------------------------------
+    # Sync API, for worker threads and scripts
+    # -------------------------------------------------------------------------
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="image-fetch-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def fetch_sync(self, url: str) -> FetchedImage:
+        """Blocking fetch() for code that is not running an event loop."""
+        return asyncio.run_coroutine_threadsafe(self.fetch(url), self._background_loop()).result()
+
+    def fetch_many_sync(self, urls: Sequence[str]) -> List[Union[FetchedImage, ImageFetchError]]:
+        """Blocking fetch_many() for code that is not running an event loop."""
+        return asyncio.run_coroutine_threadsafe(self.fetch_many(urls), self._background_loop()).result()
+
+
+_fetcher: Optional[ImageFetcher] = None
+_fetcher_lock = threading.Lock()
+
+
+def get_image_fetcher() -> ImageFetcher:
+    """The process-wide ImageFetcher, created from the environment on first use."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = ImageFetcher.from_env()
+        return _fetcher
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from prometheus_client import REGISTRY
+sys.path.append('.')  # Run from version_3_multi_agent/
+from network.http_pool import HttpPool
+
+class OkHandler(BaseHTTPRequestHandler):
+    """Answers every request with an empty 200"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+class TestHttpPoolMetrics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Start a local server"""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_requests_are_counted_by_target_not_host(self):
+        """Test that known targets keep their label and any other target is counted as other"""
+        pool = HttpPool(http2=False)
+        self.addCleanup(pool.close)
+        before = REGISTRY.get_sample_value("http_pool_requests_total", {"target": "other", "outcome": "ok"}) or 0.0
+
+        pool.get(self.base_url + "/hook", target="callback")
+        pool.get(self.base_url + "/hook", target="attacker.example")
+        pool.get(self.base_url + "/hook")
+
+        self.assertEqual(set(pool.stats()["targets"]), {"callback", "other"})
+        after = REGISTRY.get_sample_value("http_pool_requests_total", {"target": "other", "outcome": "ok"})
+        self.assertEqual(after - before, 2)
+        for metric in REGISTRY.collect():
+            if metric.name.startswith("http_pool_"):
+                for sample in metric.samples:
+                    self.assertNotIn("host", sample.labels)
+                    self.assertNotIn(sample.labels.get("target"), ("attacker.example", self.base_url))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,121 @@
+import unittest
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append('.')  # Run from version_3_multi_agent/
+from network.http_pool import HttpPool
+from network.image_fetch import INITIAL_BUFFER_BYTES, ImageFetcher, ImageFetchError
+
+PHOTO = bytes(range(256)) * 4
+# Larger than the initial buffer, so a body without Content-Length has to grow it
+CHUNKED_PHOTO = bytes(range(256)) * (INITIAL_BUFFER_BYTES // 256 + 100)
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """Serves the fixed routes the tests fetch"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body, content_type="image/jpeg", status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunked(self, body, chunk_size=64 * 1024):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(body), chunk_size):
+            chunk = body[start:start + chunk_size]
+            self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        if self.path == "/photo.jpg":
+            self.send_body(PHOTO)
+        elif self.path == "/photo-with-charset.jpg":
+            self.send_body(PHOTO, content_type="IMAGE/JPEG; charset=binary")
+        elif self.path == "/chunked.jpg":
+            self.send_chunked(CHUNKED_PHOTO)
+        elif self.path == "/page.html":
+            self.send_body(b"<html></html>", content_type="text/html")
+        elif self.path == "/slow.jpg":
+            time.sleep(1.0)
+            self.send_body(PHOTO)
+        else:
+            self.send_body(b"not found", content_type="text/plain", status=404)
+
+class TestImageFetcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Start a local image server"""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def fetcher(self, **kwargs):
+        return ImageFetcher(pool=HttpPool(http2=False), **kwargs)
+
+    def assertFetchFails(self, fetcher, path, outcome):
+        with self.assertRaises(ImageFetchError) as raised:
+            fetcher.fetch_sync(self.base_url + path)
+        self.assertEqual(raised.exception.outcome, outcome)
+
+    def test_fetch_with_content_length(self):
+        """Test that a declared body is read in full into the buffer"""
+        image = self.fetcher().fetch_sync(self.base_url + "/photo.jpg")
+        self.assertEqual(bytes(image.data), PHOTO)
+        self.assertEqual((image.size, image.content_type), (len(PHOTO), "image/jpeg"))
+
+    def test_fetch_without_content_length_grows_buffer(self):
+        """Test that a chunked body larger than the initial buffer arrives intact"""
+        image = self.fetcher().fetch_sync(self.base_url + "/chunked.jpg")
+        self.assertEqual(bytes(image.data), CHUNKED_PHOTO)
+
+    def test_content_type_parameters_and_case_are_ignored(self):
+        """Test that 'IMAGE/JPEG; charset=...' is accepted as image/jpeg"""
+        image = self.fetcher().fetch_sync(self.base_url + "/photo-with-charset.jpg")
+        self.assertEqual(image.content_type, "image/jpeg")
+
+    def test_rejections(self):
+        """Test the outcome reported for each kind of rejected download"""
+        fetcher = self.fetcher()
+        self.assertFetchFails(fetcher, "/missing.jpg", "http_error")
+        self.assertFetchFails(fetcher, "/page.html", "content_type")
+
+    def test_byte_cap(self):
+        """Test that declared and undeclared bodies over max_bytes are both refused"""
+        self.assertFetchFails(self.fetcher(max_bytes=len(PHOTO) - 1), "/photo.jpg", "too_large")
+        self.assertFetchFails(self.fetcher(max_bytes=len(CHUNKED_PHOTO) - 1), "/chunked.jpg", "too_large")
+
+    def test_deadline(self):
+        """Test that a download not finished within the deadline is abandoned"""
+        started = time.perf_counter()
+        self.assertFetchFails(self.fetcher(deadline=0.2), "/slow.jpg", "deadline")
+        self.assertLess(time.perf_counter() - started, 0.9)
+
+    def test_fetch_many_returns_failures_in_place(self):
+        """Test that fetch_many keeps the input order and returns errors instead of raising"""
+        fetcher = self.fetcher(max_concurrency=2)
+        urls = [self.base_url + path for path in ("/photo.jpg", "/missing.jpg", "/chunked.jpg")]
+        results = asyncio.run(fetcher.fetch_many(urls))
+
+        self.assertEqual(bytes(results[0].data), PHOTO)
+        self.assertIsInstance(results[1], ImageFetchError)
+        self.assertEqual(results[1].url, urls[1])
+        self.assertEqual(bytes(results[2].data), CHUNKED_PHOTO)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,168 @@
+# =============================================================================
+# runtime/thread_budget.py
+# =============================================================================
+# Purpose:
+# One thread budget per agent worker, shared out between the native thread
+# pools living in the same interpreter: TensorFlow (classifier), PyTorch
+# (SentenceTransformer), FAISS (OpenMP) and OpenCV. Left alone, each of them
+# sizes its pool to every core on the machine, so a few concurrent requests
+# oversubscribe the CPU.
+#
+# - configure_thread_env() sets OMP/MKL/OpenBLAS/TF variables; it must run
+#   before those libraries are imported
+# - apply_thread_budget() calls each library's setter; it must run before
+#   TensorFlow executes its first op
+# =============================================================================
+
+import importlib
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+
+def available_cores() -> int:
+    """CPUs this process may run on (respects affinity / cpusets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    """
+    Threads granted to each library in one worker process.
+
+    Attributes:
+        cores: Cores assigned to this worker
+        tf_intra: TensorFlow intra-op threads (work inside one op, e.g. a conv)
+        tf_inter: TensorFlow inter-op threads (independent ops in parallel)
+        torch: PyTorch intra-op threads for the sentence embedder
+        faiss: OpenMP threads for FAISS searches
+        opencv: OpenCV threads for decode/resize (0 runs OpenCV single-threaded)
+    """
+    cores: int
+    tf_intra: int
+    tf_inter: int
+    torch: int
+    faiss: int
+    opencv: int
+
+    @classmethod
+    def split(cls, cores: int) -> "ThreadBudget":
+        """
+        Default split: the ResNet forward pass dominates and gets every core;
+        the embedder of a short query gets half; FAISS over a few hundred
+        passages and OpenCV on one image are faster without a thread pool.
+        """
+        cores = max(1, cores)
+        return cls(
+            cores=cores,
+            tf_intra=cores,
+            tf_inter=1,
+            torch=max(1, cores // 2),
+            faiss=1,
+            opencv=0
+        )
+
+    @classmethod
+    def from_env(cls) -> "ThreadBudget":
+        """
+        Budget from AGENT_THREAD_BUDGET (cores per worker, default: available
+        cores divided by AGENT_WORKERS_PER_HOST), with optional per-library
+        overrides AGENT_THREADS_TF_INTRA, _TF_INTER, _TORCH, _FAISS and _OPENCV.
+        """
+        workers = max(1, _env_int("AGENT_WORKERS_PER_HOST") or 1)
+        cores = _env_int("AGENT_THREAD_BUDGET") or max(1, available_cores() // workers)
+        default = cls.split(cores)
+        return cls(
+            cores=cores,
+            tf_intra=_env_int("AGENT_THREADS_TF_INTRA") or default.tf_intra,
+            tf_inter=_env_int("AGENT_THREADS_TF_INTER") or default.tf_inter,
+            torch=_env_int("AGENT_THREADS_TORCH") or default.torch,
+            faiss=_env_int("AGENT_THREADS_FAISS") or default.faiss,
+            opencv=_env_int("AGENT_THREADS_OPENCV") if os.getenv("AGENT_THREADS_OPENCV") else default.opencv
+        )
+
+    def as_env(self) -> Dict[str, str]:
+        """The AGENT_THREAD* variables that reproduce this budget."""
+        return {
+            "AGENT_THREAD_BUDGET": str(self.cores),
+            "AGENT_THREADS_TF_INTRA": str(self.tf_intra),
+            "AGENT_THREADS_TF_INTER": str(self.tf_inter),
+            "AGENT_THREADS_TORCH": str(self.torch),
+            "AGENT_THREADS_FAISS": str(self.faiss),
+            "AGENT_THREADS_OPENCV": str(self.opencv),
+        }
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def configure_thread_env(budget: ThreadBudget):
+    """
+    Size the thread pools that are read from the environment at import time.
+    Values already set in the environment win.
+    """
+    defaults = {
+        # OpenMP (FAISS, PyTorch on Linux), MKL and OpenBLAS (numpy, torch)
+        "OMP_NUM_THREADS": budget.torch,
+        "MKL_NUM_THREADS": budget.torch,
+        "OPENBLAS_NUM_THREADS": budget.torch,
+        # TensorFlow reads these when its runtime starts
+        "TF_NUM_INTRAOP_THREADS": budget.tf_intra,
+        "TF_NUM_INTEROP_THREADS": budget.tf_inter,
+        # Idle OpenMP workers spin-wait by default, stealing cores from TF
+        "KMP_BLOCKTIME": 0,
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, str(value))
+
+
+def _optional_module(name: str):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def apply_thread_budget(budget: ThreadBudget) -> Dict[str, Any]:
+    """
+    Apply the budget through each installed library's own setter.
+
+    Returns:
+        dict: What was applied per library, or the error if a setter refused
+    """
+    applied: Dict[str, Any] = {}
+
+    tf = _optional_module("tensorflow")
+    if tf is not None:
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(budget.tf_intra)
+            tf.config.threading.set_inter_op_parallelism_threads(budget.tf_inter)
+            applied["tensorflow"] = {"intra_op": budget.tf_intra, "inter_op": budget.tf_inter}
+        except RuntimeError as e:
+            # Raised once TensorFlow has run an op; TF_NUM_*_THREADS still applied if set early
+            applied["tensorflow"] = f"not applied: {e}"
+
+    torch = _optional_module("torch")
+    if torch is not None:
+        torch.set_num_threads(budget.torch)
+        applied["torch"] = budget.torch
+
+    faiss = _optional_module("faiss")
+    if faiss is not None and hasattr(faiss, "omp_set_num_threads"):
+        faiss.omp_set_num_threads(budget.faiss)
+        applied["faiss"] = budget.faiss
+
+    cv2 = _optional_module("cv2")
+    if cv2 is not None:
+        cv2.setNumThreads(budget.opencv)
+        applied["opencv"] = budget.opencv
+
+    return applied
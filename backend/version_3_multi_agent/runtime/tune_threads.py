@@ -0,0 +1,161 @@
+"""
+Auto-tune the per-worker thread budget (runtime/thread_budget.py).
+
+For a core count and request concurrency it tries a set of splits between
+TensorFlow, PyTorch, FAISS and OpenCV. Each split runs in a fresh process,
+since TensorFlow's pools cannot be resized once started. The process runs
+the agent's CPU work per request: resize a phone-sized photo, one classifier
+forward pass, embed a query and search FAISS. Splits are ranked by
+throughput, and the script prints the AGENT_THREAD* settings of the best one.
+
+Usage (from backend/version_3_multi_agent):
+    python -m runtime.tune_threads --cores 8 --concurrency 4 --requests 64
+    taskset -c 0-7 python -m runtime.tune_threads      # tune for a pinned worker
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from runtime.thread_budget import ThreadBudget, available_cores
+
+QUERY = "Itchy red rash on my forearm for three days"
+
+
+def candidate_budgets(cores: int, concurrency: int) -> List[ThreadBudget]:
+    """A small grid of splits around the default, deduplicated."""
+    candidates = {ThreadBudget.split(cores)}
+    for tf_intra in {cores, max(1, cores // 2), max(1, cores // max(1, concurrency))}:
+        for tf_inter in (1, 2):
+            for torch_threads in {1, max(1, cores // 2)}:
+                candidates.add(ThreadBudget(cores, tf_intra, tf_inter, torch_threads, faiss=1, opencv=0))
+    return sorted(candidates, key=lambda b: (-b.tf_intra, b.tf_inter, -b.torch))
+
+
+def library_defaults(cores: int) -> ThreadBudget:
+    """What the libraries pick on their own: every pool as wide as the machine."""
+    return ThreadBudget(cores, cores, cores, cores, cores, cores)
+
+
+def run_worker(budget: ThreadBudget, concurrency: int, requests: int) -> Dict[str, Any]:
+    """Measure one budget in this process (called in a fresh subprocess)."""
+    from runtime.thread_budget import apply_thread_budget, configure_thread_env
+    configure_thread_env(budget)
+
+    from concurrent.futures import ThreadPoolExecutor
+    import cv2
+    import faiss
+    import numpy as np
+    import tensorflow as tf
+
+    apply_thread_budget(budget)
+
+    model_path = os.getenv("AGENT_CLASSIFIER_MODEL")
+    if model_path:
+        from agents.agent1.classifier import create_classifier
+        classifier, _ = create_classifier(
+            os.getenv("AGENT_CLASSIFIER_BACKEND", "keras"), model_path, num_threads=budget.tf_intra
+        )
+    else:
+        # Same architecture and cost as resnet152.h5, without needing the weights
+        from agents.agent1.classifier import CompiledClassifier
+        classifier = CompiledClassifier(tf.keras.applications.ResNet152(weights=None, classes=23))
+
+    try:
+        from sentence_transformers import SentenceTransformer
+        embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        dimension = embedder.get_sentence_embedding_dimension()
+    except Exception as e:
+        print(f"Embedder unavailable, skipping it: {e}", file=sys.stderr)
+        embedder, dimension = None, 384
+
+    rng = np.random.default_rng(0)
+    index = faiss.IndexFlatIP(dimension)
+    index.add(rng.standard_normal((2000, dimension)).astype(np.float32))
+    photo = rng.integers(0, 256, size=(3024, 4032, 3), dtype=np.uint8)
+
+    def one_request(_):
+        started = time.perf_counter()
+        img = cv2.cvtColor(cv2.resize(photo, (224, 224)), cv2.COLOR_BGR2RGB)
+        classifier(tf.keras.applications.resnet.preprocess_input(img[np.newaxis].astype(np.float32)))
+        if embedder is not None:
+            query = embedder.encode([QUERY], convert_to_numpy=True, normalize_embeddings=True)
+        else:
+            query = rng.standard_normal((1, dimension)).astype(np.float32)
+        faiss.omp_set_num_threads(budget.faiss)
+        index.search(query, 3)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(concurrency)))  # warm-up
+        started = time.perf_counter()
+        latencies = sorted(pool.map(one_request, range(requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "budget": budget.to_dict(),
+        "throughput_rps": requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000,
+    }
+
+
+def measure(budget: ThreadBudget, concurrency: int, requests: int) -> Dict[str, Any]:
+    """Run one budget in a subprocess with a clean environment for the thread variables."""
+    env = {
+        k: v for k, v in os.environ.items()
+        if not k.endswith("_THREADS") and not k.startswith("AGENT_THREAD") and k != "KMP_BLOCKTIME"
+    }
+    env.update(budget.as_env())
+    command = [
+        sys.executable, "-m", "runtime.tune_threads",
+        "--worker", json.dumps(budget.to_dict()),
+        "--concurrency", str(concurrency),
+        "--requests", str(requests),
+    ]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"budget": budget.to_dict(), "error": completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick the best thread split for one agent worker")
+    parser.add_argument("--cores", type=int, default=available_cores(), help="Cores per worker")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent requests in the worker")
+    parser.add_argument("--requests", type=int, default=64, help="Timed requests per candidate")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(ThreadBudget(**json.loads(args.worker)), args.concurrency, args.requests)))
+        return
+
+    candidates = [library_defaults(args.cores)] + candidate_budgets(args.cores, args.concurrency)
+    results = []
+    for budget in candidates:
+        result = measure(budget, args.concurrency, args.requests)
+        results.append(result)
+        if "error" in result:
+            print(f"{budget.to_dict()}: failed {result['error']}")
+        else:
+            print(
+                f"tf_intra={budget.tf_intra:<3} tf_inter={budget.tf_inter:<3} torch={budget.torch:<3} "
+                f"faiss={budget.faiss:<3} opencv={budget.opencv:<3} -> {result['throughput_rps']:.2f} req/s, "
+                f"p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms"
+            )
+
+    measured = [r for r in results if "error" not in r]
+    if not measured:
+        raise SystemExit("No candidate completed")
+    best = max(measured, key=lambda r: r["throughput_rps"])
+    print(f"\nBest split for {args.cores} cores at concurrency {args.concurrency}:")
+    for name, value in ThreadBudget(**best["budget"]).as_env().items():
+        print(f"{name}={value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compare the Keras model.predict call path against the compiled tf.function
+path (CompiledClassifier) used by the backend agent and inference.py.
+
+For each batch size it reports the mean and p95 latency per call, images per
+second, resident memory growth over the timed calls, and whether both paths
+agree on the top-5 classes.
+
+Usage:
+    python benchmark_inference.py --model ../backend/weights/resnet152.h5
+    python benchmark_inference.py --random-weights --batch-sizes 1 8 16 --iterations 50
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend" / "version_3_multi_agent"))
+from agents.agent1.classifier import CompiledClassifier
+from save_model import build_model
+
+DEFAULT_MODEL_PATH = Path(__file__).resolve().parent.parent / "backend" / "weights" / "resnet152.h5"
+TOP_K = 5
+
+
+def rss_mb():
+    """Current resident set size in MiB (Linux), falling back to the peak RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def time_calls(fn, images, iterations, warmup):
+    """Run fn(images) warmup + iterations times; returns (latencies in ms, RSS growth in MiB, last output)"""
+    for _ in range(warmup):
+        output = fn(images)
+    rss_before = rss_mb()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        output = fn(images)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, rss_mb() - rss_before, output
+
+
+def keras_predict_top_k(model, batch_size):
+    """The previous call path: model.predict, then top-k in numpy"""
+    def run(images):
+        probabilities = model.predict(images, batch_size=batch_size, verbose=0)
+        return np.argsort(probabilities, axis=1)[:, -TOP_K:][:, ::-1]
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model.predict against the compiled classifier")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL_PATH), help="Path to the .h5 classifier")
+    parser.add_argument("--random-weights", action="store_true", help="Use the architecture with random weights instead of --model")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.random_weights:
+        model = build_model(weights=None)
+    else:
+        model = load_model(args.model, compile=False)
+    classifier = CompiledClassifier(model, top_k=TOP_K, batch_size=max(args.batch_sizes))
+
+    rng = np.random.default_rng(0)
+    print(f"{'path':<10} {'batch':>5} {'mean ms':>9} {'p95 ms':>9} {'img/s':>8} {'rss +MiB':>9}")
+    for batch_size in args.batch_sizes:
+        images = rng.integers(0, 256, size=(batch_size, 224, 224, 3)).astype(np.float32)
+        images = tf.keras.applications.resnet.preprocess_input(images)
+
+        results = {
+            "predict": time_calls(keras_predict_top_k(model, batch_size), images, args.iterations, args.warmup),
+            "compiled": time_calls(lambda x: classifier(x)["indices"], images, args.iterations, args.warmup),
+        }
+        for path, (latencies, rss_growth, _) in results.items():
+            latencies = sorted(latencies)
+            mean = sum(latencies) / len(latencies)
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            print(f"{path:<10} {batch_size:>5} {mean:>9.2f} {p95:>9.2f} {batch_size * 1000 / mean:>8.1f} {rss_growth:>9.1f}")
+
+        agree = np.array_equal(results["predict"][2], results["compiled"][2])
+        print(f"{'':<10} {batch_size:>5} top-{TOP_K} agreement: {'yes' if agree else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
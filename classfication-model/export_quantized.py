@@ -0,0 +1,168 @@
+"""
+Export the ResNet152 classifier to INT8-quantized ONNX and TFLite artifacts
+for CPU serving, and report how closely they agree with the Keras model.
+
+Static quantization calibrates activation ranges on images from a local
+sample folder (searched recursively, e.g. a copy of the DermNet train split);
+dynamic quantization only quantizes the weights and needs no calibration.
+Agreement and latency are measured on --eval-folder (the sample folder by
+default) with the same classifier classes the backend serves them with.
+
+Outputs (in --output-dir, which the backend reads by default):
+    resnet152.onnx          fp32 ONNX export
+    resnet152_int8.onnx     for AGENT_CLASSIFIER_BACKEND=onnxruntime
+    resnet152_int8.tflite   for AGENT_CLASSIFIER_BACKEND=tflite
+
+Usage:
+    pip install tf2onnx onnxruntime
+    python export_quantized.py --model ../backend/weights/resnet152.h5 --samples Assets/ --mode static
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend" / "version_3_multi_agent"))
+from agents.agent1.classifier import CompiledClassifier, OnnxClassifier, TFLiteClassifier
+
+WEIGHTS_DIR = Path(__file__).resolve().parent.parent / "backend" / "weights"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+TARGET_SIZE = (224, 224)
+
+
+def load_images(folder, limit):
+    """Read up to `limit` images under folder, preprocessed exactly like inference.py"""
+    paths = sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+    # Spread the sample over the class folders instead of taking the first few classes
+    if len(paths) > limit:
+        paths = [paths[i] for i in np.linspace(0, len(paths) - 1, limit).astype(int)]
+
+    images = []
+    for path in paths:
+        img = cv2.imread(str(path))
+        if img is None:
+            print(f"Skipping unreadable image: {path}")
+            continue
+        img = cv2.resize(img, TARGET_SIZE)
+        images.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    if not images:
+        raise SystemExit(f"No images found under {folder}")
+    return tf.keras.applications.resnet.preprocess_input(np.stack(images).astype(np.float32))
+
+
+def export_onnx(model, fp32_path, int8_path, mode, calibration, opset):
+    import tf2onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+    )
+
+    spec = (tf.TensorSpec((None, *TARGET_SIZE, 3), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=opset, output_path=str(fp32_path))
+    print(f"Wrote {fp32_path}")
+
+    if mode == "dynamic":
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    else:
+        class SampleReader(CalibrationDataReader):
+            def __init__(self):
+                self.batches = iter(calibration[i:i + 1] for i in range(len(calibration)))
+
+            def get_next(self):
+                batch = next(self.batches, None)
+                return None if batch is None else {"input": batch}
+
+        quantize_static(
+            str(fp32_path), str(int8_path), SampleReader(),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8
+        )
+    print(f"Wrote {int8_path} ({mode} INT8)")
+
+
+def export_tflite(model, int8_path, mode, calibration):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "static":
+        def representative_dataset():
+            for image in calibration:
+                yield [image[np.newaxis]]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        # Input and output stay float32 so callers preprocess exactly as for Keras
+
+    int8_path.write_bytes(converter.convert())
+    print(f"Wrote {int8_path} ({mode} INT8)")
+
+
+def agreement(reference, candidate):
+    """Top-1 agreement and mean overlap of the top-5 sets, as fractions"""
+    top1 = np.mean(reference["indices"][:, 0] == candidate["indices"][:, 0])
+    top5 = np.mean([
+        len(set(ref[:5]) & set(cand[:5])) / 5
+        for ref, cand in zip(reference["indices"], candidate["indices"])
+    ])
+    return top1, top5
+
+
+def timed(classifier, images, batch_size):
+    classifier.warm_up()
+    started = time.perf_counter()
+    outputs = [classifier(images[i:i + batch_size]) for i in range(0, len(images), batch_size)]
+    elapsed = time.perf_counter() - started
+    merged = {key: np.concatenate([o[key] for o in outputs]) for key in outputs[0]}
+    return merged, elapsed * 1000 / len(images)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export INT8 ONNX / TFLite versions of the classifier")
+    parser.add_argument("--model", default=str(WEIGHTS_DIR / "resnet152.h5"))
+    parser.add_argument("--samples", required=True, help="Folder of sample images for calibration")
+    parser.add_argument("--eval-folder", help="Folder of images for the agreement report (default: --samples)")
+    parser.add_argument("--output-dir", default=str(WEIGHTS_DIR))
+    parser.add_argument("--formats", nargs="+", choices=["onnx", "tflite"], default=["onnx", "tflite"])
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--calibration-size", type=int, default=200)
+    parser.add_argument("--eval-size", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1, help="Batch size for the latency measurement")
+    parser.add_argument("--opset", type=int, default=13)
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model = load_model(args.model, compile=False)
+    calibration = load_images(args.samples, args.calibration_size)
+    evaluation = load_images(args.eval_folder or args.samples, args.eval_size)
+    print(f"Calibration images: {len(calibration)}, evaluation images: {len(evaluation)}")
+
+    candidates = {}
+    if "onnx" in args.formats:
+        int8_path = output_dir / "resnet152_int8.onnx"
+        export_onnx(model, output_dir / "resnet152.onnx", int8_path, args.mode, calibration, args.opset)
+        candidates["onnxruntime"] = (OnnxClassifier(int8_path), int8_path)
+    if "tflite" in args.formats:
+        int8_path = output_dir / "resnet152_int8.tflite"
+        export_tflite(model, int8_path, args.mode, calibration)
+        candidates["tflite"] = (TFLiteClassifier(int8_path), int8_path)
+
+    reference, keras_ms = timed(CompiledClassifier(model), evaluation, args.batch_size)
+    model_mb = Path(args.model).stat().st_size / 2**20
+    print(f"\n{'backend':<12} {'size MiB':>9} {'ms/image':>9} {'speedup':>8} {'top-1':>7} {'top-5':>7}")
+    print(f"{'keras':<12} {model_mb:>9.1f} {keras_ms:>9.2f} {1.0:>7.2f}x {'-':>7} {'-':>7}")
+    for backend, (classifier, path) in candidates.items():
+        outputs, ms = timed(classifier, evaluation, args.batch_size)
+        top1, top5 = agreement(reference, outputs)
+        print(
+            f"{backend:<12} {path.stat().st_size / 2**20:>9.1f} {ms:>9.2f} {keras_ms / ms:>7.2f}x "
+            f"{top1:>7.1%} {top5:>7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
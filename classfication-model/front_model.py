@@ -0,0 +1,217 @@
+"""
+Train the cascade's front model and calibrate its acceptance threshold.
+
+The front model is a MobileNetV3 (or EfficientNet-B0) over the same 23
+classes as resnet152.h5, in the same order (the sorted DermNet class folder
+names, i.e. the backend's CLASS_MAPPING). It takes 0-255 RGB pixels; the
+backend's cascade converts its ResNet-preprocessed input in-graph.
+
+    train      Fine-tune an ImageNet backbone on a folder of class subfolders:
+               first the new head with the backbone frozen, then the top of
+               the backbone at a low learning rate.
+    calibrate  Run the front model and ResNet152 over a held-out folder,
+               exactly as the backend does, and choose the lowest escalation
+               rate whose cascade accuracy stays within --max-accuracy-drop
+               of ResNet152 alone.
+
+Usage:
+    python front_model.py train --train-dir dermnet/train --val-dir dermnet/val \\
+        --output ../backend/weights/front_mobilenetv3.keras
+    python front_model.py calibrate --front ../backend/weights/front_mobilenetv3.keras \\
+        --holdout-dir dermnet/test --max-accuracy-drop 0.005
+
+Then set AGENT_CASCADE_MODEL, AGENT_CASCADE_MIN_CONFIDENCE and
+AGENT_CASCADE_MIN_MARGIN to the printed values.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers
+from tensorflow.keras.models import load_model
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend" / "version_3_multi_agent"))
+from agents.agent1.classifier import CascadeClassifier, CompiledClassifier, undo_resnet_preprocessing
+
+WEIGHTS_DIR = Path(__file__).resolve().parent.parent / "backend" / "weights"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+TARGET_SIZE = (224, 224)
+NUM_CLASSES = 23
+
+BACKBONES = {
+    "mobilenetv3": lambda: tf.keras.applications.MobileNetV3Large(
+        input_shape=(*TARGET_SIZE, 3), include_top=False, weights="imagenet", include_preprocessing=True
+    ),
+    "mobilenetv3-small": lambda: tf.keras.applications.MobileNetV3Small(
+        input_shape=(*TARGET_SIZE, 3), include_top=False, weights="imagenet", include_preprocessing=True
+    ),
+    # EfficientNet rescales and normalizes 0-255 input inside the model
+    "efficientnetb0": lambda: tf.keras.applications.EfficientNetB0(
+        input_shape=(*TARGET_SIZE, 3), include_top=False, weights="imagenet"
+    ),
+}
+
+
+# -----------------------------------------------------------------------------
+# Training
+# -----------------------------------------------------------------------------
+def load_dataset(folder, batch_size, shuffle):
+    dataset = tf.keras.utils.image_dataset_from_directory(
+        folder,
+        labels="inferred",
+        label_mode="categorical",
+        image_size=TARGET_SIZE,
+        batch_size=batch_size,
+        shuffle=shuffle,
+        seed=0
+    )
+    if len(dataset.class_names) != NUM_CLASSES:
+        raise SystemExit(f"Expected {NUM_CLASSES} class folders in {folder}, found {len(dataset.class_names)}")
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def build_front_model(backbone_name):
+    backbone = BACKBONES[backbone_name]()
+    inputs = layers.Input(shape=(*TARGET_SIZE, 3))
+    x = layers.RandomFlip("horizontal")(inputs)
+    x = layers.RandomRotation(0.05)(x)
+    x = backbone(x, training=False)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.Dropout(0.2)(x)
+    outputs = layers.Dense(NUM_CLASSES, activation="softmax")(x)
+    return tf.keras.Model(inputs, outputs), backbone
+
+
+def train(args):
+    train_data = load_dataset(args.train_dir, args.batch_size, shuffle=True)
+    val_data = load_dataset(args.val_dir, args.batch_size, shuffle=False) if args.val_dir else None
+    model, backbone = build_front_model(args.backbone)
+    monitor = "val_accuracy" if val_data is not None else "accuracy"
+    checkpoint = tf.keras.callbacks.ModelCheckpoint(args.output, monitor=monitor, save_best_only=True)
+
+    # Stage 1: train the new head on frozen ImageNet features
+    backbone.trainable = False
+    model.compile(optimizer=tf.keras.optimizers.Adam(1e-3), loss="categorical_crossentropy", metrics=["accuracy"])
+    model.fit(train_data, validation_data=val_data, epochs=args.head_epochs, callbacks=[checkpoint])
+
+    # Stage 2: fine-tune the top of the backbone; BatchNorm layers stay frozen
+    backbone.trainable = True
+    for layer in backbone.layers[:-args.fine_tune_layers]:
+        layer.trainable = False
+    for layer in backbone.layers:
+        if isinstance(layer, layers.BatchNormalization):
+            layer.trainable = False
+    model.compile(optimizer=tf.keras.optimizers.Adam(1e-5), loss="categorical_crossentropy", metrics=["accuracy"])
+    model.fit(
+        train_data, validation_data=val_data,
+        initial_epoch=args.head_epochs, epochs=args.head_epochs + args.fine_tune_epochs,
+        callbacks=[checkpoint, tf.keras.callbacks.EarlyStopping(monitor=monitor, patience=3, restore_best_weights=True)]
+    )
+    print(f"Best front model saved to {args.output}")
+
+
+# -----------------------------------------------------------------------------
+# Calibration
+# -----------------------------------------------------------------------------
+def load_holdout(folder, limit):
+    """Held-out images preprocessed like the backend (cv2, resize, RGB, ResNet preprocessing), with labels"""
+    class_dirs = sorted(p for p in Path(folder).iterdir() if p.is_dir())
+    if len(class_dirs) != NUM_CLASSES:
+        raise SystemExit(f"Expected {NUM_CLASSES} class folders in {folder}, found {len(class_dirs)}")
+
+    samples = [
+        (path, label)
+        for label, class_dir in enumerate(class_dirs)
+        for path in sorted(class_dir.rglob("*")) if path.suffix.lower() in IMAGE_EXTENSIONS
+    ]
+    if limit and len(samples) > limit:
+        samples = [samples[i] for i in np.linspace(0, len(samples) - 1, limit).astype(int)]
+
+    images, labels = [], []
+    for path, label in samples:
+        img = cv2.imread(str(path))
+        if img is None:
+            continue
+        images.append(cv2.cvtColor(cv2.resize(img, TARGET_SIZE), cv2.COLOR_BGR2RGB))
+        labels.append(label)
+    images = tf.keras.applications.resnet.preprocess_input(np.stack(images).astype(np.float32))
+    return images, np.array(labels)
+
+
+def run_in_batches(classifier, images, batch_size=32):
+    outputs = [classifier(images[i:i + batch_size]) for i in range(0, len(images), batch_size)]
+    return {key: np.concatenate([o[key] for o in outputs]) for key in ("scores", "indices")}
+
+
+def calibrate(args):
+    images, labels = load_holdout(args.holdout_dir, args.limit)
+    front = CompiledClassifier(load_model(args.front, compile=False), input_transform=undo_resnet_preprocessing)
+    full = CompiledClassifier(load_model(args.full, compile=False))
+
+    front_out = run_in_batches(front, images)
+    full_out = run_in_batches(full, images)
+    front_correct = front_out["indices"][:, 0] == labels
+    full_correct = full_out["indices"][:, 0] == labels
+    full_accuracy = full_correct.mean()
+    print(f"Held-out images: {len(labels)}")
+    print(f"ResNet152 accuracy {full_accuracy:.2%}, front model accuracy {front_correct.mean():.2%}")
+
+    best = None
+    print(f"\n{'confidence':>10} {'margin':>7} {'escalated':>10} {'accuracy':>9}")
+    for margin in args.margins:
+        for confidence in np.round(np.arange(0.0, 1.0001, args.step), 4):
+            escalate = CascadeClassifier(None, None, confidence, margin).escalate(front_out["scores"])
+            accuracy = np.where(escalate, full_correct, front_correct).mean()
+            rate = escalate.mean()
+            if accuracy >= full_accuracy - args.max_accuracy_drop and (best is None or rate < best[2]):
+                best = (confidence, margin, rate, accuracy)
+            if round(confidence * 100) % 10 == 0:
+                print(f"{confidence:>10.2f} {margin:>7.2f} {rate:>10.1%} {accuracy:>9.2%}")
+
+    if best is None:
+        raise SystemExit("No threshold meets the accuracy target; escalate everything (leave the cascade off)")
+    confidence, margin, rate, accuracy = best
+    print(
+        f"\nLowest escalation rate within {args.max_accuracy_drop:.2%} of ResNet152: "
+        f"{rate:.1%} escalated, cascade accuracy {accuracy:.2%}"
+    )
+    print(f"AGENT_CASCADE_MODEL={Path(args.front).resolve()}")
+    print(f"AGENT_CASCADE_MIN_CONFIDENCE={confidence}")
+    print(f"AGENT_CASCADE_MIN_MARGIN={margin}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and calibrate the cascade front model")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="Fine-tune a small backbone on the DermNet classes")
+    train_parser.add_argument("--train-dir", required=True, help="Folder with one subfolder per class")
+    train_parser.add_argument("--val-dir", help="Validation folder with the same class subfolders")
+    train_parser.add_argument("--backbone", choices=sorted(BACKBONES), default="mobilenetv3")
+    train_parser.add_argument("--output", default=str(WEIGHTS_DIR / "front_mobilenetv3.keras"))
+    train_parser.add_argument("--batch-size", type=int, default=32)
+    train_parser.add_argument("--head-epochs", type=int, default=5)
+    train_parser.add_argument("--fine-tune-epochs", type=int, default=15)
+    train_parser.add_argument("--fine-tune-layers", type=int, default=40, help="Backbone layers unfrozen in stage 2")
+
+    calibrate_parser = commands.add_parser("calibrate", help="Choose the acceptance threshold on held-out data")
+    calibrate_parser.add_argument("--front", default=str(WEIGHTS_DIR / "front_mobilenetv3.keras"))
+    calibrate_parser.add_argument("--full", default=str(WEIGHTS_DIR / "resnet152.h5"))
+    calibrate_parser.add_argument("--holdout-dir", required=True, help="Held-out folder with one subfolder per class")
+    calibrate_parser.add_argument("--limit", type=int, default=0, help="Use at most this many held-out images")
+    calibrate_parser.add_argument("--max-accuracy-drop", type=float, default=0.005)
+    calibrate_parser.add_argument("--margins", type=float, nargs="+", default=[0.0, 0.1, 0.2, 0.3])
+    calibrate_parser.add_argument("--step", type=float, default=0.01)
+
+    args = parser.parse_args()
+    if args.command == "train":
+        train(args)
+    else:
+        calibrate(args)
+
+
+if __name__ == "__main__":
+    main()
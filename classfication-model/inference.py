@@ -3,8 +3,15 @@ from tensorflow.keras.models import load_model
 from tensorflow.keras.preprocessing import image
 import numpy as np
 import os
+import sys
+from pathlib import Path
 import cv2
 
+# The backend's streaming image fetcher and compiled classifier are reused here
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend" / "version_3_multi_agent"))
+from agents.agent1.classifier import CompiledClassifier
+from agents.agent1.image_decode import decode_for_size
+
 # Configure TensorFlow to use GPU memory growth
 gpus = tf.config.list_physical_devices('GPU')
 if gpus:
@@ -16,17 +23,35 @@ if gpus:
 
 # Load the pre-trained ResNet152 model
 try:
-    model = load_model('/home/rahul/Downloads/resnet152.h5')
+    model = load_model('/home/rahul/Downloads/resnet152.h5', compile=False)
+    # Traced once with a fixed input signature instead of model.predict per call
+    classifier = CompiledClassifier(model)
 except Exception as e:
     print(f"Error loading the model: {e}")
     model = None
+    classifier = None
+
+def load_image(img_path, target_size=None):
+    """
+    Reads an image as a BGR array from a local path or an http(s) URL.
+
+    URLs are downloaded with the backend's ImageFetcher (byte cap, timeouts,
+    pooled connections) and decoded in memory. With a target_size (width, height),
+    large JPEGs are decoded at 1/2, 1/4 or 1/8 scale, never below that size.
+    """
+    if img_path.startswith(("http://", "https://")):
+        from network.image_fetch import get_image_fetcher
+        data = get_image_fetcher().fetch_sync(img_path).data
+    else:
+        data = np.fromfile(img_path, dtype=np.uint8)
+    return decode_for_size(data, target_size)
 
 def inference(img_path, target_size=(224, 224)):
     """
     Performs inference on an image using the loaded ResNet152 model.
 
     Args:
-        img_path (str): Path to the input image file.
+        img_path (str): Path to the input image file, or an http(s) URL.
         target_size (tuple): The target size (height, width) for resizing the image,
                              consistent with the model's input requirements.
                              For ResNet152, this is typically (224, 224).
@@ -42,18 +67,18 @@ def inference(img_path, target_size=(224, 224)):
 
     try:
         # Load and preprocess the image using cv2 to match training
-        img = cv2.imread(img_path)
+        img = load_image(img_path, target_size)
         img = cv2.resize(img, target_size)
         img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)  # Convert BGR to RGB
         img_array = np.expand_dims(img, axis=0)  # Add batch dimension
         img_array = tf.keras.applications.resnet.preprocess_input(img_array)
 
         # Perform inference
-        predictions = model.predict(img_array)
+        predictions = classifier(img_array)
 
         # Return the index of the most likely class and the probability distribution
-        predicted_class_index = np.argmax(predictions[0])
-        probability_distribution = predictions[0]
+        predicted_class_index = int(predictions['indices'][0][0])
+        probability_distribution = predictions['probabilities'][0]
 
         return predicted_class_index, probability_distribution
 
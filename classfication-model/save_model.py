@@ -4,16 +4,16 @@ from tensorflow.keras.layers import Dense, GlobalAveragePooling2D
 from tensorflow.keras.applications import ResNet152
 import os
 
-def create_and_save_model(num_classes=23, save_path='resnet152.h5'):
+def build_model(num_classes=23, weights='imagenet'):
     """
-    Create and save a ResNet152 model with proper optimizer state and metrics.
-    
+    Build the ResNet152 classifier architecture.
+
     Args:
         num_classes (int): Number of output classes
-        save_path (str): Path to save the model
+        weights (str): Backbone weights, 'imagenet' or None for random initialization
     """
     # Create base model
-    base_model = ResNet152(weights='imagenet', include_top=False, input_shape=(224, 224, 3))
+    base_model = ResNet152(weights=weights, include_top=False, input_shape=(224, 224, 3))
     
     # Add custom layers
     x = base_model.output
@@ -22,7 +22,17 @@ def create_and_save_model(num_classes=23, save_path='resnet152.h5'):
     predictions = Dense(num_classes, activation='softmax')(x)
     
     # Create model
-    model = Model(inputs=base_model.input, outputs=predictions)
+    return Model(inputs=base_model.input, outputs=predictions)
+
+def create_and_save_model(num_classes=23, save_path='resnet152.h5'):
+    """
+    Create and save a ResNet152 model with proper optimizer state and metrics.
+    
+    Args:
+        num_classes (int): Number of output classes
+        save_path (str): Path to save the model
+    """
+    model = build_model(num_classes)
     
     # Compile model with optimizer and metrics
     optimizer = tf.keras.optimizers.Adam(learning_rate=0.001)
@@ -0,0 +1,8 @@
+-- Indexes for the backend's keyset-paginated assessment listing
+-- (GET /api/triage), which orders by (created_at, id) descending and
+-- optionally filters by user_id.
+CREATE INDEX IF NOT EXISTS assessments_user_created_at_id_idx
+    ON public.assessments (user_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS assessments_created_at_id_idx
+    ON public.assessments (created_at DESC, id DESC);
@@ -0,0 +1,32 @@
+-- One-off compaction of possible_diagnoses written before diagnosis ids
+-- were deterministic. Keeps the newest row per (assessment_id,
+-- diagnosis_name), deletes the rest, and rewrites the survivors' ids to
+-- uuid_generate_v5(assessment_id, diagnosis_name), the id the backend now
+-- upserts, so later analyses update these rows instead of adding new ones.
+-- Run it with: python -m api.compact_diagnoses (from backend/)
+CREATE OR REPLACE FUNCTION public.compact_possible_diagnoses()
+RETURNS JSONB AS $$
+DECLARE
+    deleted_count INTEGER;
+    rekeyed_count INTEGER;
+BEGIN
+    WITH ranked AS (
+        SELECT id, row_number() OVER (
+            PARTITION BY assessment_id, diagnosis_name
+            ORDER BY created_at DESC, id
+        ) AS rn
+        FROM public.possible_diagnoses
+    )
+    DELETE FROM public.possible_diagnoses p
+    USING ranked r
+    WHERE p.id = r.id AND r.rn > 1;
+    GET DIAGNOSTICS deleted_count = ROW_COUNT;
+
+    UPDATE public.possible_diagnoses
+    SET id = extensions.uuid_generate_v5(assessment_id, diagnosis_name)
+    WHERE id <> extensions.uuid_generate_v5(assessment_id, diagnosis_name);
+    GET DIAGNOSTICS rekeyed_count = ROW_COUNT;
+
+    RETURN jsonb_build_object('deleted', deleted_count, 'rekeyed', rekeyed_count);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,94 @@
+-- Persist an agent analysis in one round trip and one transaction:
+-- bulk-upsert the possible diagnoses (their ids are deterministic, so
+-- re-analysis updates rows instead of duplicating them) and update the
+-- assessment columns present in p_update. Called by the backend triage API.
+-- Returns the assessment's updated_at after the write, so the API can build
+-- ETag/Last-Modified without reading the row back.
+--
+-- analysis_input_hash records which symptom_description and image_url the
+-- persisted analysis was made from, so every backend worker can tell a
+-- current analysis from a stale one.
+ALTER TABLE public.assessments
+    ADD COLUMN IF NOT EXISTS analysis_input_hash TEXT;
+
+-- Earlier versions returned VOID, and CREATE OR REPLACE cannot change that
+DROP FUNCTION IF EXISTS public.persist_triage_analysis(UUID, JSONB, JSONB);
+
+CREATE FUNCTION public.persist_triage_analysis(
+    p_assessment_id UUID,
+    p_update JSONB,
+    p_diagnoses JSONB
+)
+RETURNS TIMESTAMPTZ AS $$
+DECLARE
+    new_updated_at TIMESTAMPTZ;
+BEGIN
+    IF p_diagnoses IS NOT NULL AND jsonb_array_length(p_diagnoses) > 0 THEN
+        INSERT INTO public.possible_diagnoses (
+            id, assessment_id, diagnosis_name, confidence_score, description, created_at
+        )
+        SELECT d.id, d.assessment_id, d.diagnosis_name, d.confidence_score, d.description,
+               COALESCE(d.created_at, now())
+        FROM jsonb_to_recordset(p_diagnoses) AS d(
+            id UUID,
+            assessment_id UUID,
+            diagnosis_name TEXT,
+            confidence_score REAL,
+            description TEXT,
+            created_at TIMESTAMPTZ
+        )
+        ON CONFLICT (id) DO UPDATE SET
+            diagnosis_name = EXCLUDED.diagnosis_name,
+            confidence_score = EXCLUDED.confidence_score,
+            description = EXCLUDED.description;
+    END IF;
+
+    IF p_update IS NOT NULL AND p_update <> '{}'::jsonb THEN
+        UPDATE public.assessments SET
+            predicted_injury_label = CASE WHEN p_update ? 'predicted_injury_label'
+                THEN p_update->>'predicted_injury_label' ELSE predicted_injury_label END,
+            injury_description_summary = CASE WHEN p_update ? 'injury_description_summary'
+                THEN p_update->>'injury_description_summary' ELSE injury_description_summary END,
+            severity_score = CASE WHEN p_update ? 'severity_score'
+                THEN (p_update->>'severity_score')::INTEGER ELSE severity_score END,
+            severity_reason = CASE WHEN p_update ? 'severity_reason'
+                THEN p_update->>'severity_reason' ELSE severity_reason END,
+            recommendation_status = CASE WHEN p_update ? 'recommendation_status'
+                THEN (p_update->>'recommendation_status')::public.recommendation_status_enum
+                ELSE recommendation_status END,
+            triage_recommendation = CASE WHEN p_update ? 'triage_recommendation'
+                THEN p_update->>'triage_recommendation' ELSE triage_recommendation END,
+            analysis_input_hash = CASE WHEN p_update ? 'analysis_input_hash'
+                THEN p_update->>'analysis_input_hash' ELSE analysis_input_hash END
+        WHERE id = p_assessment_id
+        RETURNING updated_at INTO new_updated_at;
+    ELSIF p_diagnoses IS NOT NULL AND jsonb_array_length(p_diagnoses) > 0 THEN
+        -- Diagnoses alone changed: bump updated_at so ETag/Last-Modified change
+        UPDATE public.assessments SET updated_at = now() WHERE id = p_assessment_id
+        RETURNING updated_at INTO new_updated_at;
+    ELSE
+        SELECT updated_at INTO new_updated_at FROM public.assessments WHERE id = p_assessment_id;
+    END IF;
+
+    RETURN new_updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Persist many analyses in one round trip and one transaction.
+-- p_analyses is an array of {assessment_id, update, diagnoses} objects.
+CREATE OR REPLACE FUNCTION public.persist_triage_analyses(
+    p_analyses JSONB
+)
+RETURNS VOID AS $$
+DECLARE
+    analysis JSONB;
+BEGIN
+    FOR analysis IN SELECT * FROM jsonb_array_elements(p_analyses) LOOP
+        PERFORM public.persist_triage_analysis(
+            (analysis->>'assessment_id')::UUID,
+            analysis->'update',
+            analysis->'diagnoses'
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,61 @@
+-- Claims so that only one backend worker analyzes an assessment at a time.
+-- A claim expires after p_ttl_seconds so a crashed worker cannot block an
+-- assessment forever. Called by the backend triage API.
+--
+-- Claims live in their own table rather than on assessments, so claiming
+-- and releasing do not fire update_assessments_updated_at: they add no
+-- writes to assessments and leave its updated_at (and so the ETag and
+-- Last-Modified the API derives from it) unchanged.
+CREATE TABLE IF NOT EXISTS public.triage_analysis_claims (
+    assessment_id UUID PRIMARY KEY REFERENCES public.assessments(id) ON DELETE CASCADE,
+    claimed_by TEXT NOT NULL,
+    claimed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Only the backend (service role) reads or writes claims
+ALTER TABLE public.triage_analysis_claims ENABLE ROW LEVEL SECURITY;
+
+-- Columns used by an earlier version of these RPCs
+ALTER TABLE public.assessments
+    DROP COLUMN IF EXISTS analysis_claimed_by,
+    DROP COLUMN IF EXISTS analysis_claimed_at;
+
+-- Returns true if p_worker now holds the claim on the assessment.
+CREATE OR REPLACE FUNCTION public.claim_triage_analysis(
+    p_assessment_id UUID,
+    p_worker TEXT,
+    p_ttl_seconds INTEGER
+)
+RETURNS BOOLEAN AS $$
+DECLARE
+    claimed BOOLEAN;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.assessments WHERE id = p_assessment_id) THEN
+        RETURN false;
+    END IF;
+
+    INSERT INTO public.triage_analysis_claims AS c (assessment_id, claimed_by, claimed_at)
+    VALUES (p_assessment_id, p_worker, now())
+    ON CONFLICT (assessment_id) DO UPDATE SET
+        claimed_by = EXCLUDED.claimed_by,
+        claimed_at = EXCLUDED.claimed_at
+    WHERE c.claimed_by = p_worker
+       OR c.claimed_at < now() - make_interval(secs => p_ttl_seconds)
+    RETURNING true INTO claimed;
+
+    RETURN COALESCE(claimed, false);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Release a claim held by p_worker.
+CREATE OR REPLACE FUNCTION public.release_triage_analysis(
+    p_assessment_id UUID,
+    p_worker TEXT
+)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM public.triage_analysis_claims
+    WHERE assessment_id = p_assessment_id
+      AND claimed_by = p_worker;
+END;
+$$ LANGUAGE plpgsql;